@@ -0,0 +1,122 @@
+"""
+Benchmark concurrent small writes: one transaction per write from every
+thread (the old pattern) vs. the single db_writer queue.
+
+Usage: python -m benchmarks.bench_db_writes [--producers 16] [--writes 300] [--readers 4]
+Producers insert articles and mark them analyzed while readers page
+through the table. Reports writes/s and "database is locked" errors.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_env(tmp: str, busy_timeout: float):
+    os.environ.update({
+        "RSS_URLS": "",
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": "http://127.0.0.1:9",
+        "OPENAI_MODEL": "bench",
+        "ADMIN_PASSWORD": "bench",
+        "DB_PATH": os.path.join(tmp, "news.db"),
+        "STORAGE_DIR": os.path.join(tmp, "articles"),
+        "LOG_LEVEL": "WARNING",
+        "DB_BUSY_TIMEOUT_SECONDS": str(busy_timeout),
+    })
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+def run(mode: str, producers: int, writes: int, readers: int) -> dict:
+    from datetime import datetime
+    from sqlalchemy import select
+    from src.util import article_store
+    from src.util.database import SessionLocal, Article
+    from src.util.db_writer import db_writer
+
+    errors = []
+    stop = threading.Event()
+
+    def fields(worker: int, i: int) -> dict:
+        now = datetime.now()
+        return dict(
+            entry_id=f"{mode}-{worker}-{i}", title=f"t{i}", link="http://x", subscription_name="bench",
+            publish_date=now, summary="", score=0, is_ad=False, is_processed=False, is_sent=False,
+            created_at=now, updated_at=now,
+        )
+
+    def apply(fn, *args, **kwargs):
+        if mode == "queue":
+            return db_writer.write(fn, *args, **kwargs)
+        with SessionLocal() as db:
+            result = fn(db, *args, **kwargs)
+            db.commit()
+            return result
+
+    def producer(worker: int):
+        for i in range(writes):
+            try:
+                apply(article_store.insert_article, **fields(worker, i))
+                with SessionLocal() as db:
+                    article_id = db.execute(select(Article.id).where(Article.entry_id == f"{mode}-{worker}-{i}")).scalar()
+                apply(article_store.save_analysis, article_id, summary="s", score=5, is_ad=False)
+            except Exception as e:
+                errors.append(str(e))
+
+    def reader():
+        while not stop.is_set():
+            with SessionLocal() as db:
+                for _ in article_store.iter_batches(db, article_store.PENDING_COLUMNS, batch_size=200):
+                    pass
+
+    reader_threads = [threading.Thread(target=reader, daemon=True) for _ in range(readers)]
+    for t in reader_threads:
+        t.start()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=producer, args=(w,)) for w in range(producers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    db_writer.shutdown()
+
+    total = producers * writes * 2
+    locked = sum("locked" in e for e in errors)
+    return {"mode": mode, "writes": total, "seconds": round(elapsed, 2),
+            "writes_per_s": round(total / elapsed), "errors": len(errors), "locked": locked}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--producers", type=int, default=16)
+    parser.add_argument("--writes", type=int, default=300, help="Articles per producer (two writes each)")
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--busy-timeout", type=float, default=1.0, help="DB_BUSY_TIMEOUT_SECONDS for both runs")
+    parser.add_argument("--mode", choices=("direct", "queue"))
+    args = parser.parse_args()
+
+    if args.mode:
+        with tempfile.TemporaryDirectory() as tmp:
+            setup_env(tmp, args.busy_timeout)
+            from src.util.database import init_db
+            init_db()
+            print(run(args.mode, args.producers, args.writes, args.readers))
+        return
+
+    # Each mode in a fresh interpreter: settings and engines are module state
+    import subprocess
+    for mode in ("direct", "queue"):
+        subprocess.run([sys.executable, "-m", "benchmarks.bench_db_writes", "--mode", mode,
+                        "--producers", str(args.producers), "--writes", str(args.writes),
+                        "--readers", str(args.readers), "--busy-timeout", str(args.busy_timeout)],
+                       cwd=PROJECT_ROOT, check=True)
+
+
+if __name__ == "__main__":
+    main()
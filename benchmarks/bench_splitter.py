@@ -0,0 +1,82 @@
+"""
+Benchmark the notifier message splitter on a ~1 MB CJK-heavy report.
+
+Usage: python -m benchmarks.bench_splitter
+Compares the previous character-based, string-concatenating splitter with
+BaseNotifier._split_smartly and checks every chunk fits the encoded limit.
+"""
+import os
+import time
+
+# Settings are required at import time; the benchmark never contacts them
+for key in ("RSS_URLS", "OPENAI_API_KEY", "OPENAI_BASE_URL", "OPENAI_MODEL", "ADMIN_PASSWORD"):
+    os.environ.setdefault(key, "bench")
+
+from src.services.notifier import DingTalkNotifier, TelegramNotifier
+
+
+def legacy_split(content, chunk_size):
+    # Previous implementation: repeated string concatenation, limit in characters
+    if len(content) <= chunk_size:
+        return [content]
+    chunks = []
+    current_chunk = ""
+    for line in content.split('\n'):
+        if len(current_chunk) + len(line) + 1 > chunk_size:
+            if current_chunk:
+                chunks.append(current_chunk)
+                current_chunk = line
+            else:
+                sub_chunks = [line[i:i+chunk_size] for i in range(0, len(line), chunk_size)]
+                chunks.extend(sub_chunks[:-1])
+                current_chunk = sub_chunks[-1]
+        else:
+            current_chunk = current_chunk + "\n" + line if current_chunk else line
+    if current_chunk:
+        chunks.append(current_chunk)
+    return chunks
+
+
+def build_report(target_bytes: int = 1024 * 1024) -> str:
+    lines = ["", "> 💡 **总结**: " + "今日要点概述。" * 50, "", "---", ""]
+    size = 0
+    i = 0
+    while size < target_bytes:
+        i += 1
+        section = [
+            f"### [第{i}篇 深度分析：人工智能与产业变革](https://example.com/a/{i})  (评分: 9)",
+            "本文讨论了大模型在工业场景中的落地路径，以及 inference cost 的下降趋势。" * 6,
+            "",
+        ]
+        lines.extend(section)
+        size += sum(len(line.encode("utf-8")) + 1 for line in section)
+    return "\n".join(lines)
+
+
+def bench(label, fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<40} {best * 1000:8.1f} ms  {len(result):5d} chunks")
+    return result
+
+
+def main():
+    report = build_report()
+    print(f"Report: {len(report.encode('utf-8')) / 1024:.0f} KiB UTF-8, {len(report)} chars")
+
+    legacy = bench("legacy (3500 chars)", lambda: legacy_split(report, 3500))
+    print(f"  legacy chunks starting mid-article: {sum(1 for c in legacy[1:] if not c.startswith('###'))}")
+
+    for notifier, limit in ((DingTalkNotifier(), 18000), (TelegramNotifier(), 4000)):
+        chunks = bench(f"{notifier.name} ({limit} encoded units)", lambda: notifier._split_smartly(report, limit))
+        assert all(notifier._measure(c) <= limit for c in chunks)
+        split_sections = sum(1 for c in chunks[1:] if not c.startswith("###"))
+        assert split_sections == 0, f"{split_sections} chunks start mid-article"
+        assert "\n".join(chunks) == report
+
+
+if __name__ == "__main__":
+    main()
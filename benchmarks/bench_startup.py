@@ -0,0 +1,86 @@
+"""
+Benchmark cold start: import time of src.main and time-to-first-200 on `/`.
+
+Usage: python -m benchmarks.bench_startup [--runs 5]
+Each run starts a fresh interpreter (uvicorn on a free port, throwaway DB
+and storage dirs) and polls `/` until it answers 200.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def bench_env(tmp: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "RSS_URLS": "",
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": "http://127.0.0.1:9",
+        "OPENAI_MODEL": "bench",
+        "ADMIN_PASSWORD": "bench",
+        "DB_PATH": os.path.join(tmp, "news.db"),
+        "STORAGE_DIR": os.path.join(tmp, "articles"),
+        "LOCK_DIR": os.path.join(tmp, "locks"),
+    })
+    return env
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def import_time(env: dict) -> float:
+    code = "import time; t = time.perf_counter(); import src.main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def time_to_first_200(env: dict, timeout: float = 60.0) -> float:
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError("Server did not answer within timeout")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    imports, first_200 = [], []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = bench_env(tmp)
+            imports.append(import_time(env))
+            first_200.append(time_to_first_200(env))
+
+    print(f"import src.main       median {statistics.median(imports) * 1000:7.0f} ms  (min {min(imports) * 1000:.0f})")
+    print(f"time to first 200 /   median {statistics.median(first_200) * 1000:7.0f} ms  (min {min(first_200) * 1000:.0f})")
+
+
+if __name__ == "__main__":
+    main()
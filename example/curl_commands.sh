@@ -43,3 +43,63 @@ echo ""
 echo ">>> 5. Trigger Full Flow [Fetch -> Report] (POST /debug/full-flow)"
 curl -s -X POST "$HOST/debug/full-flow" \
      -u "$USERNAME:$PASSWORD" | python3 -m json.tool
+
+# 4. Protected Article Endpoints
+# ------------------------------
+
+echo ""
+echo ">>> 6. Full-text Search (GET /articles/search)"
+curl -s -G "$HOST/articles/search" \
+     --data-urlencode "q=人工智能" \
+     -u "$USERNAME:$PASSWORD" | python3 -m json.tool
+
+echo ""
+echo ">>> 7. List Articles (GET /articles) - pass next_cursor back as cursor for the next page"
+curl -s -G "$HOST/articles" \
+     --data-urlencode "min_score=8" \
+     --data-urlencode "limit=20" \
+     -u "$USERNAME:$PASSWORD" | python3 -m json.tool
+
+# 5. Protected Subscription Endpoints
+# -----------------------------------
+
+echo ""
+echo ">>> 8. Add Subscription (POST /subscriptions)"
+curl -s -X POST "$HOST/subscriptions" \
+     -H "Content-Type: application/json" \
+     -d '{"url": "https://example.com/feed.xml", "extraction": "main", "priority": 1}' \
+     -u "$USERNAME:$PASSWORD" | python3 -m json.tool
+
+echo ""
+echo ">>> 9. Import OPML (POST /subscriptions/import)"
+# curl -s -X POST "$HOST/subscriptions/import" \
+#      --data-binary @feeds.opml \
+#      -u "$USERNAME:$PASSWORD" | python3 -m json.tool
+
+echo ""
+echo ">>> 10. Export OPML (GET /subscriptions/export)"
+curl -s "$HOST/subscriptions/export" \
+     -u "$USERNAME:$PASSWORD"
+
+echo ""
+echo ">>> 11. Export Articles to Parquet (POST /export)"
+# Incremental since the last export; poll /debug/runs/{run_id} for the written files
+curl -s -X POST "$HOST/export" \
+     -H "Content-Type: application/json" \
+     -d '{"format": "parquet", "include_content": false}' \
+     -u "$USERNAME:$PASSWORD" | python3 -m json.tool
+
+echo ""
+echo ">>> 12. Re-analyze History (POST /backfills)"
+# Progress, throughput and ETA: GET /backfills/{id}; pause with POST /backfills/{id}/stop, continue with /resume
+curl -s -X POST "$HOST/backfills" \
+     -H "Content-Type: application/json" \
+     -d '{"date_from": "2026-01-01", "min_score": 6}' \
+     -u "$USERNAME:$PASSWORD" | python3 -m json.tool
+
+echo ""
+echo ">>> 13. WebSub Push Subscriptions (GET /debug/websub)"
+# Requires PUBLIC_BASE_URL; feeds advertising a hub are subscribed on their next fetch.
+# Try it locally with the stand-in hub: python example/websub_hub.py
+curl -s "$HOST/debug/websub" \
+     -u "$USERNAME:$PASSWORD" | python3 -m json.tool
@@ -0,0 +1,91 @@
+"""
+Minimal stand-in WebSub hub for local testing of push delivery.
+
+    python example/websub_hub.py [--port 8090]
+
+Serve a feed that advertises this hub, e.g.
+
+    <link rel="hub" href="http://localhost:8090/"/>
+    <link rel="self" href="http://localhost:8081/feed.xml"/>
+
+run CrawlWess with PUBLIC_BASE_URL=http://localhost:8000 and fetch the feed
+once (POST /debug/fetch) so it subscribes. After changing the feed, publish it:
+
+    curl -X POST http://localhost:8090/ -d hub.mode=publish -d hub.url=http://localhost:8081/feed.xml
+
+The hub fetches the topic and pushes it, signed, to every subscriber.
+Not for production: subscriptions live in memory and leases never expire.
+"""
+import argparse
+import hashlib
+import hmac
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode
+
+import requests
+
+subscribers: dict[tuple[str, str], str] = {} # (topic, callback) -> secret
+lock = threading.Lock()
+
+def verify_intent(mode: str, topic: str, callback: str, secret: str, lease: str):
+    challenge = secrets.token_urlsafe(16)
+    params = {"hub.mode": mode, "hub.topic": topic, "hub.challenge": challenge, "hub.lease_seconds": lease}
+    separator = "&" if "?" in callback else "?"
+    try:
+        response = requests.get(f"{callback}{separator}{urlencode(params)}", timeout=10)
+    except requests.RequestException as e:
+        print(f"Verification of {callback} failed: {e}")
+        return
+    if response.status_code // 100 != 2 or response.text != challenge:
+        print(f"Subscriber refused {mode} of {topic} ({response.status_code})")
+        return
+    with lock:
+        if mode == "subscribe":
+            subscribers[(topic, callback)] = secret
+        else:
+            subscribers.pop((topic, callback), None)
+    print(f"Verified {mode}: {topic} -> {callback}")
+
+def publish(topic: str):
+    response = requests.get(topic, timeout=10)
+    with lock:
+        targets = [(callback, secret) for (t, callback), secret in subscribers.items() if t == topic]
+    for callback, secret in targets:
+        signature = hmac.new(secret.encode("utf-8"), response.content, hashlib.sha256).hexdigest()
+        headers = {
+            "Content-Type": response.headers.get("Content-Type", "application/atom+xml"),
+            "Link": f'<{topic}>; rel="self"',
+            "X-Hub-Signature": f"sha256={signature}",
+        }
+        pushed = requests.post(callback, data=response.content, headers=headers, timeout=10)
+        print(f"Pushed {topic} to {callback}: {pushed.status_code}")
+
+class HubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+        mode = form.get("hub.mode")
+
+        if mode in ("subscribe", "unsubscribe") and form.get("hub.topic") and form.get("hub.callback"):
+            self.send_response(202)
+            self.end_headers()
+            # Verification is asynchronous, as with real hubs
+            threading.Thread(target=verify_intent, args=(
+                mode, form["hub.topic"], form["hub.callback"], form.get("hub.secret", ""), form.get("hub.lease_seconds", "864000")
+            )).start()
+        elif mode == "publish" and form.get("hub.url"):
+            self.send_response(204)
+            self.end_headers()
+            threading.Thread(target=publish, args=(form["hub.url"],)).start()
+        else:
+            self.send_response(400)
+            self.end_headers()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+    print(f"WebSub hub listening on http://localhost:{args.port}/")
+    ThreadingHTTPServer(("", args.port), HubHandler).serve_forever()
@@ -0,0 +1,75 @@
+"""
+Command-line entry points for maintenance tasks.
+
+    python -m src.cli export [--format parquet|arrow] [--full | --since ISO] [--content] [--out DIR]
+    python -m src.cli backfill [--from DATE] [--to DATE] [--subscription NAME] [--min-score N] [--max-score N] [--report]
+    python -m src.cli backfill --resume ID
+"""
+import argparse
+import json
+from datetime import datetime
+from src.util.database import init_db
+
+def cmd_export(args):
+    from src.services.export_service import export_service
+
+    result = export_service.export_articles(
+        output_dir=args.out,
+        fmt=args.format,
+        incremental=not args.full,
+        since=args.since,
+        include_content=args.content,
+    )
+    print(json.dumps(result, default=str, ensure_ascii=False, indent=2))
+
+def cmd_backfill(args):
+    from src.services.backfill_service import backfill_service
+
+    if args.resume:
+        job = backfill_service.resume(args.resume, background=False)
+        if not job:
+            raise ValueError(f"Backfill not found: {args.resume}")
+    else:
+        job_id = backfill_service.create(
+            date_from=args.date_from,
+            date_to=args.date_to,
+            subscription=args.subscription,
+            min_score=args.min_score,
+            max_score=args.max_score,
+            report=args.report,
+        )["id"]
+        backfill_service.run(job_id)
+        job = backfill_service.get(job_id)
+    print(json.dumps(job, default=str, ensure_ascii=False, indent=2))
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="python -m src.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Export articles to Parquet/Arrow files")
+    export.add_argument("--format", choices=("parquet", "arrow"), default="parquet")
+    export.add_argument("--out", help="Output directory (default: EXPORT_DIR)")
+    export.add_argument("--full", action="store_true", help="Ignore and do not advance the watermark")
+    export.add_argument("--since", type=datetime.fromisoformat, help="Only rows updated after this time")
+    export.add_argument("--content", action="store_true", help="Include cleaned markdown")
+    export.set_defaults(func=cmd_export)
+
+    backfill = commands.add_parser("backfill", help="Re-analyze processed articles (resumable)")
+    backfill.add_argument("--from", dest="date_from", help="Publish date from (YYYY-MM-DD)")
+    backfill.add_argument("--to", dest="date_to", help="Publish date to, inclusive")
+    backfill.add_argument("--subscription")
+    backfill.add_argument("--min-score", type=int)
+    backfill.add_argument("--max-score", type=int)
+    backfill.add_argument("--report", action="store_true", help="Let articles that only now reach MIN_SCORE into the next report")
+    backfill.add_argument("--resume", metavar="ID", help="Continue an existing backfill from its checkpoint")
+    backfill.set_defaults(func=cmd_backfill)
+
+    args = parser.parse_args(argv)
+    init_db()
+    try:
+        args.func(args)
+    except ValueError as e:
+        parser.exit(2, f"error: {e}\n")
+
+if __name__ == "__main__":
+    main()
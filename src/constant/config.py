@@ -6,30 +6,91 @@ from typing import Optional
 class Settings(BaseSettings):
     # App
     APP_ENV: str = "production"
+
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text" # "text" or "json" (one object per line)
+    LOG_QUEUE_SIZE: int = 10000 # Records buffered for the background writer; extra records are dropped and counted
+    LOG_SAMPLE_BURST: int = 20 # Per-article messages logged per window and message kind (0 = log all)
+    LOG_SAMPLE_INTERVAL_SECONDS: float = 60.0
     
     # RSS
-    RSS_URLS: str # Required from Env
+    RSS_URLS: str = "" # Comma-separated feeds, imported on startup while the subscriptions table is empty
+    SUBSCRIPTION_BATCH_SIZE: int = 200 # Feeds loaded per batch by the fetch job
+    FEED_FETCH_CONCURRENCY: int = 8 # Feeds fetched in parallel by the fetch job; HOST_MAX_CONCURRENCY still caps each host
+    FEED_TIMEOUT_SECONDS: float = 30.0 # Connect, read and total download budget
+    FEED_MAX_BYTES: int = 10 * 1024 * 1024
+    FEED_KNOWN_STREAK: int = 5 # Stop a newest-first feed after this many known entries in a row (0 = off)
+    PAGE_TIMEOUT_SECONDS: float = 15.0 # Article page download budget
+    PAGE_MAX_BYTES: int = 5 * 1024 * 1024
+    CONTENT_EXTRACTION: str = "main" # Default for fetched pages: "main" (article body only) or "full"
+
+    # Fetch politeness & circuit breakers
+    HOST_MAX_CONCURRENCY: int = 2
+    HOST_MIN_INTERVAL_SECONDS: float = 1.0
+    BREAKER_FAILURE_THRESHOLD: int = 3 # Consecutive failures before a source is skipped
+    BREAKER_COOLDOWN_SECONDS: int = 3600 # First cool-down, doubles on each failed probe
+    BREAKER_MAX_COOLDOWN_SECONDS: int = 86400
     
     # AI
     OPENAI_API_KEY: str # Required from Env
     OPENAI_BASE_URL: str
     OPENAI_MODEL: str
+    INSIGHT_CHUNK_TOKENS: int = 12000 # Token budget per map/reduce call in daily insight
+    INSIGHT_MAX_WORKERS: int = 4 # Parallel map calls in daily insight
     
     # Database
     DB_PATH: str = "data/news.db"
+    DB_JOURNAL_MODE: str = "WAL" # WAL lets readers run while the writer commits
+    DB_BUSY_TIMEOUT_SECONDS: float = 30.0 # How long a connection waits for the write lock before failing
+    DB_WRITE_BATCH_SIZE: int = 200 # Max queued writes applied in one transaction
+    DB_WRITE_MAX_DELAY_MS: int = 0 # Extra wait for more writes to join a transaction (0 = group what is already queued)
+    DB_WRITE_QUEUE_SIZE: int = 10000 # Producers block once this many writes are queued
+    ARCHIVE_AFTER_DAYS: int = 90 # Analyzed articles older than this move to articles_archive (0 = off)
+    ARCHIVE_BATCH_SIZE: int = 1000 # Articles moved per transaction
+
+    # Export (requires pyarrow)
+    EXPORT_DIR: str = "data/exports"
+    EXPORT_BATCH_SIZE: int = 5000 # Rows read and written per batch; bounds memory
+    EXPORT_COMPRESSION: str = "zstd"
     
+    # WebSub push
+    PUBLIC_BASE_URL: Optional[str] = None # Public URL of this app for hub callbacks; WebSub is off when unset
+    WEBSUB_LEASE_SECONDS: int = 10 * 86400 # Lease requested from hubs
+    WEBSUB_RENEW_BEFORE_SECONDS: int = 86400 # Renew leases expiring within this window
+    WEBSUB_VERIFY_TIMEOUT_SECONDS: int = 3600 # Give up on a subscription the hub has not verified
+    WEBSUB_RETRY_SECONDS: int = 86400 # Wait before retrying a hub that failed or denied
+    WEBSUB_SAFETY_POLL_HOURS: int = 24 # Pushed feeds are still polled this often
+
     # Notification
     NOTIFICATION_CHANNELS: str = "dingtalk"
     DING_WEBHOOK: Optional[str] = None
     TG_BOT_TOKEN: Optional[str] = None
     TG_CHAT_ID: Optional[str] = None
+    DING_RATE_PER_MINUTE: int = 20 # DingTalk robot cap
+    TG_RATE_PER_MINUTE: int = 20 # Telegram per-group cap
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    OUTBOX_BACKOFF_SECONDS: float = 2.0 # Doubles on every retry
+    OUTBOX_CLAIM_SECONDS: int = 300 # Lease on chunks a worker is sending; chunks of a crashed worker are picked up after it
+    OUTBOX_BATCH_RETRIES: int = 3 # Rounds of re-sending only the failed channels of a batch before giving up
     
     # Auth
     ADMIN_PASSWORD: str # Required from Env
     
     # Scheduling
     PUSH_TIME: str = "09:00"
+    JOB_LOCK_BACKEND: str = "sqlite" # Leader election backend: "sqlite" (shared DB) or "file" (same host only)
+    LOCK_DIR: str = "data/locks" # Used by the file backend
+    LEADER_LEASE_SECONDS: int = 60 # Leader renews every third of this
+    ANALYZE_INTERVAL_MINUTES: int = 10 # Pending-article analysis on every worker
+    ANALYZE_CLAIM_SECONDS: int = 600 # Per-article claim while it is being analyzed
+    ANALYZE_BATCH_SIZE: int = 100 # Pending articles read per keyset batch
+    JOB_RUN_LOCK_SECONDS: int = 120 # Cross-worker single-flight lease per job, renewed every third of this while it runs
     MIN_SCORE: int = 8
+    BACKFILL_CONCURRENCY: int = 2 # Parallel re-analysis calls per backfill
+    BACKFILL_RATE_PER_MINUTE: int = 30 # LLM calls per minute per backfill, leaving room for new articles
+    BACKFILL_BATCH_SIZE: int = 20 # Articles per checkpoint
+    BACKFILL_LEASE_SECONDS: int = 600 # Lease of the worker running a backfill, renewed every batch
     
     # Storage
     STORAGE_DIR: str = "data/articles"
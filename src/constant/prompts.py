@@ -33,4 +33,15 @@ DAILY_INSIGHT_PROMPT = """
 
 DAILY_INSIGHT_SYS_PROMPT = """
 请合并今天高分文章的摘要，写一段简短总结（0-1000字），确保忠实于原文并去除重复叙事，不添加任何评价。
-"""
\ No newline at end of file
+"""
+
+# --- Prompts for Hierarchical (Map-Reduce) Daily Insight ---
+DAILY_INSIGHT_MAP_SYS_PROMPT = """
+以下是今天部分高分文章的摘要。请将它们合并为一段简短的中间总结（0-500字），保留关键事实和结论，去除重复叙事，不添加任何评价。
+"""
+
+DAILY_INSIGHT_REDUCE_PROMPT = """
+以下是今天高分文章的分组总结：
+
+{partials_text}
+"""
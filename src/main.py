@@ -1,15 +1,30 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from src.constant.config import settings
-from src.util.database import init_db
+from src.util.database import init_db, SessionLocal
+from src.util.job_lock import leader_elector
+from src.util.db_writer import db_writer
 from src.services.rss_service import rss_service
 from src.services.report_service import report_service
 from src.services.storage_service import storage_service
+from src.services.ai_service import ai_service
+from src.services.search_service import search_service
+from src.services.archive_service import archive_service
+from src.services.export_service import export_service
+from src.services.backfill_service import backfill_service
+from src.services.websub_service import websub_service
+from src.services.fetch_scheduler import fetch_scheduler
+from src.services.subscription_service import subscription_service, DuplicateSubscription
+from src.services.job_runner import job_runner
 from src.util.logger import logger
+from datetime import date, datetime, timedelta
+from functools import wraps
 import pytz
 import secrets
 
@@ -29,15 +44,55 @@ def verify_admin(credentials: HTTPBasicCredentials = Depends(security)):
 
 def job_fetch_rss():
     logger.info("Starting scheduled RSS fetch job...")
-    urls = [url.strip() for url in settings.RSS_URLS.split(",") if url.strip()]
-    if not urls:
-        logger.warning("No RSS URLs configured.")
+    count = 0
+    safety_poll_before = datetime.now() - timedelta(hours=settings.WEBSUB_SAFETY_POLL_HOURS)
+
+    def fetch(sub: dict):
+        rss_service.fetch_and_process_feed(sub["url"], sub["extraction"], sub["fetch_mode"] or "incremental")
+
+    # Feeds are fetched in parallel; fetch_scheduler limits requests per host
+    with ThreadPoolExecutor(max_workers=max(1, settings.FEED_FETCH_CONCURRENCY), thread_name_prefix="feed") as executor:
+        for batch in subscription_service.iter_enabled_batches(settings.SUBSCRIPTION_BATCH_SIZE):
+            # Feeds delivered by WebSub push are only polled as a periodic safety net
+            pushed = websub_service.active_feed_urls([sub["url"] for sub in batch])
+            polled = [
+                sub for sub in batch
+                if sub["url"] not in pushed or not sub["last_fetched_at"] or sub["last_fetched_at"] < safety_poll_before
+            ]
+            list(executor.map(fetch, polled))
+            subscription_service.mark_fetched([sub["id"] for sub in polled])
+            count += len(batch)
+    if not count:
+        logger.warning("No enabled subscriptions.")
         return
-    
-    for url in urls:
-        rss_service.fetch_and_process_feed(url)
+
+    # Retry report deliveries interrupted by a restart
+    report_service.retry_pending_deliveries()
     logger.info("RSS fetch job completed.")
 
+def job_analyze_pending():
+    # Runs on every worker; per-article claims split the backlog between them
+    with SessionLocal() as db:
+        rss_service.process_pending_articles(db)
+
+def job_full_flow():
+    # Joins a fetch or report that is already running instead of starting a second one
+    job_runner.run_and_wait("fetch_rss", job_fetch_rss, follow_up=True)
+    job_runner.run_and_wait("daily_report", job_daily_report)
+
+def leader_only(name: str, job):
+    """
+    Scheduled jobs fire in every worker; only the elected leader runs them.
+    Runs go through job_runner, so they coalesce with manual triggers.
+    """
+    @wraps(job)
+    def wrapper():
+        if not leader_elector.is_leader:
+            logger.info(f"Skipping {name}: not the scheduler leader")
+            return
+        job_runner.trigger(name, job)
+    return wrapper
+
 def job_daily_report():
     logger.info("Starting scheduled daily report job...")
     report_service.send_daily_report()
@@ -46,6 +101,8 @@ def job_daily_report():
 def job_cleanup():
     logger.info("Starting monthly cleanup job...")
     storage_service.cleanup_old_files(days=30)
+    ai_service.prune_insight_cache(days=30)
+    archive_service.archive_old_articles()
     logger.info("Cleanup job completed.")
 
 @asynccontextmanager
@@ -53,25 +110,47 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Application startup")
     init_db()
+    search_service.init_index()
+    seeded = subscription_service.seed_from_env(settings.RSS_URLS)
+    if seeded:
+        logger.info(f"Imported {seeded} feeds from RSS_URLS into subscriptions")
     
+    # Only one worker in the cluster runs the scheduled jobs below
+    leader_elector.start()
+
     # Add jobs
     # 1. Fetch RSS every hour
-    scheduler.add_job(job_fetch_rss, IntervalTrigger(hours=1), id="fetch_rss", replace_existing=True)
+    scheduler.add_job(leader_only("fetch_rss", job_fetch_rss), IntervalTrigger(hours=1), id="fetch_rss", replace_existing=True)
     
     # 2. Daily Report at 09:00 Beijing Time
 
     hour, minute = map(int, settings.PUSH_TIME.split(":"))
-    scheduler.add_job(job_daily_report, CronTrigger(hour=hour, minute=minute, timezone='Asia/Shanghai'), id="daily_report", replace_existing=True)
+    scheduler.add_job(leader_only("daily_report", job_daily_report), CronTrigger(hour=hour, minute=minute, timezone='Asia/Shanghai'), id="daily_report", replace_existing=True)
 
     # 3. Cleanup Job (Monxthly, e.g., 1st day of month at 03:00)
-    scheduler.add_job(job_cleanup, CronTrigger(day=1, hour=3, minute=0, timezone='Asia/Shanghai'), id="cleanup", replace_existing=True)
+    scheduler.add_job(leader_only("cleanup", job_cleanup), CronTrigger(day=1, hour=3, minute=0, timezone='Asia/Shanghai'), id="cleanup", replace_existing=True)
+
+    # 4. Renew WebSub leases and drop subscriptions of removed feeds
+    scheduler.add_job(leader_only("websub_renew", websub_service.renew_leases), IntervalTrigger(hours=1), id="websub_renew", replace_existing=True)
+
+    # 5. Pipeline work shared by all workers
+    scheduler.add_job(lambda: job_runner.trigger("analyze_pending", job_analyze_pending, cluster_lock=False), IntervalTrigger(minutes=settings.ANALYZE_INTERVAL_MINUTES), id="analyze_pending", replace_existing=True)
+    # Picks up backfills interrupted by a crash or deploy once their lease expires
+    scheduler.add_job(backfill_service.resume_interrupted, IntervalTrigger(minutes=settings.ANALYZE_INTERVAL_MINUTES), id="resume_backfills", replace_existing=True)
 
     scheduler.start()
+    backfill_service.resume_interrupted()
     yield
     
     # Shutdown
     logger.info("Application shutdown")
     scheduler.shutdown()
+    job_runner.shutdown()
+    backfill_service.shutdown()
+    websub_service.shutdown()
+    leader_elector.stop()
+    # Last: everything above may still queue writes
+    db_writer.shutdown()
 
 app = FastAPI(title="CrawlWess RSS Agent", lifespan=lifespan)
 
@@ -80,46 +159,280 @@ def read_root():
     return {"status": "running", "timezone": "Asia/Shanghai"}
 
 from pydantic import BaseModel
+from typing import Literal
+
+# --- Subscription Endpoints ---
+
+class SubscriptionCreate(BaseModel):
+    url: str
+    title: str | None = None
+    enabled: bool = True
+    fetch_mode: Literal["incremental", "full"] = "incremental"
+    extraction: Literal["main", "full"] | None = None
+    priority: int = 0
+
+class SubscriptionUpdate(BaseModel):
+    url: str | None = None
+    title: str | None = None
+    enabled: bool | None = None
+    fetch_mode: Literal["incremental", "full"] | None = None
+    extraction: Literal["main", "full"] | None = None
+    priority: int | None = None
+
+@app.get("/subscriptions", dependencies=[Depends(verify_admin)])
+def list_subscriptions(
+    enabled: bool | None = None,
+    cursor: int = 0,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """List subscriptions by id. Pass 'next_cursor' back as 'cursor' for the next page (Authenticated)."""
+    return subscription_service.list_subscriptions(enabled=enabled, after_id=cursor, limit=limit)
+
+@app.post("/subscriptions", dependencies=[Depends(verify_admin)], status_code=status.HTTP_201_CREATED)
+def create_subscription(body: SubscriptionCreate):
+    """Add a subscription (Authenticated)"""
+    try:
+        return subscription_service.create(**body.model_dump())
+    except DuplicateSubscription as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@app.post("/subscriptions/import", dependencies=[Depends(verify_admin)])
+async def import_subscriptions(request: Request):
+    """Import feeds from an OPML document sent as the request body (Authenticated)"""
+    try:
+        # Thousands of inserts: keep them off the event loop
+        return await run_in_threadpool(subscription_service.import_opml, await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@app.get("/subscriptions/export", dependencies=[Depends(verify_admin)])
+def export_subscriptions():
+    """Export all subscriptions as OPML (Authenticated)"""
+    return Response(content=subscription_service.export_opml(), media_type="text/x-opml")
+
+@app.get("/subscriptions/{subscription_id}", dependencies=[Depends(verify_admin)])
+def get_subscription(subscription_id: int):
+    """Get one subscription (Authenticated)"""
+    sub = subscription_service.get(subscription_id)
+    if not sub:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Subscription not found")
+    return sub
+
+@app.patch("/subscriptions/{subscription_id}", dependencies=[Depends(verify_admin)])
+def update_subscription(subscription_id: int, body: SubscriptionUpdate):
+    """Update fields of a subscription (Authenticated)"""
+    try:
+        sub = subscription_service.update(subscription_id, **body.model_dump(exclude_unset=True))
+    except DuplicateSubscription as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not sub:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Subscription not found")
+    return sub
+
+@app.delete("/subscriptions/{subscription_id}", dependencies=[Depends(verify_admin)])
+def delete_subscription(subscription_id: int):
+    """Delete a subscription (Authenticated)"""
+    if not subscription_service.delete(subscription_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Subscription not found")
+    return {"message": "Subscription deleted"}
+
+# --- Article Endpoints ---
+
+@app.get("/articles/search", dependencies=[Depends(verify_admin)])
+def search_articles(
+    q: str = Query(..., min_length=1),
+    subscription: str | None = None,
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Ranked full-text search over title, summary and content (Authenticated)."""
+    return {"items": search_service.search(q, limit=limit, subscription=subscription)}
+
+@app.get("/articles", dependencies=[Depends(verify_admin)])
+def list_articles(
+    subscription: str | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    min_score: int | None = None,
+    max_score: int | None = None,
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=500)
+):
+    """List articles newest first. Pass 'next_cursor' back as 'cursor' for the next page (Authenticated)."""
+    try:
+        return search_service.list_articles(subscription, date_from, date_to, min_score, max_score, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 # --- Debug Endpoints ---
 
+class ExportRequest(BaseModel):
+    format: Literal["parquet", "arrow"] = "parquet"
+    full: bool = False # Ignore and do not advance the watermark
+    since: datetime | None = None # Only rows updated after this time
+    include_content: bool = False # Add cleaned markdown where the file still exists
+
+@app.post("/export", dependencies=[Depends(verify_admin)])
+async def export_articles(request: ExportRequest = None):
+    """Export articles to EXPORT_DIR as Parquet/Arrow; incremental by default (Authenticated). Poll /debug/runs/{run_id} for the files."""
+    request = request or ExportRequest()
+    try:
+        export_service.check_available()
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+    run = job_runner.trigger(f"export:{request.format}", lambda: export_service.export_articles(
+        fmt=request.format,
+        incremental=not request.full,
+        since=request.since,
+        include_content=request.include_content,
+    ))
+    return {"message": "Export triggered", "run": run}
+
+class BackfillRequest(BaseModel):
+    date_from: date | None = None # Publish date range, inclusive
+    date_to: date | None = None
+    subscription: str | None = None
+    min_score: int | None = None
+    max_score: int | None = None
+    report: bool = False # Let articles that only now reach MIN_SCORE into the next report
+
+@app.post("/backfills", dependencies=[Depends(verify_admin)], status_code=status.HTTP_201_CREATED)
+def create_backfill(body: BackfillRequest):
+    """Re-analyze processed articles matching the filters, in the background (Authenticated)"""
+    try:
+        job = backfill_service.create(**body.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    backfill_service.start(job["id"])
+    return job
+
+@app.get("/backfills", dependencies=[Depends(verify_admin)])
+def list_backfills(limit: int = Query(20, ge=1, le=200)):
+    """Recent backfills with progress, throughput and ETA (Authenticated)"""
+    return {"items": backfill_service.list_jobs(limit)}
+
+@app.get("/backfills/{job_id}", dependencies=[Depends(verify_admin)])
+def get_backfill(job_id: str):
+    """Progress, throughput and ETA of a backfill (Authenticated)"""
+    job = backfill_service.get(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Backfill not found")
+    return job
+
+@app.post("/backfills/{job_id}/stop", dependencies=[Depends(verify_admin)])
+def stop_backfill(job_id: str):
+    """Stop a backfill after its current batch; it can be resumed (Authenticated)"""
+    job = backfill_service.stop(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Backfill not found")
+    return job
+
+@app.post("/backfills/{job_id}/resume", dependencies=[Depends(verify_admin)])
+def resume_backfill(job_id: str):
+    """Resume a stopped or failed backfill from its checkpoint (Authenticated)"""
+    job = backfill_service.resume(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Backfill not found")
+    return job
+
+@app.get("/websub/callback/{token}", include_in_schema=False)
+def websub_verify(
+    token: str,
+    mode: str = Query(..., alias="hub.mode"),
+    topic: str = Query(..., alias="hub.topic"),
+    challenge: str | None = Query(None, alias="hub.challenge"),
+    lease_seconds: int | None = Query(None, alias="hub.lease_seconds"),
+    reason: str | None = Query(None, alias="hub.reason"),
+):
+    """WebSub intent verification. Authenticated by the unguessable callback token."""
+    answer = websub_service.verify(token, mode, topic, challenge, lease_seconds, reason)
+    if answer is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown subscription")
+    return Response(content=answer, media_type="text/plain")
+
+async def _read_body_limited(request: Request, limit: int) -> bytes:
+    """
+    Read the request body, answering 413 as soon as it exceeds `limit` bytes
+    (up front when Content-Length says so) instead of buffering all of it.
+    """
+    too_large = HTTPException(status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=f"Body exceeds {limit} bytes")
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > limit:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > limit:
+            raise too_large
+    return bytes(body)
+
+@app.post("/websub/callback/{token}", include_in_schema=False, status_code=status.HTTP_202_ACCEPTED)
+async def websub_push(token: str, request: Request):
+    """WebSub content distribution. Authenticated by X-Hub-Signature (HMAC of the body)."""
+    body = await _read_body_limited(request, settings.FEED_MAX_BYTES)
+    # Always 2xx: a hub must not learn whether a forged signature was checked.
+    # receive() queries and commits; in the threadpool a busy database cannot stall the event loop
+    await run_in_threadpool(websub_service.receive, token, body, request.headers)
+    return Response(status_code=status.HTTP_202_ACCEPTED)
+
+@app.get("/debug/websub", dependencies=[Depends(verify_admin)])
+def debug_websub():
+    """WebSub subscriptions, their state and lease expiry (Authenticated)"""
+    return {"enabled": websub_service.enabled, "items": websub_service.list_subscriptions()}
+
+@app.get("/debug/sources", dependencies=[Depends(verify_admin)])
+def debug_sources():
+    """Circuit breaker state and failure rate per feed and host (Authenticated)"""
+    return {"items": fetch_scheduler.list_health()}
+
 class FetchRequest(BaseModel):
     url: str | None = None
+    extraction: str | None = None # "main" or "full"
 
 @app.post("/debug/fetch", dependencies=[Depends(verify_admin)])
 async def debug_fetch(request: FetchRequest = None):
     """Trigger RSS fetch immediately (Authenticated). Optional: provide specific 'url'."""
     if request and request.url:
         logger.info(f"Triggering manual fetch for: {request.url}")
-        scheduler.add_job(rss_service.fetch_and_process_feed, args=[request.url])
-        return {"message": f"RSS fetch job triggered for {request.url}"}
+        url, extraction = request.url, request.extraction
+        run = job_runner.trigger(f"fetch:{url}", lambda: rss_service.fetch_and_process_feed(url, extraction), follow_up=True)
+        return {"message": f"RSS fetch job triggered for {url}", "run": run}
     else:
         logger.info("Triggering configured RSS fetch job")
-        scheduler.add_job(job_fetch_rss)
-        return {"message": "RSS fetch job triggered for all configured URLs"}
+        run = job_runner.trigger("fetch_rss", job_fetch_rss, follow_up=True)
+        return {"message": "RSS fetch job triggered for all enabled subscriptions", "run": run}
 
 @app.post("/debug/report", dependencies=[Depends(verify_admin)])
 async def debug_report():
     """Trigger Daily Report immediately (Authenticated)"""
-    scheduler.add_job(job_daily_report)
-    return {"message": "Daily report job triggered"}
+    run = job_runner.trigger("daily_report", job_daily_report)
+    return {"message": "Daily report job triggered", "run": run}
 
 @app.post("/debug/cleanup", dependencies=[Depends(verify_admin)])
 async def debug_cleanup():
     """Trigger Cleanup immediately (Authenticated)"""
-    scheduler.add_job(job_cleanup)
-    return {"message": "Cleanup job triggered"}
+    run = job_runner.trigger("cleanup", job_cleanup)
+    return {"message": "Cleanup job triggered", "run": run}
+
+@app.post("/debug/reindex", dependencies=[Depends(verify_admin)])
+async def debug_reindex():
+    """Index processed articles missing from the search index (Authenticated)"""
+    run = job_runner.trigger("reindex", search_service.rebuild_index)
+    return {"message": "Search index rebuild triggered", "run": run}
 
 @app.post("/debug/full-flow", dependencies=[Depends(verify_admin)])
 async def debug_full_flow():
     """Trigger Full Flow: Fetch -> Report (Authenticated)"""
-    # Chain them or just add both? Adding both puts them in queue.
-    # APScheduler runs in thread pool, order might not be strict if pool size > 1.
-    # But usually fine. Or define a sequence job.
-    
-    def full_flow():
-        job_fetch_rss()
-        job_daily_report()
-        
-    scheduler.add_job(full_flow)
-    return {"message": "Full flow (Fetch -> Report) triggered"}
+    run = job_runner.trigger("full_flow", job_full_flow)
+    return {"message": "Full flow (Fetch -> Report) triggered", "run": run}
+
+@app.get("/debug/runs/{run_id}", dependencies=[Depends(verify_admin)])
+def debug_run_status(run_id: str):
+    """Status of a job run triggered on this worker; run history is per process (Authenticated)"""
+    run = job_runner.get_run(run_id)
+    if not run:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+    return run
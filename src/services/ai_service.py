@@ -1,16 +1,30 @@
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import hashlib
 import json
+import time
 from src.constant.config import settings
 from src.util.logger import logger
+from src.util.lazy import LazyService
+from src.util.database import SessionLocal, InsightCache
 from src.constant.prompts import (
     ANALYZE_ARTICLE_PROMPT, 
     ANALYZE_ARTICLE_SYS_PROMPT, 
     DAILY_INSIGHT_PROMPT, 
-    DAILY_INSIGHT_SYS_PROMPT
+    DAILY_INSIGHT_SYS_PROMPT,
+    DAILY_INSIGHT_MAP_SYS_PROMPT,
+    DAILY_INSIGHT_REDUCE_PROMPT
 )
 
+INSIGHT_ERROR_MESSAGE = "由于错误无法生成今日点评。"
+ANALYSIS_ERROR_SUMMARY = "AI 分析失败 (多次重试后)"
+# Extra attempts for failed map chunks before the whole insight is given up
+MAP_RETRIES = 2
+
 class AIService:
     def __init__(self):
+        # Imported here: the openai package dominates import time otherwise
+        from openai import OpenAI
         self.client = OpenAI(
             api_key=settings.OPENAI_API_KEY,
             base_url=settings.OPENAI_BASE_URL
@@ -60,7 +74,7 @@ class AIService:
         # Fallback if all retries fail
         return {
             "score": 0,
-            "summary": "AI 分析失败 (多次重试后)",
+            "summary": ANALYSIS_ERROR_SUMMARY,
             "is_ad": False
         }
 
@@ -68,30 +82,147 @@ class AIService:
         """
         Generate a daily insight summary based on a list of articles.
         articles_data: list of dicts with 'title' and 'summary'.
+        Small days go through a single call. Larger days are split into chunks
+        by token budget, the chunks are summarized in parallel (map) and the
+        partial summaries are merged (reduce). Every call is cached by prompt
+        hash, so a re-run only recomputes the chunks whose articles changed.
         """
         if not articles_data:
             return "今天没有高分文章。"
 
-        articles_text = ""
-        for i, art in enumerate(articles_data, 1):
-            articles_text += f"{i}. 标题: {art['title']}\n   摘要: {art['summary']}\n\n"
+        budget = settings.INSIGHT_CHUNK_TOKENS
+        items = [
+            f"{i}. 标题: {art['title']}\n   摘要: {art['summary']}\n\n"
+            for i, art in enumerate(articles_data, 1)
+        ]
+
+        if sum(_estimate_tokens(item) for item in items) <= budget:
+            prompt = DAILY_INSIGHT_PROMPT.format(articles_text="".join(items))
+            result = self._cached_completion("reduce", DAILY_INSIGHT_SYS_PROMPT, prompt)
+            return result if result else INSIGHT_ERROR_MESSAGE
+
+        # Map: summarize each chunk in parallel, then keep reducing until it fits.
+        # A missing chunk would leave whole groups of articles out of an insight
+        # that then gets cached, so any chunk failing fails the insight.
+        partials = self._map_chunks(items, DAILY_INSIGHT_MAP_SYS_PROMPT, DAILY_INSIGHT_PROMPT, "articles_text")
+        while partials and len(partials) > 1 and sum(_estimate_tokens(p) for p in partials) > budget:
+            logger.info(f"Daily insight: {len(partials)} partial summaries still exceed budget, reducing again")
+            reduced = self._map_chunks(
+                [f"{p}\n\n" for p in partials],
+                DAILY_INSIGHT_MAP_SYS_PROMPT,
+                DAILY_INSIGHT_REDUCE_PROMPT,
+                "partials_text"
+            )
+            if reduced is None:
+                partials = None
+                break
+            if len(reduced) >= len(partials):
+                break
+            partials = reduced
 
-        # Truncate if too many articles
-        articles_text = articles_text[:50000]
+        if not partials:
+            return INSIGHT_ERROR_MESSAGE
 
-        prompt = DAILY_INSIGHT_PROMPT.format(articles_text=articles_text)
+        # Reduce
+        prompt = DAILY_INSIGHT_REDUCE_PROMPT.format(partials_text="\n\n".join(partials))
+        result = self._cached_completion("reduce", DAILY_INSIGHT_SYS_PROMPT, prompt)
+        return result if result else INSIGHT_ERROR_MESSAGE
+
+    def _map_chunks(self, items: list[str], sys_prompt: str, template: str, field: str) -> list[str] | None:
+        """
+        Pack items greedily into chunks under the token budget and summarize
+        each chunk in parallel. Chunk boundaries only depend on the items
+        before them, so appending a late article only changes the last chunk.
+        Failed chunks are retried MAP_RETRIES times; returns None if any
+        chunk still fails, never a result with chunks missing.
+        """
+        budget = settings.INSIGHT_CHUNK_TOKENS
+        chunks: list[list[str]] = []
+        current: list[str] = []
+        current_tokens = 0
+        for item in items:
+            tokens = _estimate_tokens(item)
+            if current and current_tokens + tokens > budget:
+                chunks.append(current)
+                current, current_tokens = [], 0
+            current.append(item)
+            current_tokens += tokens
+        if current:
+            chunks.append(current)
+
+        logger.info(f"Daily insight: mapping {len(items)} items in {len(chunks)} chunks")
+        prompts = [template.format(**{field: "".join(chunk)}) for chunk in chunks]
+        results: list[str | None] = [None] * len(prompts)
+        with ThreadPoolExecutor(max_workers=max(1, settings.INSIGHT_MAX_WORKERS)) as executor:
+            for attempt in range(MAP_RETRIES + 1):
+                pending = [i for i, r in enumerate(results) if not r]
+                if not pending:
+                    break
+                if attempt:
+                    logger.warning(f"Daily insight: retrying {len(pending)} failed chunks (attempt {attempt + 1})")
+                    time.sleep(2 ** attempt)
+                for i, result in zip(pending, executor.map(lambda i: self._cached_completion("map", sys_prompt, prompts[i]), pending)):
+                    results[i] = result
+
+        failed = sum(1 for r in results if not r)
+        if failed:
+            logger.error(f"Daily insight: {failed} of {len(chunks)} chunks failed, not merging a partial insight")
+            return None
+        return results
+
+    def _cached_completion(self, stage: str, sys_prompt: str, prompt: str) -> str | None:
+        """
+        Chat completion backed by the insight_cache table.
+        Returns None on failure; failures are not cached.
+        """
+        cache_key = hashlib.sha256(
+            f"{settings.OPENAI_MODEL}\x00{sys_prompt}\x00{prompt}".encode("utf-8")
+        ).hexdigest()
+
+        with SessionLocal() as db:
+            cached = db.get(InsightCache, cache_key)
+            if cached:
+                logger.info(f"Daily insight: {stage} cache hit ({cache_key[:12]})")
+                return cached.content
 
         try:
             response = self.client.chat.completions.create(
                 model=settings.OPENAI_MODEL,
                 messages=[
-                    {"role": "system", "content": DAILY_INSIGHT_SYS_PROMPT},
+                    {"role": "system", "content": sys_prompt},
                     {"role": "user", "content": prompt}
                 ]
             )
-            return response.choices[0].message.content.strip()
+            content = response.choices[0].message.content.strip()
         except Exception as e:
-            logger.error(f"Error generating daily insight: {e}")
-            return "由于错误无法生成今日点评。"
+            logger.error(f"Error generating daily insight ({stage}): {e}")
+            return None
+
+        with SessionLocal() as db:
+            try:
+                db.merge(InsightCache(cache_key=cache_key, stage=stage, content=content))
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"Failed to cache daily insight ({stage}): {e}")
+        return content
+
+    def prune_insight_cache(self, days: int = 30):
+        """
+        Delete cached insight calls older than `days`.
+        """
+        cutoff = datetime.now() - timedelta(days=days)
+        with SessionLocal() as db:
+            count = db.query(InsightCache).filter(InsightCache.created_at < cutoff).delete(synchronize_session=False)
+            db.commit()
+        logger.info(f"Pruned {count} cached insight entries.")
+
+
+def _estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate without a tokenizer: ~3 UTF-8 bytes per token.
+    Roughly one token per CJK character and per 3-4 ASCII characters.
+    """
+    return len(text.encode("utf-8")) // 3 + 1
 
-ai_service = AIService()
+ai_service = LazyService(AIService)
@@ -0,0 +1,103 @@
+import hashlib
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from src.constant.config import settings
+from src.util import article_store
+from src.util.database import engine, Article, ArchivedArticle, SeenEntry
+from src.util.logger import logger
+
+ARCHIVE_COLUMNS = (
+    "id", "entry_id", "link", "title", "subscription_name", "publish_date", "score",
+    "summary", "is_ad", "created_at", "updated_at", "is_processed", "is_sent",
+)
+
+def entry_key(entry_id: str) -> int:
+    """
+    Signed 64-bit hash of an entry id, as stored in seen_entries.
+    """
+    digest = hashlib.blake2b(entry_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+class ArchiveService:
+    """
+    Keeps the articles table small. Analyzed articles past ARCHIVE_AFTER_DAYS
+    that can no longer appear in a report move to articles_archive in
+    batches; the hash of their entry_id goes into seen_entries so the fetch
+    job still recognizes them as known. Their search index rows stay, and
+    search/listing read both tables, so archived articles remain findable.
+    """
+    def archive_old_articles(self, days: int | None = None, batch_size: int | None = None) -> int:
+        days = settings.ARCHIVE_AFTER_DAYS if days is None else days
+        batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+        if days <= 0:
+            return 0
+
+        cutoff = datetime.now() - timedelta(days=days)
+        logger.info(f"Archiving articles created before {cutoff:%Y-%m-%d}...")
+        total = 0
+        last_id = 0
+        while True:
+            with engine.begin() as conn:
+                ids = conn.execute(
+                    select(Article.id)
+                    .where(
+                        Article.id > last_id,
+                        Article.created_at < cutoff,
+                        Article.is_processed == True,
+                        # Never archive what the next report would still send
+                        or_(Article.is_sent == True, Article.report_excluded == True, Article.is_ad == True, Article.score < settings.MIN_SCORE),
+                        # SQLite reuses the highest rowid once it is deleted; keep it so ids stay unique
+                        Article.id < select(func.max(Article.id)).scalar_subquery(),
+                    )
+                    .order_by(Article.id)
+                    .limit(batch_size)
+                ).scalars().all()
+                if not ids:
+                    break
+                last_id = ids[-1]
+                self._move(conn, ids)
+            total += len(ids)
+            logger.info(f"Archived {total} articles so far")
+
+        logger.info(f"Archiving completed. Moved {total} articles.")
+        return total
+
+    def _move(self, conn, ids: list[int]):
+        """
+        Copy rows to the archive, record their dedup keys and drop them from
+        the articles table, in the caller's transaction. The articles_fts rows
+        are kept: archived ids stay unique (the max id is never archived).
+        """
+        for chunk in article_store.chunked(ids):
+            columns = [getattr(Article, name) for name in ARCHIVE_COLUMNS]
+            conn.execute(
+                sqlite_insert(ArchivedArticle)
+                .from_select(list(ARCHIVE_COLUMNS), select(*columns).where(Article.id.in_(chunk)))
+                .on_conflict_do_nothing()
+            )
+            keys = [
+                {"key": entry_key(entry_id)}
+                for entry_id in conn.execute(select(Article.entry_id).where(Article.id.in_(chunk))).scalars()
+                if entry_id
+            ]
+            if keys:
+                conn.execute(sqlite_insert(SeenEntry).on_conflict_do_nothing(), keys)
+            conn.execute(delete(Article).where(Article.id.in_(chunk)))
+
+    def seen_entry_ids(self, entry_ids: list[str], db: Session) -> set[str]:
+        """
+        Which of `entry_ids` belong to archived articles.
+        """
+        by_key = {entry_key(e): e for e in entry_ids if e}
+        found = set()
+        keys = list(by_key)
+        for chunk in article_store.chunked(keys):
+            found.update(db.execute(select(SeenEntry.key).where(SeenEntry.key.in_(chunk))).scalars())
+        return {by_key[k] for k in found}
+
+    def is_archived(self, entry_id: str, db: Session) -> bool:
+        return bool(entry_id) and db.get(SeenEntry, entry_key(entry_id)) is not None
+
+archive_service = ArchiveService()
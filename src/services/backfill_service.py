@@ -0,0 +1,325 @@
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as dt_time, timedelta
+from sqlalchemy import func, select
+from src.constant.config import settings
+from src.services.ai_service import ai_service, ANALYSIS_ERROR_SUMMARY
+from src.services.report_service import report_service
+from src.services.search_service import search_service
+from src.services.storage_service import storage_service
+from src.util import article_store
+from src.util.database import SessionLocal, Article, BackfillJob
+from src.util.db_writer import db_writer
+from src.util.job_lock import try_lock, unlock
+from src.util.logger import logger
+from src.util.rate_limiter import RateLimiter
+
+FILTER_FIELDS = ("date_from", "date_to", "subscription", "min_score", "max_score")
+
+class BackfillService:
+    """
+    Re-analyzes already processed articles, e.g. after a prompt or model change.
+    - Selection by publish date, subscription and score range.
+    - Runs in its own threads (not the job runner), with BACKFILL_CONCURRENCY
+      parallel calls under BACKFILL_RATE_PER_MINUTE, so scheduled jobs keep running.
+    - Progress is checkpointed in backfill_jobs after every batch. A job left
+      "running" by a crash or deploy is resumed from its checkpoint by
+      resume_interrupted(); a renewable lease keeps it on one worker.
+    - Articles already due for the next report get their report fragment
+      refreshed. Old unsent articles that only now reach MIN_SCORE are kept
+      out of reports unless the job was created with report=True.
+    """
+    def __init__(self):
+        self._threads: dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _criteria(self, filters: dict, max_id: int) -> list:
+        criteria = [Article.is_processed == True, Article.id <= max_id]
+        if filters.get("date_from"):
+            criteria.append(Article.publish_date >= datetime.combine(date.fromisoformat(filters["date_from"]), dt_time.min))
+        if filters.get("date_to"):
+            criteria.append(Article.publish_date < datetime.combine(date.fromisoformat(filters["date_to"]) + timedelta(days=1), dt_time.min))
+        if filters.get("subscription"):
+            criteria.append(Article.subscription_name == filters["subscription"])
+        if filters.get("min_score") is not None:
+            criteria.append(Article.score >= filters["min_score"])
+        if filters.get("max_score") is not None:
+            criteria.append(Article.score <= filters["max_score"])
+        return criteria
+
+    def _to_dict(self, job: BackfillJob) -> dict:
+        processed = job.done + job.skipped + job.failed
+        rate = None
+        eta_seconds = None
+        if job.status == "running" and job.run_started_at:
+            elapsed = (datetime.now() - job.run_started_at).total_seconds()
+            if elapsed > 0 and processed > job.run_start_count:
+                rate = (processed - job.run_start_count) / elapsed * 60
+                eta_seconds = int(max(job.total - processed, 0) / rate * 60)
+        return {
+            "id": job.id,
+            "status": job.status,
+            "filters": json.loads(job.filters),
+            "report": job.report,
+            "total": job.total,
+            "processed": processed,
+            "done": job.done,
+            "skipped": job.skipped,
+            "failed": job.failed,
+            "last_id": job.last_id,
+            "rate_per_minute": round(rate, 2) if rate is not None else None,
+            "eta_seconds": eta_seconds,
+            "last_error": job.last_error,
+            "created_at": job.created_at,
+            "updated_at": job.updated_at,
+            "finished_at": job.finished_at,
+        }
+
+    def create(self, report: bool = False, **filters) -> dict:
+        """
+        Record a new backfill over the current matching articles. Does not start it.
+        report: let articles the new analysis qualifies into the next report.
+        Raises ValueError on invalid filters.
+        """
+        filters = {k: v for k, v in filters.items() if k in FILTER_FIELDS and v is not None}
+        for key in ("date_from", "date_to"):
+            if isinstance(filters.get(key), date):
+                filters[key] = filters[key].isoformat()
+            elif key in filters:
+                try:
+                    date.fromisoformat(filters[key])
+                except ValueError:
+                    raise ValueError(f"{key} must be an ISO date (YYYY-MM-DD)")
+        if filters.get("min_score") is not None and filters.get("max_score") is not None \
+                and filters["min_score"] > filters["max_score"]:
+            raise ValueError("min_score must not exceed max_score")
+
+        with SessionLocal() as db:
+            max_id = db.execute(select(func.max(Article.id))).scalar() or 0
+            total = db.execute(
+                select(func.count(Article.id)).where(*self._criteria(filters, max_id))
+            ).scalar()
+            job = BackfillJob(id=uuid.uuid4().hex[:12], status="running", filters=json.dumps(filters), max_id=max_id, total=total, report=bool(report))
+            db.add(job)
+            db.commit()
+            logger.info(f"Backfill {job.id} created: {total} articles, filters {filters}")
+            return self._to_dict(job)
+
+    def get(self, job_id: str) -> dict | None:
+        with SessionLocal() as db:
+            job = db.get(BackfillJob, job_id)
+            return self._to_dict(job) if job else None
+
+    def list_jobs(self, limit: int = 20) -> list[dict]:
+        with SessionLocal() as db:
+            jobs = db.query(BackfillJob).order_by(BackfillJob.created_at.desc()).limit(limit).all()
+            return [self._to_dict(job) for job in jobs]
+
+    def stop(self, job_id: str) -> dict | None:
+        """
+        Ask the worker running the job to stop after its current batch. Resumable.
+        """
+        with SessionLocal() as db:
+            job = db.get(BackfillJob, job_id)
+            if not job:
+                return None
+            if job.status == "running":
+                job.status = "stopped"
+                db.commit()
+            return self._to_dict(job)
+
+    def resume(self, job_id: str, background: bool = True) -> dict | None:
+        """
+        Continue a stopped or failed job from its checkpoint, in a background
+        thread or (background=False) blocking in the caller.
+        """
+        with SessionLocal() as db:
+            job = db.get(BackfillJob, job_id)
+            if not job:
+                return None
+            if job.status in ("stopped", "failed"):
+                job.status = "running"
+                job.last_error = None
+                db.commit()
+        if background:
+            self.start(job_id)
+        else:
+            self.run(job_id)
+        return self.get(job_id)
+
+    def start(self, job_id: str):
+        """
+        Run the job in a background thread of this process, unless it already runs here.
+        """
+        with self._lock:
+            thread = self._threads.get(job_id)
+            if thread and thread.is_alive():
+                return
+            self._stop.clear()
+            thread = threading.Thread(target=self.run, args=(job_id,), name=f"backfill-{job_id}", daemon=True)
+            self._threads[job_id] = thread
+            thread.start()
+
+    def resume_interrupted(self):
+        """
+        Start every job still marked running. Safe to call on every worker
+        and repeatedly: the lease lets only one worker run a job.
+        """
+        with SessionLocal() as db:
+            ids = [row[0] for row in db.query(BackfillJob.id).filter(BackfillJob.status == "running")]
+        for job_id in ids:
+            self.start(job_id)
+
+    def shutdown(self, timeout: float = 30):
+        """
+        Stop local runs after the articles in flight; jobs stay "running" and resume on the next start.
+        """
+        self._stop.set()
+        for thread in list(self._threads.values()):
+            thread.join(timeout=timeout)
+
+    def run(self, job_id: str):
+        """
+        Process the job from its checkpoint until it completes, is stopped or
+        this process shuts down. Blocks; the CLI calls it directly.
+        """
+        lease = f"backfill:{job_id}"
+        if not try_lock(lease, settings.BACKFILL_LEASE_SECONDS):
+            logger.info(f"Backfill {job_id} is running on another worker")
+            return
+
+        try:
+            with SessionLocal() as db:
+                job = db.get(BackfillJob, job_id)
+                if not job or job.status != "running":
+                    return
+                job.run_started_at = datetime.now()
+                job.run_start_count = job.done + job.skipped + job.failed
+                db.commit()
+                criteria = self._criteria(json.loads(job.filters), job.max_id)
+                last_id = job.last_id
+                report = job.report
+            logger.info(f"Backfill {job_id} started after article {last_id}")
+
+            limiter = RateLimiter(settings.BACKFILL_RATE_PER_MINUTE)
+            drafted = False
+            with ThreadPoolExecutor(max_workers=settings.BACKFILL_CONCURRENCY, thread_name_prefix=f"backfill-{job_id[:6]}") as executor:
+                while not self._stop.is_set():
+                    with SessionLocal() as db:
+                        rows = next(article_store.iter_batches(
+                            db, article_store.PENDING_COLUMNS, *criteria,
+                            batch_size=settings.BACKFILL_BATCH_SIZE, after_id=last_id
+                        ), None)
+                    if not rows:
+                        self._finish(job_id, "completed")
+                        break
+
+                    outcomes = list(executor.map(lambda row: self._reanalyze(row, limiter, report), rows))
+                    drafted = drafted or "drafted" in outcomes
+                    if "interrupted" in outcomes:
+                        # Shutting down: checkpoint up to the first article not started
+                        cut = outcomes.index("interrupted")
+                        rows, outcomes = rows[:cut], outcomes[:cut]
+                        if rows:
+                            self._checkpoint(job_id, rows[-1].id, outcomes)
+                        break
+                    last_id = rows[-1].id
+                    if not self._checkpoint(job_id, last_id, outcomes):
+                        logger.info(f"Backfill {job_id} stopped")
+                        break
+                    if not try_lock(lease, settings.BACKFILL_LEASE_SECONDS):
+                        logger.warning(f"Backfill {job_id} lease lost, leaving it to the new holder")
+                        break
+
+            if drafted:
+                report_service.refresh_draft()
+        except Exception as e:
+            logger.error(f"Backfill {job_id} failed: {e}")
+            self._finish(job_id, "failed", error=str(e))
+        finally:
+            unlock(lease)
+
+    def _reanalyze(self, row, limiter: RateLimiter, report: bool) -> str:
+        """
+        Re-analyze one article. Returns "done", "drafted", "skipped", "failed"
+        or "interrupted" (shutdown before it started).
+        A failed analysis never overwrites the previous result. Unless
+        `report` is set, only articles that were already due for the next
+        report can be drafted.
+        """
+        if self._stop.is_set():
+            return "interrupted"
+        try:
+            date_str = row.publish_date.strftime("%Y-%m-%d")
+            file_path = storage_service.get_file_path(row.subscription_name, date_str, row.title, extension="md")
+            if not os.path.exists(file_path):
+                # Removed by the cleanup job; nothing to analyze
+                return "skipped"
+            content_md = storage_service.read_file(file_path)
+            if not content_md:
+                return "skipped"
+
+            limiter.wait()
+            if self._stop.is_set():
+                return "interrupted"
+            result = ai_service.analyze_article(row.title, content_md)
+            if result.get("summary") == ANALYSIS_ERROR_SUMMARY:
+                return "failed"
+
+            with SessionLocal() as db:
+                was_due = report_service.qualifies(article_store.get_report_row(db, row.id))
+            db_writer.write(
+                article_store.save_reanalysis,
+                row.id,
+                summary=result.get("summary", "No summary"),
+                score=result.get("score", 0),
+                is_ad=result.get("is_ad", False),
+                exclude_from_report=not (report or was_due)
+            )
+            with SessionLocal() as db:
+                analyzed = article_store.get_report_row(db, row.id)
+            search_service.index_article(analyzed, content_md)
+            storage_service.save_markdown(row.subscription_name, date_str, row.title, analyzed.summary, is_summary=True)
+            if not (report or was_due):
+                return "done"
+            return "drafted" if report_service.add_to_draft(analyzed) else "done"
+        except Exception as e:
+            logger.error(f"Backfill: error re-analyzing article {row.id}: {e}")
+            return "failed"
+
+    def _checkpoint(self, job_id: str, last_id: int, outcomes: list[str]) -> bool:
+        """
+        Save progress. Returns False if the job was stopped meanwhile.
+        """
+        with SessionLocal() as db:
+            job = db.get(BackfillJob, job_id)
+            job.last_id = last_id
+            job.done += sum(1 for o in outcomes if o in ("done", "drafted"))
+            job.skipped += outcomes.count("skipped")
+            job.failed += outcomes.count("failed")
+            db.commit()
+            progress = self._to_dict(job)
+
+        eta = progress["eta_seconds"]
+        logger.info(
+            f"Backfill {job_id}: {progress['processed']}/{progress['total']} "
+            f"({progress['rate_per_minute'] or 0}/min, ETA {timedelta(seconds=eta) if eta is not None else 'n/a'})"
+        )
+        return progress["status"] == "running"
+
+    def _finish(self, job_id: str, status: str, error: str | None = None):
+        with SessionLocal() as db:
+            job = db.get(BackfillJob, job_id)
+            if not job:
+                return
+            job.status = status
+            job.last_error = error
+            job.finished_at = datetime.now()
+            db.commit()
+            logger.info(f"Backfill {job_id} {status}: {job.done} re-analyzed, {job.skipped} skipped, {job.failed} failed")
+
+backfill_service = BackfillService()
@@ -1,8 +1,16 @@
 import re
-from markdownify import markdownify as md
-from bs4 import BeautifulSoup
 from src.util.logger import logger
 
+# Whole class/id words that mark page chrome (matched per word, so "header" is not "ad")
+UNWANTED_KEYWORDS = {'ad', 'ads', 'advert', 'advertisement', 'banner', 'footer', 'sidebar', 'nav', 'navbar', 'menu', 'related', 'social', 'share'}
+
+# Readability-style class/id hints
+POSITIVE_HINTS = re.compile(r'article|body|content|entry|main|page|post|text|blog|story', re.I)
+NEGATIVE_HINTS = re.compile(r'comment|meta|footer|footnote|masthead|nav|menu|sidebar|sponsor|share|social|related|promo|widget|banner|breadcrumb|pagination', re.I)
+CANDIDATE_TAGS = ["p", "pre", "td", "blockquote", "li", "h2", "h3"]
+MIN_PARAGRAPH_CHARS = 25
+MIN_MAIN_CONTENT_CHARS = 200
+
 class ContentProcessor:
     @staticmethod
     def clean_text(text: str) -> str:
@@ -39,16 +47,112 @@ class ContentProcessor:
         return cleaned_text
 
     @staticmethod
-    def html_to_md(html_content: str) -> str:
+    def _class_words(tag) -> list[str]:
+        classes = tag.get('class') or []
+        if isinstance(classes, str):
+            classes = classes.split()
+        words = ' '.join(classes) + ' ' + (tag.get('id') or '')
+        return [w for w in re.split(r'[\s_-]+', words.lower()) if w]
+
+    @staticmethod
+    def _class_weight(tag) -> int:
+        names = ' '.join(tag.get('class') or []) + ' ' + (tag.get('id') or '')
+        weight = 0
+        if POSITIVE_HINTS.search(names):
+            weight += 25
+        if NEGATIVE_HINTS.search(names):
+            weight -= 25
+        return weight
+
+    @staticmethod
+    def _link_density(tag) -> float:
+        text_length = len(tag.get_text(strip=True))
+        if not text_length:
+            return 1.0
+        link_length = sum(len(a.get_text(strip=True)) for a in tag.find_all('a'))
+        return link_length / text_length
+
+    @staticmethod
+    def extract_main_content(soup):
+        """
+        Readability-style main-content extraction.
+        Paragraph-like blocks score their parent (and half to the grandparent)
+        by text length and comma count; scores are adjusted by class/id hints
+        and scaled by (1 - link density). The best container and its
+        well-scoring siblings are kept. Returns None if no convincing block
+        is found, so the caller keeps the whole document.
+        """
+        scores: dict[int, float] = {}
+        nodes = {}
+
+        for block in soup.find_all(CANDIDATE_TAGS):
+            text = block.get_text(" ", strip=True)
+            if len(text) < MIN_PARAGRAPH_CHARS:
+                continue
+            score = 1 + text.count(',') + text.count('，') + min(len(text) / 100, 3)
+            for parent, share in ((block.parent, 1.0), (block.parent.parent if block.parent else None, 0.5)):
+                if parent is None or parent.name in (None, '[document]'):
+                    continue
+                key = id(parent)
+                if key not in scores:
+                    nodes[key] = parent
+                    scores[key] = ContentProcessor._class_weight(parent)
+                scores[key] += score * share
+
+        if not scores:
+            return None
+
+        for key, node in nodes.items():
+            scores[key] *= 1 - ContentProcessor._link_density(node)
+
+        top_key = max(scores, key=scores.get)
+        top = nodes[top_key]
+        if len(top.get_text(strip=True)) < MIN_MAIN_CONTENT_CHARS:
+            return None
+
+        # Keep siblings that look like part of the same article
+        threshold = max(10, scores[top_key] * 0.2)
+        parent = top.parent
+        if parent is None:
+            return top
+        kept = []
+        for sibling in parent.find_all(True, recursive=False):
+            key = id(sibling)
+            if sibling is top or scores.get(key, 0) >= threshold:
+                kept.append(sibling)
+            elif sibling.name == 'p':
+                text = sibling.get_text(strip=True)
+                if len(text) > 80 and ContentProcessor._link_density(sibling) < 0.25:
+                    kept.append(sibling)
+
+        if len(kept) == 1:
+            return top
+        container = soup.new_tag('div')
+        for node in kept:
+            container.append(node.extract())
+        return container
+
+    @staticmethod
+    def html_to_md(html_content: str | bytes, encoding: str | None = None, extract_main: bool = False) -> str:
         """
         Convert HTML to Markdown, removing images, links, and cleaning up format.
         Strict cleaning.
+        Accepts raw bytes with their detected encoding, so downloaded pages
+        are decoded once by the parser instead of being copied into a str first.
+        With extract_main, only the main article content is converted.
         """
         if not html_content:
             return ""
 
+        # Heavy parsers are imported on first conversion, not at startup
+        from bs4 import BeautifulSoup
+        from markdownify import markdownify as md
+
         # 1. BeautifulSoup Cleaning
-        soup = BeautifulSoup(html_content, "html.parser")
+        if isinstance(html_content, bytes):
+            soup = BeautifulSoup(html_content, "html.parser", from_encoding=encoding)
+        else:
+            soup = BeautifulSoup(html_content, "html.parser")
         
         # Remove generally unwanted tags
         for tag in soup(["script", "style", "iframe", "object", "embed", "param", "meta", "link", "noscript"]):
@@ -58,25 +162,21 @@ class ContentProcessor:
         for tag in soup(["img", "figure", "picture", "canvas", "svg", "video", "audio", "source", "track"]):
             tag.decompose()
             
+        # Keep only the main content block (before links are unwrapped: link density needs them)
+        if extract_main:
+            main = ContentProcessor.extract_main_content(soup)
+            if main is not None:
+                soup = main
+            else:
+                logger.debug("No main content block found, keeping whole document")
+
         # Remove structural clutter / ads / sidebars (Heuristic)
-        # Remove elements with class/id containing specific keywords
-        unwanted_keywords = ['ad', 'advertisement', 'banner', 'footer', 'sidebar', 'nav', 'menu', 'related', 'social', 'share']
+        # Remove elements whose class/id contains one of the keywords as a whole word
         for tag in soup.find_all(True):
-            # Check class
-            if tag.get('class'):
-                classes = tag.get('class')
-                if isinstance(classes, list):
-                    classes = ' '.join(classes)
-                if any(keyword in classes.lower() for keyword in unwanted_keywords):
-                    tag.decompose()
-                    continue
-            
-            # Check ID
-            if tag.get('id'):
-                id_val = tag.get('id')
-                if any(keyword in id_val.lower() for keyword in unwanted_keywords):
-                    tag.decompose()
-                    continue
+            if tag.decomposed:
+                continue
+            if any(word in UNWANTED_KEYWORDS for word in ContentProcessor._class_words(tag)):
+                tag.decompose()
 
         # Unwrap links (keep text, remove <a> tag)
         for a in soup.find_all('a'):
@@ -0,0 +1,225 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from src.constant.config import settings
+from src.services.storage_service import storage_service
+from src.util.database import SessionLocal, project_root, Article, ArchivedArticle, ExportWatermark
+from src.util.logger import logger
+
+EXPORT_FORMATS = ("parquet", "arrow")
+EXPORT_COLUMNS = (
+    "id", "entry_id", "link", "title", "subscription_name", "publish_date", "score",
+    "summary", "is_ad", "is_processed", "is_sent", "created_at", "updated_at",
+)
+# Rows updated in the last moments may belong to transactions that have not
+# committed yet; they are left for the next export instead of being skipped.
+SETTLE_SECONDS = 60
+
+def _schema(include_content: bool):
+    import pyarrow as pa
+
+    fields = [
+        ("id", pa.int64()),
+        ("entry_id", pa.string()),
+        ("link", pa.string()),
+        ("title", pa.string()),
+        ("subscription_name", pa.string()),
+        ("publish_date", pa.timestamp("us")),
+        ("score", pa.int32()),
+        ("summary", pa.string()),
+        ("is_ad", pa.bool_()),
+        ("is_processed", pa.bool_()),
+        ("is_sent", pa.bool_()),
+        ("created_at", pa.timestamp("us")),
+        ("updated_at", pa.timestamp("us")),
+        ("archived", pa.bool_()),
+    ]
+    if include_content:
+        fields.append(("content_md", pa.string()))
+    return pa.schema(fields)
+
+class _PartitionWriters:
+    """
+    One open writer per publish-month partition. Files are written under a
+    temporary name and renamed on close, so readers never see partial files.
+    """
+    def __init__(self, output_dir: str, fmt: str, schema, run_id: str):
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.schema = schema
+        self.run_id = run_id
+        self._writers: dict[str, tuple[object, str]] = {}
+
+    def write(self, partition: str, table):
+        if partition not in self._writers:
+            self._writers[partition] = self._open(partition)
+        writer, _ = self._writers[partition]
+        writer.write_table(table)
+
+    def _open(self, partition: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        folder = os.path.join(self.output_dir, f"publish_month={partition}")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"part-{self.run_id}.{self.fmt}")
+        if self.fmt == "parquet":
+            writer = pq.ParquetWriter(path + ".tmp", self.schema, compression=settings.EXPORT_COMPRESSION)
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=settings.EXPORT_COMPRESSION)
+            writer = pa.ipc.new_file(path + ".tmp", self.schema, options=options)
+        return writer, path
+
+    def close(self) -> list[str]:
+        paths = []
+        for writer, path in self._writers.values():
+            writer.close()
+            os.replace(path + ".tmp", path)
+            paths.append(path)
+        self._writers = {}
+        return paths
+
+    def abort(self):
+        for writer, path in self._writers.values():
+            try:
+                writer.close()
+                os.remove(path + ".tmp")
+            except OSError:
+                pass
+        self._writers = {}
+
+class ExportService:
+    def check_available(self):
+        """
+        Raises ValueError if the optional pyarrow dependency is missing.
+        """
+        try:
+            import pyarrow
+        except ImportError:
+            raise ValueError("Export requires pyarrow (pip install pyarrow)")
+
+    def _resolve_dir(self, output_dir: str | None) -> str:
+        output_dir = output_dir or settings.EXPORT_DIR
+        if not os.path.isabs(output_dir):
+            output_dir = os.path.join(project_root, output_dir)
+        return output_dir
+
+    def export_articles(
+        self,
+        output_dir: str | None = None,
+        fmt: str = "parquet",
+        incremental: bool = True,
+        since: datetime | None = None,
+        include_content: bool = False,
+    ) -> dict:
+        """
+        Stream articles (hot and archived) into compressed Parquet or Arrow
+        files partitioned by publish month, EXPORT_BATCH_SIZE rows at a time.
+        - incremental: only rows updated after the stored watermark of this
+          target, then advance the watermark.
+        - since: explicit updated_at lower bound; does not touch the watermark.
+          Timezone-aware values are converted to naive local time, which is
+          how updated_at is stored.
+        Raises ValueError on bad options or if pyarrow is not installed.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"format must be one of {EXPORT_FORMATS}")
+        self.check_available()
+
+        if since and since.tzinfo:
+            since = since.astimezone().replace(tzinfo=None)
+
+        output_dir = self._resolve_dir(output_dir)
+        name = f"articles:{fmt}:{output_dir}"
+        start = (since, 0) if since else None
+        if incremental and not since:
+            with SessionLocal() as db:
+                mark = db.get(ExportWatermark, name)
+                if mark:
+                    start = (mark.updated_at, mark.last_id)
+        until = datetime.now() - timedelta(seconds=SETTLE_SECONDS)
+
+        schema = _schema(include_content)
+        run_id = f"{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+        writers = _PartitionWriters(output_dir, fmt, schema, run_id)
+        rows_written = 0
+        last = start
+        logger.info(f"Export {run_id}: {fmt} to {output_dir}, from {start[0] if start else 'the beginning'}")
+        try:
+            for model in (Article, ArchivedArticle):
+                for rows in self._iter_rows(model, start, until):
+                    self._write_batch(writers, schema, rows, model is ArchivedArticle, include_content)
+                    rows_written += len(rows)
+                    tail = (rows[-1].updated_at, rows[-1].id)
+                    last = max(last, tail) if last else tail
+                    logger.info(f"Export {run_id}: {rows_written} rows written so far")
+            files = writers.close()
+        except Exception:
+            writers.abort()
+            raise
+
+        if incremental and not since and last:
+            with SessionLocal() as db:
+                db.merge(ExportWatermark(name=name, updated_at=last[0], last_id=last[1], exported_at=datetime.now(), rows=rows_written))
+                db.commit()
+
+        logger.info(f"Export {run_id} completed: {rows_written} rows in {len(files)} files")
+        return {
+            "run_id": run_id,
+            "rows": rows_written,
+            "files": files,
+            "watermark": last[0] if last else None,
+        }
+
+    def _iter_rows(self, model, start: tuple | None, until: datetime):
+        """
+        Keyset pagination on (updated_at, id): narrow tuples, one batch in memory.
+        """
+        columns = [getattr(model, c) for c in EXPORT_COLUMNS]
+        position = start
+        while True:
+            with SessionLocal() as db:
+                query = select(*columns).where(model.updated_at < until)
+                if position:
+                    updated_at, last_id = position
+                    query = query.where(
+                        (model.updated_at > updated_at)
+                        | ((model.updated_at == updated_at) & (model.id > last_id))
+                    )
+                rows = db.execute(
+                    query.order_by(model.updated_at, model.id).limit(settings.EXPORT_BATCH_SIZE)
+                ).all()
+            if not rows:
+                return
+            yield rows
+            position = (rows[-1].updated_at, rows[-1].id)
+
+    def _write_batch(self, writers: _PartitionWriters, schema, rows: list, archived: bool, include_content: bool):
+        import pyarrow as pa
+
+        partitions: dict[str, dict[str, list]] = {}
+        for row in rows:
+            partition = row.publish_date.strftime("%Y-%m") if row.publish_date else "unknown"
+            columns = partitions.setdefault(partition, {field: [] for field in schema.names})
+            for name in EXPORT_COLUMNS:
+                columns[name].append(getattr(row, name))
+            columns["archived"].append(archived)
+            if include_content:
+                columns["content_md"].append(self._read_content(row))
+
+        for partition, columns in partitions.items():
+            writers.write(partition, pa.Table.from_pydict(columns, schema=schema))
+
+    def _read_content(self, row) -> str | None:
+        # Markdown files are removed by the cleanup job; missing files export as null
+        if not row.publish_date or not row.subscription_name:
+            return None
+        date_str = row.publish_date.strftime("%Y-%m-%d")
+        if not storage_service.file_exists(row.subscription_name, date_str, row.title, extension="md"):
+            return None
+        return storage_service.read_file(
+            storage_service.get_file_path(row.subscription_name, date_str, row.title, extension="md")
+        )
+
+export_service = ExportService()
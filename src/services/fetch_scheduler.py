@@ -0,0 +1,208 @@
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+from src.constant.config import settings
+from src.util.database import SessionLocal, SourceHealth
+from src.util.db_writer import db_writer
+from src.util.logger import logger
+
+class SourceUnavailable(Exception):
+    """
+    Raised when a circuit breaker is open and the fetch is skipped.
+    """
+
+class _HostSlot:
+    def __init__(self, concurrency: int):
+        self.semaphore = threading.Semaphore(max(1, concurrency))
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+class FetchScheduler:
+    """
+    Host-aware fetch gate.
+    - Per-host concurrency limit and minimum spacing between requests.
+    - Circuit breakers per feed and per host, persisted in source_health:
+      after BREAKER_FAILURE_THRESHOLD consecutive failures the breaker opens
+      and the source is skipped until its cool-down passes; then a single
+      probe is let through (half-open). A failed probe doubles the cool-down.
+    """
+    def __init__(self):
+        self._slots: dict[str, _HostSlot] = {}
+        self._slots_lock = threading.Lock()
+        self._probing: set[str] = set()
+        self._probing_lock = threading.Lock()
+
+    @staticmethod
+    def host_key(url: str) -> str:
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        return f"host:{host}:{parts.port}" if parts.port else f"host:{host}"
+
+    @staticmethod
+    def feed_key(url: str) -> str:
+        return f"feed:{url}"
+
+    def _slot(self, host_key: str) -> _HostSlot:
+        with self._slots_lock:
+            slot = self._slots.get(host_key)
+            if slot is None:
+                slot = _HostSlot(settings.HOST_MAX_CONCURRENCY)
+                self._slots[host_key] = slot
+            return slot
+
+    def run(self, url: str, fn, feed_key: str | None = None):
+        """
+        Run fn() as a fetch of `url` under the host gate and breakers.
+        Any error counts against the feed; only errors that point at the
+        host (timeouts, connection errors, 5xx, 429) count against the host.
+        Raises SourceUnavailable without calling fn if a breaker is open.
+        """
+        host_key = self.host_key(url)
+        keys = [host_key] + ([feed_key] if feed_key else [])
+        with self._gate(url, keys):
+            try:
+                result = fn()
+            except Exception as e:
+                if getattr(e, "is_host_failure", False):
+                    self.record_failure(host_key, str(e))
+                else:
+                    self.record_success(host_key)
+                if feed_key:
+                    self.record_failure(feed_key, str(e))
+                raise
+            for key in keys:
+                self.record_success(key)
+            return result
+
+    @contextmanager
+    def _gate(self, url: str, keys: list[str]):
+        """
+        Gate a fetch of `url`: raise SourceUnavailable if any breaker in `keys`
+        is open, otherwise hold a host slot, honouring the minimum spacing.
+        """
+        probes = []
+        try:
+            for key in keys:
+                if self._check(key):
+                    probes.append(key)
+        except SourceUnavailable:
+            self._release_probes(probes)
+            raise
+
+        slot = self._slot(self.host_key(url))
+        with slot.semaphore:
+            with slot.lock:
+                now = time.monotonic()
+                delay = slot.next_at - now
+                slot.next_at = max(now, slot.next_at) + settings.HOST_MIN_INTERVAL_SECONDS
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                yield
+            finally:
+                self._release_probes(probes)
+
+    def _release_probes(self, keys: list[str]):
+        with self._probing_lock:
+            for key in keys:
+                self._probing.discard(key)
+
+    def _check(self, key: str) -> bool:
+        """
+        Raise SourceUnavailable if the breaker for `key` blocks the fetch.
+        Returns True if this fetch is the half-open probe.
+        """
+        with SessionLocal() as db:
+            health = db.get(SourceHealth, key)
+            if not health or health.state == "closed":
+                return False
+
+            if health.state == "open":
+                reopen_at = health.opened_at + timedelta(seconds=health.cooldown_seconds)
+                if datetime.now() < reopen_at:
+                    raise SourceUnavailable(f"Circuit open for {key} until {reopen_at:%Y-%m-%d %H:%M}")
+                health.state = "half_open"
+                db.commit()
+
+        # Half-open: let a single probe through
+        with self._probing_lock:
+            if key in self._probing:
+                raise SourceUnavailable(f"Circuit half-open for {key}, probe in progress")
+            self._probing.add(key)
+        logger.info(f"Probing {key} after cool-down")
+        return True
+
+    def _get_or_new(self, db, key: str) -> SourceHealth:
+        return db.get(SourceHealth, key) or SourceHealth(
+            key=key, kind=key.split(":", 1)[0], state="closed",
+            consecutive_failures=0, total_requests=0, total_failures=0, cooldown_seconds=0
+        )
+
+    def record_success(self, key: str):
+        # Health counters are updated on the database writer, off the fetch path
+        db_writer.submit(self._apply_success, key, datetime.now())
+
+    def record_failure(self, key: str, error: str):
+        # Waits for the write, so a breaker that opens is seen by the next fetch
+        try:
+            db_writer.write(self._apply_failure, key, error, datetime.now())
+        except Exception as e:
+            logger.error(f"Recording failure for {key} failed: {e}")
+
+    def _apply_success(self, db, key: str, at: datetime):
+        health = self._get_or_new(db, key)
+        recovered = health.state != "closed"
+        health.total_requests += 1
+        health.consecutive_failures = 0
+        health.state = "closed"
+        health.cooldown_seconds = 0
+        health.opened_at = None
+        health.last_success_at = at
+        db.merge(health)
+        if recovered:
+            logger.info(f"Circuit closed for {key}")
+
+    def _apply_failure(self, db, key: str, error: str, at: datetime):
+        health = self._get_or_new(db, key)
+        health.total_requests += 1
+        health.total_failures += 1
+        health.consecutive_failures += 1
+        health.last_failure_at = at
+        health.last_error = error[:1000]
+
+        if health.state == "half_open":
+            # Failed probe: back off further
+            health.cooldown_seconds = min(
+                max(health.cooldown_seconds * 2, settings.BREAKER_COOLDOWN_SECONDS),
+                settings.BREAKER_MAX_COOLDOWN_SECONDS
+            )
+            health.state = "open"
+            health.opened_at = at
+            logger.warning(f"Probe failed, circuit re-opened for {key} ({health.cooldown_seconds}s)")
+        elif health.consecutive_failures >= settings.BREAKER_FAILURE_THRESHOLD and health.state != "open":
+            health.cooldown_seconds = settings.BREAKER_COOLDOWN_SECONDS
+            health.state = "open"
+            health.opened_at = at
+            logger.warning(f"Circuit opened for {key} after {health.consecutive_failures} failures")
+        db.merge(health)
+
+    def list_health(self) -> list[dict]:
+        with SessionLocal() as db:
+            rows = db.query(SourceHealth).order_by(SourceHealth.state, SourceHealth.key).all()
+            return [
+                {
+                    "key": h.key,
+                    "state": h.state,
+                    "consecutive_failures": h.consecutive_failures,
+                    "failure_rate": round(h.total_failures / h.total_requests, 3) if h.total_requests else 0.0,
+                    "total_requests": h.total_requests,
+                    "opened_at": h.opened_at,
+                    "cooldown_seconds": h.cooldown_seconds,
+                    "last_error": h.last_error,
+                }
+                for h in rows
+            ]
+
+fetch_scheduler = FetchScheduler()
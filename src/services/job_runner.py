@@ -0,0 +1,160 @@
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from src.constant.config import settings
+from src.util.job_lock import try_lock, unlock, LeaseRenewer
+from src.util.logger import logger
+
+MAX_RUN_HISTORY = 200
+
+class JobRun:
+    def __init__(self, job: str, cluster_lock: bool = True):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.job = job
+        self.status = "queued" # queued / running / succeeded / failed / skipped
+        self.created_at = datetime.now()
+        self.started_at: datetime | None = None
+        self.finished_at: datetime | None = None
+        self.error: str | None = None
+        self.result = None # Return value of the job, if any
+        self.triggers = 1 # Number of triggers coalesced into this run
+        self.cluster_lock = cluster_lock
+        self.done = threading.Event()
+
+    def to_dict(self) -> dict:
+        return {
+            "run_id": self.run_id,
+            "job": self.job,
+            "status": self.status,
+            "triggers": self.triggers,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "result": self.result,
+        }
+
+class JobRunner:
+    """
+    Single-flight execution per job name.
+    - Idle: the trigger starts a new run.
+    - Running: the trigger joins the running run, or with follow_up=True
+      queues one follow-up run that starts when the current one ends.
+      Further triggers join that queued run.
+    Across workers, a job_locks lease per job name keeps a second worker
+    from running the same job at the same time (its run is "skipped"). The
+    lease is short and renewed while the run lasts, so a killed worker frees
+    it within JOB_RUN_LOCK_SECONDS. Jobs that split their work with per-item
+    claims (analyze_pending) pass cluster_lock=False and run on every worker.
+    Run history is kept in memory per process: /debug/runs/{run_id} only
+    knows runs triggered on the worker that answers it.
+    """
+    def __init__(self, max_workers: int = 4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._running: dict[str, JobRun] = {}
+        self._queued: dict[str, tuple[JobRun, object]] = {}
+        self._history: OrderedDict[str, JobRun] = OrderedDict()
+
+    def trigger(self, job: str, fn, follow_up: bool = False, cluster_lock: bool = True) -> dict:
+        """
+        Request a run of `job`. Returns the run it was coalesced into, with
+        "coalesced": True if no new run was started for this trigger.
+        """
+        run, coalesced = self._submit(job, fn, follow_up, cluster_lock)
+        info = run.to_dict()
+        info["coalesced"] = coalesced
+        return info
+
+    def run_and_wait(self, job: str, fn, follow_up: bool = False, cluster_lock: bool = True) -> dict:
+        """
+        Trigger `job` and block until the run it joined has finished.
+        """
+        run, _ = self._submit(job, fn, follow_up, cluster_lock)
+        run.done.wait()
+        return run.to_dict()
+
+    def get_run(self, run_id: str) -> dict | None:
+        with self._lock:
+            run = self._history.get(run_id)
+            return run.to_dict() if run else None
+
+    def _submit(self, job: str, fn, follow_up: bool, cluster_lock: bool) -> tuple[JobRun, bool]:
+        with self._lock:
+            queued = self._queued.get(job)
+            if queued:
+                queued[0].triggers += 1
+                return queued[0], True
+
+            running = self._running.get(job)
+            if running:
+                if not follow_up:
+                    running.triggers += 1
+                    return running, True
+                run = self._remember(JobRun(job, cluster_lock))
+                self._queued[job] = (run, fn)
+                logger.info(f"Job {job} is running, queued follow-up run {run.run_id}")
+                return run, False
+
+            run = self._remember(JobRun(job, cluster_lock))
+            self._running[job] = run
+        self._executor.submit(self._execute, run, fn)
+        return run, False
+
+    def _remember(self, run: JobRun) -> JobRun:
+        self._history[run.run_id] = run
+        while len(self._history) > MAX_RUN_HISTORY:
+            self._history.popitem(last=False)
+        return run
+
+    def _execute(self, run: JobRun, fn):
+        lock_name = f"job:{run.job}"
+        run.started_at = datetime.now()
+        try:
+            if not run.cluster_lock:
+                self._call(run, fn)
+            elif not try_lock(lock_name, settings.JOB_RUN_LOCK_SECONDS):
+                run.status = "skipped"
+                run.error = "Already running on another worker"
+                logger.info(f"Job {run.job} run {run.run_id} skipped: running on another worker")
+            else:
+                try:
+                    with LeaseRenewer(lock_name, settings.JOB_RUN_LOCK_SECONDS):
+                        self._call(run, fn)
+                finally:
+                    unlock(lock_name)
+        except Exception as e:
+            run.status = "failed"
+            run.error = str(e)
+            logger.error(f"Job {run.job} run {run.run_id} failed: {e}")
+        finally:
+            run.finished_at = datetime.now()
+            run.done.set()
+            self._start_follow_up(run.job)
+
+    def _call(self, run: JobRun, fn):
+        run.status = "running"
+        try:
+            run.result = fn()
+            run.status = "succeeded"
+        except Exception as e:
+            run.status = "failed"
+            run.error = str(e)
+            logger.error(f"Job {run.job} run {run.run_id} failed: {e}")
+
+    def _start_follow_up(self, job: str):
+        with self._lock:
+            self._running.pop(job, None)
+            queued = self._queued.pop(job, None)
+            if not queued:
+                return
+            run, fn = queued
+            self._running[job] = run
+        self._executor.submit(self._execute, run, fn)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+job_runner = JobRunner()
@@ -1,70 +1,146 @@
 from abc import ABC, abstractmethod
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import time
+import uuid
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import aliased
 from src.constant.config import settings
+from src.util.database import SessionLocal, OutboxBatch, OutboxMessage
+from src.util.job_lock import WORKER_ID
 from src.util.logger import logger
+from src.util.lazy import LazyService
+from src.util.rate_limiter import RateLimiter
 
 import math
 
 class BaseNotifier(ABC):
+    name: str = "base"
+    rate_per_minute: int = 0
+
+    def __init__(self):
+        self.rate_limiter = RateLimiter(self.rate_per_minute)
+
+    @abstractmethod
+    def is_configured(self) -> bool:
+        pass
+
     @abstractmethod
-    def send_message(self, title: str, content: str):
+    def build_chunks(self, title: str, content: str) -> list[tuple[str, str]]:
+        """
+        Split a message into (title, text) chunks that fit the channel limit.
+        """
         pass
 
-    def _split_smartly(self, content, chunk_size):
+    @abstractmethod
+    def deliver_chunk(self, title: str, text: str):
+        """
+        Send one chunk. Raises on failure so the outbox can retry.
+        """
+        pass
+
+    def _measure(self, text: str) -> int:
+        """
+        Size of text as the channel counts it. Defaults to UTF-8 bytes.
+        """
+        return len(text.encode("utf-8"))
+
+    def _split_smartly(self, content, limit):
         """
         Smart split that respects Markdown headers and paragraphs.
-        It tries to split at the nearest '###' or newline before the limit.
+        Runs in linear time over a list of line fragments and measures sizes
+        with self._measure, so limits hold for the encoded payload.
+        '###' sections are kept whole when they fit in one chunk; larger
+        sections are split at line boundaries, and oversized lines by character.
         """
-        if len(content) <= chunk_size:
+        if self._measure(content) <= limit:
             return [content]
-        
-        chunks = []
-        current_chunk = ""
-        
-        lines = content.split('\n')
-        
-        for line in lines:
-            # Check if adding this line exceeds limit
-            # +1 for newline character
-            if len(current_chunk) + len(line) + 1 > chunk_size:
-                if current_chunk:
-                    chunks.append(current_chunk)
-                    current_chunk = line
-                else:
-                    # Single line is longer than chunk_size (unlikely but possible)
-                    # Force split
-                    sub_chunks = [line[i:i+chunk_size] for i in range(0, len(line), chunk_size)]
-                    chunks.extend(sub_chunks[:-1])
-                    current_chunk = sub_chunks[-1]
+
+        # Group lines into sections that start at '###' headers
+        sections: list[list[str]] = []
+        for line in content.split('\n'):
+            if line.startswith("###") or not sections:
+                sections.append([line])
             else:
-                if current_chunk:
-                    current_chunk += "\n" + line
-                else:
-                    current_chunk = line
-        
-        if current_chunk:
-            chunks.append(current_chunk)
-            
+                sections[-1].append(line)
+
+        chunks: list[str] = []
+        current: list[str] = []
+        current_size = 0
+
+        def flush():
+            nonlocal current, current_size
+            if current:
+                chunks.append("\n".join(current))
+            current, current_size = [], 0
+
+        def add_line(line: str, size: int):
+            nonlocal current_size
+            # +1 for the newline joining it to the previous line
+            if current and current_size + 1 + size > limit:
+                flush()
+            if size > limit:
+                # Single line is longer than the limit: force split by character
+                for piece in self._split_line(line, limit):
+                    flush()
+                    current.append(piece)
+                    current_size = self._measure(piece)
+                return
+            current_size += size + (1 if current else 0)
+            current.append(line)
+
+        for section in sections:
+            sizes = [self._measure(line) for line in section]
+            section_size = sum(sizes) + len(section) - 1
+            if current and current_size + 1 + section_size > limit:
+                # Start the section in a fresh chunk so it is not cut in two
+                flush()
+            if section_size <= limit:
+                current_size += section_size + (1 if current else 0)
+                current.extend(section)
+                continue
+            for line, size in zip(section, sizes):
+                add_line(line, size)
+
+        flush()
         return chunks
 
+    def _split_line(self, line: str, limit: int) -> list[str]:
+        pieces = []
+        start = 0
+        size = 0
+        for i, ch in enumerate(line):
+            ch_size = self._measure(ch)
+            if size + ch_size > limit and i > start:
+                pieces.append(line[start:i])
+                start, size = i, 0
+            size += ch_size
+        pieces.append(line[start:])
+        return pieces
+
 class DingTalkNotifier(BaseNotifier):
+    name = "dingtalk"
+    rate_per_minute = settings.DING_RATE_PER_MINUTE
+
     def __init__(self):
+        super().__init__()
         self.webhook_url = settings.DING_WEBHOOK
-        self.MAX_CHARS = 3500 # Safe limit
+        self.MAX_BYTES = 18000 # DingTalk caps the message at 20000 UTF-8 bytes
 
-    def send_message(self, title: str, content: str):
-        if not self.webhook_url:
-            logger.warning("DingTalk Webhook not configured")
-            return
+    def is_configured(self) -> bool:
+        return bool(self.webhook_url)
 
-        # Split content smartly
-        chunks = self._split_smartly(content, self.MAX_CHARS) 
-        
-        for i, chunk in enumerate(chunks):
-            chunk_title = title if i == 0 else f"{title} (Part {i+1})"
-            self._send_single_message(chunk_title, chunk)
+    def build_chunks(self, title: str, content: str) -> list[tuple[str, str]]:
+        # Split content smartly, leaving room for the "## title (Part n)" header
+        header_size = self._measure(f"## {title} (Part 999)\n\n") * 2
+        chunks = self._split_smartly(content, self.MAX_BYTES - header_size)
+        return [
+            (title if i == 0 else f"{title} (Part {i+1})", chunk)
+            for i, chunk in enumerate(chunks)
+        ]
 
-    def _send_single_message(self, title, text):
+    def deliver_chunk(self, title: str, text: str):
+        import requests
         payload = {
             "msgtype": "markdown",
             "markdown": {
@@ -72,68 +148,271 @@ class DingTalkNotifier(BaseNotifier):
                 "text": f"## {title}\n\n{text}"
             }
         }
-        try:
-            response = requests.post(self.webhook_url, json=payload, timeout=10)
-            if response.status_code == 200 and response.json().get("errcode") == 0:
-                logger.info("DingTalk notification sent.")
-            else:
-                logger.error(f"DingTalk error: {response.text}")
-        except Exception as e:
-            logger.error(f"DingTalk send failed: {e}")
+        response = requests.post(self.webhook_url, json=payload, timeout=10)
+        if response.status_code != 200 or response.json().get("errcode") != 0:
+            raise RuntimeError(f"DingTalk error: {response.text}")
+        logger.info("DingTalk notification sent.")
 
 class TelegramNotifier(BaseNotifier):
+    name = "telegram"
+    rate_per_minute = settings.TG_RATE_PER_MINUTE
+
     def __init__(self):
+        super().__init__()
         self.token = settings.TG_BOT_TOKEN
         self.chat_id = settings.TG_CHAT_ID
         self.api_url = f"https://api.telegram.org/bot{self.token}/sendMessage"
-        self.MAX_CHARS = 4000 
+        self.MAX_UNITS = 4000 # Telegram allows 4096 UTF-16 code units
+
+    def _measure(self, text: str) -> int:
+        return len(text.encode("utf-16-le")) // 2
 
-    def send_message(self, title: str, content: str):
-        if not self.token or not self.chat_id:
-            logger.warning("Telegram Token or Chat ID not configured")
-            return
-        
+    def is_configured(self) -> bool:
+        return bool(self.token and self.chat_id)
+
+    def build_chunks(self, title: str, content: str) -> list[tuple[str, str]]:
         full_msg = f"*{title}*\n\n{content}"
-        
-        chunks = self._split_smartly(full_msg, self.MAX_CHARS)
-        for chunk in chunks:
-            self._send_single_message(chunk)
+        return [(title, chunk) for chunk in self._split_smartly(full_msg, self.MAX_UNITS)]
 
-    def _send_single_message(self, text):
+    def deliver_chunk(self, title: str, text: str):
+        import requests
         payload = {
             "chat_id": self.chat_id,
             "text": text,
-            "parse_mode": "Markdown" 
+            "parse_mode": "Markdown"
         }
-
-        try:
-            response = requests.post(self.api_url, json=payload, timeout=10)
-            if response.status_code == 200:
-                logger.info("Telegram notification sent.")
-            else:
-                logger.error(f"Telegram error: {response.text}")
-        except Exception as e:
-            logger.error(f"Telegram send failed: {e}")
+        response = requests.post(self.api_url, json=payload, timeout=10)
+        if response.status_code != 200:
+            raise RuntimeError(f"Telegram error: {response.text}")
+        logger.info("Telegram notification sent.")
 
 class NotifierManager:
+    """
+    Delivers messages through a persistent outbox. Delivery state is kept per
+    (chunk, channel), so a channel that failed is retried on its own and
+    channels that already delivered are never sent to again.
+    Workers claim chunks in the database (status "sending" with a lease)
+    before sending them, so processes sharing the database never deliver
+    the same chunk twice; chunks of a worker that died are taken over once
+    their lease expires.
+    """
     def __init__(self):
         self.notifiers: list[BaseNotifier] = []
         channels = [c.strip().lower() for c in settings.NOTIFICATION_CHANNELS.split(",")]
-        
+
         if "dingtalk" in channels:
             self.notifiers.append(DingTalkNotifier())
         if "telegram" in channels:
             self.notifiers.append(TelegramNotifier())
-            
-    def send_markdown(self, title: str, text: str):
+
+    def send_markdown(self, title: str, text: str, kind: str = "message", ref: str | None = None) -> str | None:
         """
-        Send message to all configured channels.
+        Queue a message for all configured channels in the outbox and deliver it.
+        Returns the outbox batch id, or None if nothing could be queued.
+        Use batch_status() to check whether delivery was confirmed.
         """
-        if not self.notifiers:
+        notifiers = [n for n in self.notifiers if n.is_configured()]
+        for n in self.notifiers:
+            if not n.is_configured():
+                logger.warning(f"{n.name} not configured, skipping channel.")
+        if not notifiers:
             logger.warning("No notification channels configured.")
-            return
+            return None
+
+        batch_id = uuid.uuid4().hex
+        with SessionLocal() as db:
+            db.add(OutboxBatch(batch_id=batch_id, kind=kind, ref=ref, status="pending"))
+            for n in notifiers:
+                for seq, (chunk_title, chunk) in enumerate(n.build_chunks(title, text)):
+                    db.add(OutboxMessage(batch_id=batch_id, channel=n.name, seq=seq, title=chunk_title, content=chunk))
+            db.commit()
+        logger.info(f"Queued outbox batch {batch_id} for {', '.join(n.name for n in notifiers)}.")
+
+        self.flush_outbox()
+        return batch_id
+
+    def batch_status(self, batch_id: str) -> str | None:
+        with SessionLocal() as db:
+            batch = db.get(OutboxBatch, batch_id)
+            return batch.status if batch else None
+
+    def delivered_channels(self, batch_id: str) -> list[str]:
+        """
+        Channels that received every chunk of the batch.
+        """
+        with SessionLocal() as db:
+            rows = db.query(OutboxMessage.channel, OutboxMessage.status).filter(OutboxMessage.batch_id == batch_id).all()
+        channels = {channel for channel, _ in rows}
+        return sorted(c for c in channels if all(status == "sent" for channel, status in rows if channel == c))
+
+    def retry_failed(self, kind: str) -> int:
+        """
+        Re-queue failed `kind` batches that have retries left. Only their
+        failed chunks go back to pending, so a channel resumes at the chunk
+        that failed and channels that delivered are left alone.
+        Returns the number of batches re-queued; flush_outbox() sends them.
+        """
+        with SessionLocal() as db:
+            batches = db.query(OutboxBatch).filter(
+                OutboxBatch.kind == kind,
+                OutboxBatch.status == "failed",
+                OutboxBatch.acknowledged == False,
+                OutboxBatch.retries < settings.OUTBOX_BATCH_RETRIES
+            ).all()
+            for batch in batches:
+                db.query(OutboxMessage).filter(
+                    OutboxMessage.batch_id == batch.batch_id,
+                    OutboxMessage.status == "failed"
+                ).update({"status": "pending", "attempts": 0, "last_error": None}, synchronize_session=False)
+                batch.status = "pending"
+                batch.retries += 1
+                logger.info(f"Retrying failed channels of outbox batch {batch.batch_id} (round {batch.retries}/{settings.OUTBOX_BATCH_RETRIES}).")
+            db.commit()
+            return len(batches)
+
+    def flush_outbox(self):
+        """
+        Deliver all pending outbox messages, one concurrent worker per channel.
+        Also picks up messages left pending by an earlier run or a restart,
+        and messages whose claim expired because their worker died.
+        Messages for a channel no longer in NOTIFICATION_CHANNELS fail, so
+        their batch can still be resolved.
+        """
+        now = datetime.now()
+        with SessionLocal() as db:
+            channels = [row[0] for row in db.query(OutboxMessage.channel).filter(self._claimable(OutboxMessage, now)).distinct()]
+
+            by_name = {n.name: n for n in self.notifiers}
+            workers = [by_name[c] for c in channels if c in by_name]
+            removed = [c for c in channels if c not in by_name]
+            if removed:
+                count = db.query(OutboxMessage).filter(
+                    OutboxMessage.channel.in_(removed),
+                    self._claimable(OutboxMessage, now)
+                ).update({"status": "failed", "last_error": "Channel no longer configured"}, synchronize_session=False)
+                db.commit()
+                logger.warning(f"Outbox: {count} messages for removed channels {', '.join(removed)} marked failed.")
 
-        for notifier in self.notifiers:
-            notifier.send_message(title, text)
+        if workers:
+            with ThreadPoolExecutor(max_workers=len(workers)) as executor:
+                list(executor.map(self._channel_worker, workers))
+
+        self._update_batches()
+
+    def _claimable(self, model, now: datetime):
+        return or_(
+            model.status == "pending",
+            and_(model.status == "sending", model.claim_expires_at < now)
+        )
+
+    def _claim_next(self, db, channel: str, token: str) -> list[OutboxMessage]:
+        """
+        Claim the chunks of the oldest batch that still has claimable chunks
+        on `channel`, in a single UPDATE so concurrent workers never claim the
+        same rows. Returns the claimed chunks in order.
+        """
+        now = datetime.now()
+        other = aliased(OutboxMessage)
+        oldest = select(other.batch_id).where(
+            other.channel == channel,
+            self._claimable(other, now)
+        ).order_by(other.created_at, other.batch_id, other.seq).limit(1).scalar_subquery()
+        db.execute(
+            update(OutboxMessage).where(
+                OutboxMessage.channel == channel,
+                OutboxMessage.batch_id == oldest,
+                self._claimable(OutboxMessage, now)
+            ).values(
+                status="sending",
+                claimed_by=token,
+                claim_expires_at=now + timedelta(seconds=settings.OUTBOX_CLAIM_SECONDS)
+            ).execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return db.query(OutboxMessage).filter(
+            OutboxMessage.channel == channel,
+            OutboxMessage.status == "sending",
+            OutboxMessage.claimed_by == token
+        ).order_by(OutboxMessage.seq).all()
+
+    def _save_claimed(self, db, msg: OutboxMessage, token: str, **values) -> bool:
+        """
+        Update a chunk we claimed and extend the lease on the rest of its
+        batch. Returns False if the claim was lost to another worker.
+        """
+        result = db.execute(
+            update(OutboxMessage).where(
+                OutboxMessage.id == msg.id,
+                OutboxMessage.claimed_by == token,
+                OutboxMessage.status == "sending"
+            ).values(**values).execution_options(synchronize_session=False)
+        )
+        db.execute(
+            update(OutboxMessage).where(
+                OutboxMessage.batch_id == msg.batch_id,
+                OutboxMessage.claimed_by == token,
+                OutboxMessage.status == "sending"
+            ).values(
+                claim_expires_at=datetime.now() + timedelta(seconds=settings.OUTBOX_CLAIM_SECONDS)
+            ).execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return result.rowcount == 1
+
+    def _channel_worker(self, notifier: BaseNotifier):
+        """
+        Send a channel's pending chunks batch by batch and in order, respecting
+        its rate limit and retrying with exponential backoff. If a chunk fails
+        for good, the rest of its batch on this channel is marked failed too.
+        """
+        # Unique per run: two flushes in one process must not share claims
+        token = f"{WORKER_ID}:{uuid.uuid4().hex[:8]}"
+        with SessionLocal() as db:
+            while messages := self._claim_next(db, notifier.name, token):
+                failed = False
+                for msg in messages:
+                    if failed:
+                        self._save_claimed(db, msg, token, status="failed", last_error="Skipped after an earlier chunk failed")
+                        continue
+
+                    attempts = msg.attempts or 0
+                    while True:
+                        notifier.rate_limiter.wait()
+                        attempts += 1
+                        try:
+                            notifier.deliver_chunk(msg.title, msg.content)
+                            values = dict(status="sent", sent_at=datetime.now(), last_error=None)
+                        except Exception as e:
+                            logger.error(f"{notifier.name} send failed (Attempt {attempts}/{settings.OUTBOX_MAX_ATTEMPTS}): {e}")
+                            values = dict(last_error=str(e))
+                            if attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                                values["status"] = "failed"
+                                failed = True
+                        if not self._save_claimed(db, msg, token, attempts=attempts, **values):
+                            logger.warning(f"{notifier.name} lost its claim on outbox batch {msg.batch_id}, leaving it to the other worker.")
+                            return
+                        if "status" in values:
+                            break
+                        time.sleep(settings.OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1))
+
+    def _update_batches(self):
+        """
+        Resolve pending batches whose messages are all sent or failed.
+        A batch is delivered when every channel received every chunk.
+        """
+        with SessionLocal() as db:
+            for (batch_id,) in db.query(OutboxBatch.batch_id).filter(OutboxBatch.status == "pending").all():
+                statuses = {row[0] for row in db.query(OutboxMessage.status).filter(OutboxMessage.batch_id == batch_id).distinct()}
+                if statuses & {"pending", "sending"}:
+                    continue
+                status = "failed" if "failed" in statuses else "delivered"
+                # Conditional, so a worker resolving the same batch concurrently does not log it twice
+                resolved = db.query(OutboxBatch).filter(
+                    OutboxBatch.batch_id == batch_id,
+                    OutboxBatch.status == "pending"
+                ).update({"status": status, "updated_at": datetime.now()}, synchronize_session=False)
+                if resolved:
+                    logger.info(f"Outbox batch {batch_id} {status}.")
+            db.commit()
 
-notifier = NotifierManager()
+notifier = LazyService(NotifierManager)
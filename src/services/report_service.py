@@ -1,41 +1,226 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from src.util.database import SessionLocal, Article
+from src.util import article_store
+from src.util.database import SessionLocal, Article, ReportFragment, ReportDraft, OutboxBatch
+from src.util.db_writer import db_writer
 from src.services.notifier import notifier
-from src.services.ai_service import ai_service
+from src.services.ai_service import ai_service, INSIGHT_ERROR_MESSAGE
 from src.constant.config import settings
 from src.util.logger import logger
 from datetime import datetime
+import hashlib
+import json
+
+DRAFT_ID = 1
 
 class ReportService:
+    def _in_flight_ids(self, db: Session) -> list[int]:
+        """
+        Articles of reports the outbox has not settled yet: still sending,
+        or failed on some channel with retries left.
+        """
+        ids = []
+        for (ref,) in db.query(OutboxBatch.ref).filter(
+            OutboxBatch.kind == "daily_report",
+            OutboxBatch.acknowledged == False
+        ):
+            ids.extend(json.loads(ref or "[]"))
+        return ids
+
+    def confirm_deliveries(self):
+        """
+        Apply outbox results: articles of a delivered report are marked sent.
+        A failed report is left to retry_pending_deliveries, which re-sends
+        only the channels that failed. Once its retries are used up, its
+        articles count as sent if any channel received the whole report
+        (re-reporting them would repeat them there), otherwise they stay
+        unsent and go out with the next report.
+        """
+        with SessionLocal() as db:
+            batches = db.query(OutboxBatch).filter(
+                OutboxBatch.kind == "daily_report",
+                OutboxBatch.status != "pending",
+                OutboxBatch.acknowledged == False
+            ).all()
+            for batch in batches:
+                ids = json.loads(batch.ref or "[]")
+                if batch.status == "failed" and batch.retries < settings.OUTBOX_BATCH_RETRIES:
+                    logger.warning(f"Report batch {batch.batch_id} failed on some channels, retrying them later.")
+                    continue
+                delivered = batch.status == "delivered"
+                if not delivered:
+                    channels = notifier.delivered_channels(batch.batch_id)
+                    if channels:
+                        logger.warning(f"Report batch {batch.batch_id} only reached {', '.join(channels)}, giving up on the other channels.")
+                        delivered = True
+                if delivered and ids:
+                    self._drop_draft(db, ids)
+                    article_store.mark_sent(db, ids)
+                    for chunk in article_store.chunked(ids):
+                        db.query(ReportFragment).filter(ReportFragment.article_id.in_(chunk)).delete(synchronize_session=False)
+                    logger.info(f"Report batch {batch.batch_id} delivered, {len(ids)} articles marked as sent.")
+                elif not delivered:
+                    logger.warning(f"Report batch {batch.batch_id} failed, {len(ids)} articles kept for the next report.")
+                batch.acknowledged = True
+            db.commit()
+
+    def _drop_draft(self, db: Session, ids: list[int]):
+        """
+        Delete the draft if it was built from the delivered report's fragments.
+        A draft refreshed in the meantime covers newer articles and is kept.
+        """
+        draft = db.get(ReportDraft, DRAFT_ID)
+        if not draft:
+            return
+        stored = {}
+        for chunk in article_store.chunked(ids):
+            stored.update(db.query(ReportFragment.article_id, ReportFragment.content).filter(ReportFragment.article_id.in_(chunk)))
+        if draft.fragments_key == self._fragments_key([stored.get(i, "") for i in ids]):
+            db.delete(draft)
+
+    def retry_pending_deliveries(self):
+        """
+        Resume outbox delivery left over from an earlier run, re-send the
+        failed channels of failed reports and apply the results.
+        """
+        notifier.retry_failed("daily_report")
+        notifier.flush_outbox()
+        self.confirm_deliveries()
+
+    def _render_fragment(self, article) -> str:
+        # Add date to title for clarity if needed, or just keep as is
+        return "\n".join([
+            f"### [{article.title}]({article.link})  (评分: {article.score})",
+            f"{article.summary}",
+            "" # Empty line
+        ])
+
+    def _fragments_key(self, fragments: list[str]) -> str:
+        return hashlib.sha256("\x00".join(fragments).encode("utf-8")).hexdigest()
+
+    def qualifies(self, article) -> bool:
+        """
+        Whether an article (an Article or a REPORT_COLUMNS row) is due for the next report.
+        """
+        return bool(
+            article.is_processed
+            and not article.is_sent
+            and not article.report_excluded
+            and not article.is_ad
+            and article.score >= settings.MIN_SCORE
+        )
+
+    def add_to_draft(self, article) -> bool:
+        """
+        Render and store the report fragment of a freshly analyzed article
+        (an Article or an article_store.REPORT_COLUMNS row).
+        Returns True if the article is part of the next report.
+        """
+        qualifies = self.qualifies(article)
+        content = self._render_fragment(article) if qualifies else None
+        db_writer.write(self._store_fragment, article.id, content)
+        return qualifies
+
+    def _store_fragment(self, db: Session, article_id: int, content: str | None):
+        if content is not None:
+            db.merge(ReportFragment(article_id=article_id, content=content))
+        else:
+            # Re-analysis may have dropped it below the threshold
+            db.query(ReportFragment).filter(ReportFragment.article_id == article_id).delete(synchronize_session=False)
+
+    def refresh_draft(self):
+        """
+        Recompute the partial insight of the rolling draft.
+        Called after each analysis batch; insight chunks are cached, so only
+        the chunks touched by new articles cost an LLM call.
+        """
+        with SessionLocal() as db:
+            ids, fragments = self._collect_report(db)
+            if not ids:
+                return
+
+            key = self._fragments_key(fragments)
+            draft = db.get(ReportDraft, DRAFT_ID)
+            if draft and draft.fragments_key == key:
+                return
+
+            insight = ai_service.generate_daily_insight(self._insight_input(ids, db))
+            if insight == INSIGHT_ERROR_MESSAGE:
+                logger.warning("Draft insight failed, keeping previous draft.")
+                return
+
+            db.merge(ReportDraft(id=DRAFT_ID, fragments_key=key, insight=insight, article_count=len(ids), updated_at=datetime.now()))
+            db.commit()
+            logger.info(f"Report draft updated ({len(ids)} articles).")
+
+    def _collect_report(self, db: Session) -> tuple[list[int], list[str]]:
+        """
+        Return the ids and rendered fragments of all reportable articles:
+        unsent, analyzed, non-ad articles scoring >= MIN_SCORE that are not part
+        of a report still being delivered by the outbox. Ordered by id so
+        insight chunks stay stable as articles arrive.
+        Streams ids in keyset batches and reads stored fragments; only articles
+        analyzed before the draft existed are loaded (narrow columns), rendered
+        and stored now.
+        """
+        in_flight = set(self._in_flight_ids(db))
+        ids, fragments = [], []
+        for rows in article_store.iter_reportable(db, settings.MIN_SCORE, columns=(Article.id,)):
+            batch_ids = [row.id for row in rows if row.id not in in_flight]
+            stored = {
+                article_id: content
+                for article_id, content in db.query(ReportFragment.article_id, ReportFragment.content)
+                .filter(ReportFragment.article_id.in_(batch_ids))
+            }
+            missing = [i for i in batch_ids if i not in stored]
+            if missing:
+                for row in db.execute(select(*article_store.REPORT_COLUMNS).where(Article.id.in_(missing))):
+                    stored[row.id] = self._render_fragment(row)
+                    db.add(ReportFragment(article_id=row.id, content=stored[row.id]))
+                db.commit()
+            ids.extend(batch_ids)
+            fragments.extend(stored[i] for i in batch_ids)
+        return ids, fragments
+
+    def _insight_input(self, ids: list[int], db: Session) -> list[dict]:
+        """
+        Titles and summaries of `ids` for the daily insight, streamed as narrow tuples.
+        """
+        wanted = set(ids)
+        return [
+            {"title": row.title, "summary": row.summary}
+            for rows in article_store.iter_reportable(db, settings.MIN_SCORE, columns=(Article.id, Article.title, Article.summary))
+            for row in rows
+            if row.id in wanted
+        ]
+
     def send_daily_report(self):
         logger.info("Starting daily report generation...")
+        self.retry_pending_deliveries()
         with SessionLocal() as db:
-            # Query unseen high-quality articles
-            # Criteria:
-            # 1. Not sent yet (is_sent == False)
-            # 2. Score >= threshold (e.g. 8)
-            # 3. Not an Ad
-            # 4. Must be processed (is_processed == True) - Ensure we only send analyzed ones
-            articles = db.query(Article).filter(
-                Article.is_sent == False,
-                Article.score >= settings.MIN_SCORE,
-                Article.is_ad == False,
-                Article.is_processed == True
-            ).all()
+            ids, fragments = self._collect_report(db)
 
-            if not articles:
+            if not ids:
                 logger.info("No new high-quality articles to report.")
                 return
 
-            logger.info(f"Found {len(articles)} articles to report.")
+            logger.info(f"Found {len(ids)} articles to report.")
 
-            # Prepare data for insight generation
-            articles_data = [{"title": a.title, "summary": a.summary} for a in articles]
-            daily_insight = ai_service.generate_daily_insight(articles_data)
+            # Finalize the draft: reuse the pre-computed insight if it still matches
+            key = self._fragments_key(fragments)
+            draft = db.get(ReportDraft, DRAFT_ID)
+            if draft and draft.fragments_key == key:
+                logger.info("Using pre-computed draft insight.")
+                daily_insight = draft.insight
+            else:
+                daily_insight = ai_service.generate_daily_insight(self._insight_input(ids, db))
+                if daily_insight == INSIGHT_ERROR_MESSAGE and draft:
+                    logger.warning("Insight generation failed, falling back to last draft insight.")
+                    daily_insight = draft.insight
 
             # Format message
             today_str = datetime.now().strftime("%Y-%m-%d")
-            
+
             message_lines = [
                 "",
                 f"> 💡 **总结**: {daily_insight}",
@@ -43,24 +228,24 @@ class ReportService:
                 "---",
                 ""
             ]
-            
-            for article in articles:
-                # Add date to title for clarity if needed, or just keep as is
-                line = f"### [{article.title}]({article.link})  (评分: {article.score})"
-                message_lines.append(line)
-                message_lines.append(f"{article.summary}")
-                message_lines.append("") # Empty line
-            
+            message_lines.extend(fragments)
+
             full_message = "\n".join(message_lines)
-            
-            # Send
+
+            # Send through the outbox
             # Notifier handles splitting if too long
-            notifier.send_markdown(f"今日精选日报 {today_str}", full_message)
-            
-            # Update DB
-            for article in articles:
-                article.is_sent = True
-            db.commit()
-            logger.info("Daily report sent and articles marked as sent.")
+            batch_id = notifier.send_markdown(
+                f"今日精选日报 {today_str}",
+                full_message,
+                kind="daily_report",
+                ref=json.dumps(ids)
+            )
+            if not batch_id:
+                logger.warning("Daily report not queued, articles stay unsent.")
+                return
+
+        # Articles are marked sent, and the draft dropped, only once the outbox confirms delivery
+        self.confirm_deliveries()
+        logger.info(f"Daily report batch {batch_id}: {notifier.batch_status(batch_id)}.")
 
 report_service = ReportService()
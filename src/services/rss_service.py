@@ -1,5 +1,3 @@
-import feedparser
-import requests
 from datetime import datetime
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
@@ -7,35 +5,125 @@ from src.util.database import SessionLocal, Article
 from src.services.ai_service import ai_service
 from src.services.content_processor import content_processor
 from src.services.storage_service import storage_service
-from src.util.logger import logger
+from src.services.report_service import report_service
+from src.services.search_service import search_service
+from src.services.archive_service import archive_service
+from src.services.websub_service import websub_service
+from src.services.fetch_scheduler import fetch_scheduler, SourceUnavailable
+from src.util.http_client import fetch_bytes, fetch_html, FetchError
+from src.util.job_lock import try_lock, unlock
+from src.util.db_writer import db_writer
+from src.util import article_store
+from src.constant.config import settings
+from src.util.logger import logger, sampled_logger
+from src.util.lazy import LazyService
+
+# Per-article INFO lines are sampled so logging cost stays flat during large fetches
+skip_log = sampled_logger("rss.skip")
+download_log = sampled_logger("rss.download")
+saved_log = sampled_logger("rss.saved")
+analysis_log = sampled_logger("rss.analysis")
 
 class RssService:
-    def fetch_and_process_feed(self, rss_url: str):
+    def fetch_and_process_feed(self, rss_url: str, extraction: str | None = None, fetch_mode: str = "incremental"):
+        """
+        Fetch a feed, save new entries and analyze pending articles.
+        extraction: "main" or "full" for pages fetched from article links;
+        defaults to settings.CONTENT_EXTRACTION.
+        fetch_mode: "incremental" stops a newest-first feed at known entries, "full" walks all entries.
+        """
         logger.info(f"Fetching RSS: {rss_url}")
         try:
-            feed = feedparser.parse(rss_url)
-            if feed.bozo:
-                logger.warning(f"Feed malformed for {rss_url}: {feed.bozo_exception}")
-            
-            subscription_name = feed.feed.get("title", "Unknown_Subscription")
-            logger.info(f"Subscription: {subscription_name}, Entries: {len(feed.entries)}")
-            
-            # Phase 1: Fetch and Save (Download + Update DB)
-            with SessionLocal() as db:
-                for entry in feed.entries:
-                    try:
-                        self._fetch_and_save_entry(entry, subscription_name, db)
-                    except Exception as e:
-                        logger.error(f"Error saving entry {entry.get('title', 'Unknown')}: {e}")
-                        db.rollback()
-                
-                # Phase 2: Analyze Pending Articles
-                self.process_pending_articles(db)
-                
+            feed = self._download_feed(rss_url)
+            # Subscribe for push delivery if the feed advertises a WebSub hub
+            websub_service.discover(rss_url, feed)
+            self.process_feed(feed, rss_url, extraction, fetch_mode)
         except Exception as e:
             logger.error(f"Error processing feed {rss_url}: {e}")
 
-    def _fetch_and_save_entry(self, entry, subscription_name, db: Session):
+    def process_feed(self, feed, rss_url: str, extraction: str | None = None, fetch_mode: str = "incremental"):
+        """
+        Save new entries of a parsed feed and analyze pending articles.
+        Shared by polling and WebSub push deliveries.
+        """
+        extraction = extraction or settings.CONTENT_EXTRACTION
+        if feed.bozo:
+            logger.warning(f"Feed malformed for {rss_url}: {feed.bozo_exception}")
+        
+        subscription_name = feed.feed.get("title", "Unknown_Subscription")
+        logger.info(f"Subscription: {subscription_name}, Entries: {len(feed.entries)}")
+        
+        # Phase 1: Fetch and Save (Download + Update DB)
+        with SessionLocal() as db:
+            entries = feed.entries if fetch_mode == "full" else self._entries_to_process(feed.entries, db)
+            for entry in entries:
+                try:
+                    self._fetch_and_save_entry(entry, subscription_name, db, extraction)
+                except Exception as e:
+                    logger.error(f"Error saving entry {entry.get('title', 'Unknown')}: {e}")
+                    db.rollback()
+            
+            # Phase 2: Analyze Pending Articles
+            self.process_pending_articles(db)
+
+    def _download_feed(self, rss_url: str):
+        """
+        Download the feed with our bounded HTTP client and parse it from bytes.
+        """
+        import feedparser
+        result = fetch_scheduler.run(
+            rss_url,
+            lambda: fetch_bytes(rss_url, max_bytes=settings.FEED_MAX_BYTES, timeout=settings.FEED_TIMEOUT_SECONDS),
+            feed_key=fetch_scheduler.feed_key(rss_url)
+        )
+        return feedparser.parse(
+            result.content,
+            response_headers={k.lower(): v for k, v in result.headers.items()}
+        )
+
+    def _entries_to_process(self, entries: list, db: Session) -> list:
+        """
+        For newest-first feeds, cut the entry list after a run of
+        FEED_KNOWN_STREAK entries that are already analyzed or archived.
+        Entries whose row exists but is still pending (page fetch failed or
+        skipped by an open breaker) do not count as known, so they are
+        fetched again. Feeds without a reliable date order are processed in full.
+        """
+        streak_limit = settings.FEED_KNOWN_STREAK
+        if streak_limit <= 0 or len(entries) <= streak_limit or not self._is_newest_first(entries):
+            return entries
+
+        ids = [self._entry_id(entry) for entry in entries]
+        known = {
+            row[0] for row in db.query(Article.entry_id).filter(
+                Article.entry_id.in_([i for i in ids if i]),
+                Article.is_processed == True
+            )
+        }
+        known |= archive_service.seen_entry_ids([i for i in ids if i and i not in known], db)
+
+        streak = 0
+        for index, entry_id in enumerate(ids):
+            streak = streak + 1 if entry_id in known else 0
+            if streak >= streak_limit:
+                cut = index + 1 - streak
+                logger.info(f"Reached {streak} known entries in a row, processing {cut} of {len(entries)} entries")
+                return entries[:cut]
+        return entries
+
+    def _is_newest_first(self, entries: list) -> bool:
+        dates = [entry.get("published_parsed") or entry.get("updated_parsed") for entry in entries]
+        if any(d is None for d in dates):
+            return False
+        return all(a >= b for a, b in zip(dates, dates[1:]))
+
+    def _entry_id(self, entry) -> str:
+        raw_id = entry.get("id", "")
+        if not raw_id:
+             raw_id = entry.get("title", "") + entry.get("author", "")  + entry.get("summary", "")
+        return raw_id.strip()
+
+    def _fetch_and_save_entry(self, entry, subscription_name, db: Session, extraction: str = "full"):
         # 1. Clean ID and Link
         # ... (Extraction logic) ...
         raw_link = entry.get("link", "")
@@ -49,11 +137,7 @@ class RssService:
 
         link = raw_link.strip().replace("`", "").strip()
         
-        raw_id = entry.get("id", "")
-        if not raw_id:
-             raw_id = entry.get("title", "") + entry.get("author", "")  + entry.get("summary", "")
-        
-        entry_id = raw_id.strip()
+        entry_id = self._entry_id(entry)
         title = entry.get("title", "No Title").strip()
         
         if not link or not entry_id:
@@ -81,15 +165,19 @@ class RssService:
                 if not existing.subscription_name:
                     existing.subscription_name = subscription_name
                     db.commit()
-                logger.info(f"Skipping existing article (DB+File present): {title}")
+                skip_log.info("Skipping existing article (DB+File present): %s", title)
                 return # All good, skip
             else:
                 logger.warning(f"Article exists in DB but MD file missing: {title}. Re-fetching...")
                 article = existing
+        elif archive_service.is_archived(entry_id, db):
+            skip_log.info("Skipping archived article: %s", title)
+            return
         else:
-            logger.info(f"Downloading new article: {title}")
+            download_log.info("Downloading new article: %s", title)
             try:
-                article = Article(
+                db_writer.write(
+                    article_store.insert_article,
                     entry_id=entry_id,
                     title=title,
                     link=link,
@@ -103,9 +191,6 @@ class RssService:
                     created_at=datetime.now(),
                     updated_at=datetime.now()
                 )
-                db.add(article)
-                db.commit() 
-                db.refresh(article)
             except IntegrityError:
                 db.rollback()
                 logger.warning(f"IntegrityError for {title}, checking if we need to repair...")
@@ -117,7 +202,7 @@ class RssService:
                         if not existing_after_race.subscription_name:
                              existing_after_race.subscription_name = subscription_name
                              db.commit()
-                        logger.info(f"Skipping existing article (Race winner handled it): {title}")
+                        skip_log.info("Skipping existing article (Race winner handled it): %s", title)
                         return # Race winner did the job
                     else:
                         logger.warning(f"Race winner failed to save file for {title}. Re-fetching...")
@@ -136,19 +221,18 @@ class RssService:
                     content_text = content.get('value')
                     break
         
+        page_encoding = None
         if not content_text:
-             logger.info(f"No content in RSS, fetching from: {link}")
+             logger.debug("No content in RSS, fetching from: %s", link)
              try:
-                 headers = {
-                     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-                 }
-                 resp = requests.get(link, headers=headers, timeout=15)
-                 if resp.status_code == 200:
-                     content_text = resp.text
-                     source_type = "fetch"
-                 else:
-                     logger.error(f"Failed to fetch content, status: {resp.status_code}")
-             except Exception as e:
+                 content_text, page_encoding = fetch_scheduler.run(
+                     link,
+                     lambda: fetch_html(link, max_bytes=settings.PAGE_MAX_BYTES, timeout=settings.PAGE_TIMEOUT_SECONDS)
+                 )
+                 source_type = "fetch"
+             except SourceUnavailable as e:
+                 logger.warning(f"Skipping content fetch for {title}: {e}")
+             except FetchError as e:
                  logger.error(f"Failed to fetch content from {link}: {e}")
 
         if not content_text:
@@ -157,35 +241,62 @@ class RssService:
 
         # 5. Save Files
         if source_type == "fetch":
-             content_md = content_processor.html_to_md(content_text)
+             # Fetched pages carry site chrome; RSS content is already the article
+             content_md = content_processor.html_to_md(
+                 content_text,
+                 encoding=page_encoding,
+                 extract_main=(extraction == "main")
+             )
         else:
              content_md = content_processor.html_to_md(content_text)
 
         storage_service.save_html(subscription_name, date_str, title, content_text)
         storage_service.save_md(subscription_name, date_str, title, content_md)
-        logger.info(f"Saved files for: {title}")
+        saved_log.info("Saved files for: %s", title)
 
     def process_pending_articles(self, db: Session):
         """
         Analyze articles that have been downloaded but not processed.
+        Pending articles are streamed as narrow tuples in keyset batches,
+        so memory stays flat however large the backlog is.
         """
-        # Query for pending articles
-        # Limit to 10 per batch to avoid timeouts if backlog is huge
-        pending_articles = db.query(Article).filter(Article.is_processed == False).all()
-        
-        if not pending_articles:
-            return
+        found = 0
+        drafted = 0
+        for rows in article_store.iter_pending(db, settings.ANALYZE_BATCH_SIZE):
+            found += len(rows)
+            for row in rows:
+                # Claim the article so other workers analyzing in parallel skip it
+                claim = f"article:{row.id}"
+                if not try_lock(claim, settings.ANALYZE_CLAIM_SECONDS):
+                    continue
+                try:
+                    # Another worker may have finished it since this batch was read
+                    if not article_store.unprocessed_ids(db, [row.id]):
+                        continue
+                    if self._analyze_single_article(row, db):
+                        drafted += 1
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Error analyzing article {row.title}: {e}")
+                finally:
+                    unlock(claim)
 
-        logger.info(f"Found {len(pending_articles)} pending articles to analyze.")
-        
-        for article in pending_articles:
+        if found:
+            logger.info(f"Processed {found} pending articles.")
+
+        # Keep the rolling report draft current so the scheduled push only sends
+        if drafted:
             try:
-                self._analyze_single_article(article, db)
+                report_service.refresh_draft()
             except Exception as e:
-                logger.error(f"Error analyzing article {article.title}: {e}")
+                logger.error(f"Error refreshing report draft: {e}")
 
-    def _analyze_single_article(self, article: Article, db: Session):
-        logger.info(f"Analyzing article: {article.title}")
+    def _analyze_single_article(self, article, db: Session) -> bool:
+        """
+        Analyze one article (an article_store.PENDING_COLUMNS row).
+        Returns True if it was added to the report draft.
+        """
+        logger.debug("Analyzing article: %s", article.title)
         
         date_str = article.publish_date.strftime("%Y-%m-%d")
         
@@ -201,23 +312,33 @@ class RssService:
             # If file is missing, maybe we should mark it as failed or try to re-download?
             # For now, let's leave it as is_processed=False so it gets picked up if file appears (unlikely)
             # Or maybe we should delete the DB record to force re-fetch?
-            return
+            return False
 
         # AI Analysis
         analysis_result = ai_service.analyze_article(article.title, content_md)
         
-        # Update DB
-        article.summary = analysis_result.get("summary", "No summary")
-        article.score = analysis_result.get("score", 0)
-        article.is_ad = analysis_result.get("is_ad", False)
-        article.is_processed = True
-        article.updated_at = datetime.now()
-        
-        db.commit()
-        logger.info(f"Analysis complete: {article.title} (Score: {article.score})")
+        # Update DB with a single UPDATE by id; skipped if another worker got there first
+        if not db_writer.write(
+            article_store.save_analysis,
+            article.id,
+            summary=analysis_result.get("summary", "No summary"),
+            score=analysis_result.get("score", 0),
+            is_ad=analysis_result.get("is_ad", False)
+        ):
+            return False
+        analyzed = article_store.get_report_row(db, article.id)
+        analysis_log.info("Analysis complete: %s (Score: %s)", analyzed.title, analyzed.score)
+
+        # Update search index
+        try:
+            search_service.index_article(analyzed, content_md)
+        except Exception as e:
+            logger.error(f"Error indexing article {analyzed.title}: {e}")
         
         # Save Summary
-        storage_service.save_markdown(article.subscription_name, date_str, article.title, article.summary, is_summary=True)
+        storage_service.save_markdown(article.subscription_name, date_str, article.title, analyzed.summary, is_summary=True)
+
+        return report_service.add_to_draft(analyzed)
 
 
-rss_service = RssService()
+rss_service = LazyService(RssService)
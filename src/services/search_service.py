@@ -0,0 +1,225 @@
+import re
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import text
+from src.util.database import engine, SessionLocal, Article, ArchivedArticle
+from src.util.db_writer import db_writer
+from src.services.storage_service import storage_service
+from src.util.logger import logger
+
+# Trigram tokenizer handles CJK text without a word segmenter,
+# but only matches terms of 3+ characters. Shorter terms (two-character CJK
+# words are the common case) go to articles_fts_short: a unicode61 index over
+# the same text with CJK runs split into overlapping bigrams.
+MIN_MATCH_CHARS = 3
+CJK_RUN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+")
+
+def _split_cjk(text: str, tail: bool = True) -> str:
+    """
+    "机器学习" -> "机器 器学 学习 习". Other text is left to unicode61 word
+    splitting. The trailing single character (tail) lets a one-character
+    query match the last character of a run as a prefix.
+    """
+    def grams(match: re.Match) -> str:
+        run = match.group()
+        parts = [run[i:i + 2] for i in range(len(run) - 1)] or [run]
+        if tail and len(run) > 1:
+            parts.append(run[-1])
+        return f" {' '.join(parts)} "
+    return CJK_RUN.sub(grams, text or "")
+
+def _fts_phrase(term: str) -> str:
+    # Quote every term so user input is never parsed as FTS5 syntax
+    return '"' + term.replace('"', '""') + '"'
+
+class SearchService:
+    def init_index(self):
+        """
+        Create the FTS5 indexes over article title, summary and cleaned markdown:
+        articles_fts (trigram) and articles_fts_short (CJK bigrams, for terms
+        under MIN_MATCH_CHARS). The rowid of both is the article id.
+        """
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts "
+                "USING fts5(title, summary, content, tokenize='trigram')"
+            ))
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts_short "
+                "USING fts5(title, summary, content, tokenize='unicode61')"
+            ))
+
+    def index_article(self, article: Article, content_md: str):
+        """
+        Add or replace one article in the index. Queued on the database writer.
+        """
+        db_writer.submit(self._write_index, article.id, article.title, article.summary, content_md)
+
+    def _write_index(self, db, article_id: int, title: str, summary: str | None, content_md: str | None):
+        row = {"id": article_id, "title": title, "summary": summary or "", "content": content_md or ""}
+        db.execute(text("DELETE FROM articles_fts WHERE rowid = :id"), {"id": article_id})
+        db.execute(
+            text("INSERT INTO articles_fts (rowid, title, summary, content) VALUES (:id, :title, :summary, :content)"),
+            row
+        )
+        db.execute(text("DELETE FROM articles_fts_short WHERE rowid = :id"), {"id": article_id})
+        db.execute(
+            text("INSERT INTO articles_fts_short (rowid, title, summary, content) VALUES (:id, :title, :summary, :content)"),
+            {**row, "title": _split_cjk(title), "summary": _split_cjk(row["summary"]), "content": _split_cjk(row["content"])}
+        )
+
+    def rebuild_index(self, batch_size: int = 500) -> int:
+        """
+        Index processed articles (hot and archived) that are missing from the
+        index, reading markdown from storage where it still exists.
+        """
+        count = 0
+        for model in (Article, ArchivedArticle):
+            last_id = 0
+            while True:
+                with engine.connect() as conn:
+                    rows = conn.execute(text(
+                        f"SELECT a.id FROM {model.__tablename__} a "
+                        "WHERE a.is_processed = 1 AND a.id > :last_id "
+                        "AND (a.id NOT IN (SELECT rowid FROM articles_fts) "
+                        "OR a.id NOT IN (SELECT rowid FROM articles_fts_short)) "
+                        "ORDER BY a.id LIMIT :limit"
+                    ), {"last_id": last_id, "limit": batch_size}).fetchall()
+                if not rows:
+                    break
+                ids = [r[0] for r in rows]
+                last_id = ids[-1]
+
+                with SessionLocal() as db:
+                    for article in db.query(
+                        model.id, model.title, model.summary, model.subscription_name, model.publish_date
+                    ).filter(model.id.in_(ids)):
+                        date_str = article.publish_date.strftime("%Y-%m-%d")
+                        file_path = storage_service.get_file_path(article.subscription_name, date_str, article.title, extension="md")
+                        content_md = storage_service.read_file(file_path) or ""
+                        self.index_article(article, content_md)
+                        count += 1
+                # The next batch query must see this batch indexed
+                db_writer.flush()
+                logger.info(f"Search index rebuild: {count} articles indexed so far")
+
+        logger.info(f"Search index rebuild completed. Indexed {count} articles.")
+        return count
+
+    def search(self, query: str, limit: int = 20, subscription: str | None = None) -> list[dict]:
+        """
+        Ranked full-text search (bm25, title weighted highest) over hot and
+        archived articles. Each index row is joined to whichever table holds
+        its id, both by primary key. Terms of 3+ characters match the trigram
+        index, shorter ones the bigram index as prefix phrases; every term
+        goes through an index, none through a LIKE scan.
+        """
+        terms = [t for t in query.split() if t]
+        if not terms:
+            return []
+
+        match_terms = [t for t in terms if len(t) >= MIN_MATCH_CHARS]
+        short_terms = [t for t in terms if len(t) < MIN_MATCH_CHARS]
+
+        where = []
+        params: dict = {"limit": limit}
+        if short_terms:
+            params["short"] = " ".join(_fts_phrase(_split_cjk(t, tail=False).strip()) + " *" for t in short_terms)
+        if match_terms:
+            index = "articles_fts"
+            where.append("articles_fts MATCH :match")
+            params["match"] = " ".join(_fts_phrase(t) for t in match_terms)
+            if short_terms:
+                where.append("f.rowid IN (SELECT rowid FROM articles_fts_short WHERE articles_fts_short MATCH :short)")
+            snippet = "snippet(articles_fts, -1, '[', ']', '…', 16)"
+        else:
+            # Bigram text is not readable; show the start of the summary instead
+            index = "articles_fts_short"
+            where.append("articles_fts_short MATCH :short")
+            snippet = "substr(COALESCE(a.summary, r.summary), 1, 120)"
+        if subscription:
+            where.append("COALESCE(a.subscription_name, r.subscription_name) = :subscription")
+            params["subscription"] = subscription
+        # Index rows of articles deleted by cleanup match neither table
+        where.append("(a.id IS NOT NULL OR r.id IS NOT NULL)")
+
+        rank = f"bm25({index}, 10.0, 5.0, 1.0)"
+        sql = (
+            f"SELECT f.rowid AS id, COALESCE(a.title, r.title) AS title, COALESCE(a.link, r.link) AS link, "
+            f"COALESCE(a.subscription_name, r.subscription_name) AS subscription_name, "
+            f"COALESCE(a.publish_date, r.publish_date) AS publish_date, COALESCE(a.score, r.score) AS score, "
+            f"r.id IS NOT NULL AS archived, "
+            f"{snippet} AS snippet, {rank} AS rank "
+            f"FROM {index} f "
+            f"LEFT JOIN articles a ON a.id = f.rowid "
+            f"LEFT JOIN articles_archive r ON r.id = f.rowid "
+            f"WHERE {' AND '.join(where)} ORDER BY rank LIMIT :limit"
+        )
+        with engine.connect() as conn:
+            rows = conn.execute(text(sql), params).mappings().all()
+        return [dict(r, archived=bool(r["archived"])) for r in rows]
+
+    def list_articles(
+        self,
+        subscription: str | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        min_score: int | None = None,
+        max_score: int | None = None,
+        cursor: str | None = None,
+        limit: int = 50
+    ) -> dict:
+        """
+        Filtered listing of hot and archived articles, newest first, with keyset
+        pagination on (publish_date, id). Each table is read with the same
+        indexed keyset query and the two pages are merged; ids are unique
+        across both tables.
+        Returns {"items": [...], "next_cursor": str | None}.
+        """
+        cursor_key = _decode_cursor(cursor) if cursor else None
+        rows = []
+        with SessionLocal() as db:
+            for model in (Article, ArchivedArticle):
+                query = db.query(
+                    model.id, model.title, model.link, model.subscription_name,
+                    model.publish_date, model.score, model.is_ad, model.is_sent
+                )
+                if subscription:
+                    query = query.filter(model.subscription_name == subscription)
+                if date_from:
+                    query = query.filter(model.publish_date >= datetime.combine(date_from, time.min))
+                if date_to:
+                    query = query.filter(model.publish_date < datetime.combine(date_to + timedelta(days=1), time.min))
+                if min_score is not None:
+                    query = query.filter(model.score >= min_score)
+                if max_score is not None:
+                    query = query.filter(model.score <= max_score)
+                if cursor_key:
+                    cursor_date, cursor_id = cursor_key
+                    query = query.filter(
+                        (model.publish_date < cursor_date)
+                        | ((model.publish_date == cursor_date) & (model.id < cursor_id))
+                    )
+                archived = model is ArchivedArticle
+                rows.extend(
+                    dict(r._mapping, archived=archived)
+                    for r in query.order_by(model.publish_date.desc(), model.id.desc()).limit(limit + 1)
+                )
+
+        rows.sort(key=lambda r: (r["publish_date"] or datetime.min, r["id"]), reverse=True)
+        items = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            last = items[-1]
+            next_cursor = f"{last['publish_date'].isoformat()}|{last['id']}"
+        return {"items": items, "next_cursor": next_cursor}
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        date_part, id_part = cursor.rsplit("|", 1)
+        return datetime.fromisoformat(date_part), int(id_part)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+search_service = SearchService()
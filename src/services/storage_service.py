@@ -3,6 +3,7 @@ import re
 from datetime import datetime
 from src.constant.config import settings
 from src.util.logger import logger
+from src.util.lazy import LazyService
 
 class StorageService:
     def __init__(self):
@@ -82,16 +83,17 @@ class StorageService:
         try:
             with open(file_path, "w", encoding="utf-8") as f:
                 f.write(content)
-            logger.info(f"Saved file: {file_path}")
+            logger.debug("Saved file: %s", file_path)
             return file_path
         except Exception as e:
             logger.error(f"Failed to save file {file_path}: {e}")
             return None
 
-    def save_html(self, subscription_name: str, date_str: str, title: str, content: str):
+    def save_html(self, subscription_name: str, date_str: str, title: str, content: str | bytes):
         """
         Save HTML content to file.
         Structure: base_dir/{subscription_name}/{date_str}/{title}.html
+        Bytes are written as downloaded, keeping the page's own charset.
         """
         safe_sub_name = self._sanitize_filename(subscription_name)
         safe_title = self._sanitize_filename(title)
@@ -103,9 +105,13 @@ class StorageService:
         file_path = os.path.join(folder_path, filename)
         
         try:
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(content)
-            logger.info(f"Saved HTML file: {file_path}")
+            if isinstance(content, bytes):
+                with open(file_path, "wb") as f:
+                    f.write(content)
+            else:
+                with open(file_path, "w", encoding="utf-8") as f:
+                    f.write(content)
+            logger.debug("Saved HTML file: %s", file_path)
             return file_path
         except Exception as e:
             logger.error(f"Failed to save HTML file {file_path}: {e}")
@@ -128,7 +134,7 @@ class StorageService:
                     if (now - file_mtime).days > days:
                         os.remove(file_path)
                         count += 1
-                        logger.debug(f"Deleted old file: {file_path}")
+                        logger.debug("Deleted old file: %s", file_path)
                 except Exception as e:
                     logger.error(f"Error checking/deleting file {file_path}: {e}")
         
@@ -139,11 +145,11 @@ class StorageService:
                 try:
                     if not os.listdir(dir_path):
                         os.rmdir(dir_path)
-                        logger.debug(f"Removed empty directory: {dir_path}")
+                        logger.debug("Removed empty directory: %s", dir_path)
                 except OSError:
                     pass
                     
         logger.info(f"Cleanup completed. Deleted {count} files.")
 
 
-storage_service = StorageService()
+storage_service = LazyService(StorageService)
@@ -0,0 +1,217 @@
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Iterator
+from sqlalchemy.exc import IntegrityError
+from src.util.database import SessionLocal, Subscription
+from src.util.db_writer import db_writer
+from src.util.logger import logger
+
+FETCH_MODES = ("incremental", "full")
+EXTRACTION_MODES = ("main", "full")
+EDITABLE_FIELDS = ("url", "title", "enabled", "fetch_mode", "extraction", "priority")
+# NULL priority would break the (priority desc, id) cursor of iter_enabled_batches
+REQUIRED_FIELDS = ("url", "enabled", "fetch_mode", "priority")
+
+class DuplicateSubscription(ValueError):
+    """
+    Raised when a subscription with the same url already exists.
+    """
+
+class SubscriptionService:
+    def _to_dict(self, sub: Subscription) -> dict:
+        return {
+            "id": sub.id,
+            "url": sub.url,
+            "title": sub.title,
+            "enabled": sub.enabled,
+            "fetch_mode": sub.fetch_mode,
+            "extraction": sub.extraction,
+            "priority": sub.priority,
+            "created_at": sub.created_at,
+            "updated_at": sub.updated_at,
+            "last_fetched_at": sub.last_fetched_at,
+        }
+
+    def _validate(self, fields: dict):
+        for key in REQUIRED_FIELDS:
+            if key in fields and fields[key] is None:
+                raise ValueError(f"{key} must not be null")
+        if "url" in fields and not (fields["url"] or "").strip():
+            raise ValueError("url must not be empty")
+        if fields.get("fetch_mode") not in (None, *FETCH_MODES):
+            raise ValueError(f"fetch_mode must be one of {FETCH_MODES}")
+        if fields.get("extraction") not in (None, *EXTRACTION_MODES):
+            raise ValueError(f"extraction must be one of {EXTRACTION_MODES}")
+
+    def list_subscriptions(self, enabled: bool | None = None, after_id: int = 0, limit: int = 100) -> dict:
+        """
+        List subscriptions by id with keyset pagination.
+        Returns {"items": [...], "next_cursor": int | None}.
+        """
+        with SessionLocal() as db:
+            query = db.query(Subscription).filter(Subscription.id > after_id)
+            if enabled is not None:
+                query = query.filter(Subscription.enabled == enabled)
+            rows = query.order_by(Subscription.id).limit(limit + 1).all()
+            items = [self._to_dict(s) for s in rows[:limit]]
+        next_cursor = items[-1]["id"] if len(rows) > limit else None
+        return {"items": items, "next_cursor": next_cursor}
+
+    def get(self, subscription_id: int) -> dict | None:
+        with SessionLocal() as db:
+            sub = db.get(Subscription, subscription_id)
+            return self._to_dict(sub) if sub else None
+
+    def create(self, url: str, **fields) -> dict:
+        """
+        Add a subscription. Raises ValueError on invalid options and
+        DuplicateSubscription on a duplicate url.
+        """
+        fields = {k: v for k, v in fields.items() if k in EDITABLE_FIELDS and v is not None}
+        fields["url"] = url.strip()
+        self._validate(fields)
+        with SessionLocal() as db:
+            sub = Subscription(**fields)
+            db.add(sub)
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                raise DuplicateSubscription(f"Subscription already exists: {url}")
+            db.refresh(sub)
+            logger.info(f"Subscription added: {sub.url}")
+            return self._to_dict(sub)
+
+    def update(self, subscription_id: int, **fields) -> dict | None:
+        """
+        Update the given fields. Returns None if the subscription does not exist.
+        Raises ValueError on invalid values and DuplicateSubscription on a duplicate url.
+        """
+        fields = {k: v for k, v in fields.items() if k in EDITABLE_FIELDS}
+        self._validate(fields)
+        with SessionLocal() as db:
+            sub = db.get(Subscription, subscription_id)
+            if not sub:
+                return None
+            for key, value in fields.items():
+                setattr(sub, key, value.strip() if key == "url" else value)
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                raise DuplicateSubscription(f"Subscription already exists: {fields.get('url')}")
+            db.refresh(sub)
+            return self._to_dict(sub)
+
+    def delete(self, subscription_id: int) -> bool:
+        with SessionLocal() as db:
+            count = db.query(Subscription).filter(Subscription.id == subscription_id).delete(synchronize_session=False)
+            db.commit()
+        return count > 0
+
+    def seed_from_env(self, rss_urls: str) -> int:
+        """
+        Import the legacy comma-separated RSS_URLS setting into an empty
+        subscriptions table. Once the table has rows it is managed through
+        the API, so feeds deleted there are not brought back on restart.
+        """
+        with SessionLocal() as db:
+            if db.query(Subscription.id).first():
+                return 0
+        urls = [url.strip() for url in rss_urls.split(",") if url.strip()]
+        return self._insert_missing([{"url": url} for url in urls])
+
+    def import_opml(self, content: bytes) -> dict:
+        """
+        Import feeds from OPML (every <outline> with an xmlUrl, at any depth).
+        Existing urls are skipped. Raises ValueError on malformed OPML.
+        """
+        try:
+            root = ET.fromstring(content)
+        except ET.ParseError as e:
+            raise ValueError(f"Invalid OPML: {e}")
+
+        entries = []
+        for outline in root.iter("outline"):
+            url = (outline.get("xmlUrl") or "").strip()
+            if url:
+                entries.append({"url": url, "title": outline.get("title") or outline.get("text")})
+        added = self._insert_missing(entries)
+        logger.info(f"OPML import: {len(entries)} feeds found, {added} added")
+        return {"found": len(entries), "added": added}
+
+    def export_opml(self) -> str:
+        """
+        Export all subscriptions as OPML 2.0. Disabled feeds are included, marked with a category.
+        """
+        root = ET.Element("opml", version="2.0")
+        head = ET.SubElement(root, "head")
+        ET.SubElement(head, "title").text = "CrawlWess subscriptions"
+        ET.SubElement(head, "dateCreated").text = datetime.now().strftime("%a, %d %b %Y %H:%M:%S")
+        body = ET.SubElement(root, "body")
+
+        with SessionLocal() as db:
+            rows = db.query(Subscription.url, Subscription.title, Subscription.enabled).order_by(Subscription.id).yield_per(1000)
+            for url, title, enabled in rows:
+                attrs = {"type": "rss", "text": title or url, "xmlUrl": url}
+                if title:
+                    attrs["title"] = title
+                if not enabled:
+                    attrs["category"] = "disabled"
+                ET.SubElement(body, "outline", attrs)
+
+        return ET.tostring(root, encoding="unicode", xml_declaration=True)
+
+    def _insert_missing(self, entries: list[dict], batch_size: int = 500) -> int:
+        added = 0
+        for start in range(0, len(entries), batch_size):
+            batch = entries[start:start + batch_size]
+            with SessionLocal() as db:
+                urls = [e["url"] for e in batch]
+                existing = {row[0] for row in db.query(Subscription.url).filter(Subscription.url.in_(urls))}
+                for entry in batch:
+                    if entry["url"] in existing:
+                        continue
+                    existing.add(entry["url"])
+                    db.add(Subscription(**entry))
+                    added += 1
+                db.commit()
+        return added
+
+    def iter_enabled_batches(self, batch_size: int) -> Iterator[list[dict]]:
+        """
+        Yield enabled subscriptions in priority order, `batch_size` at a time,
+        using keyset pagination on (priority desc, id) so each batch is one
+        indexed query.
+        """
+        last = None
+        while True:
+            with SessionLocal() as db:
+                query = db.query(
+                    Subscription.id, Subscription.url, Subscription.fetch_mode,
+                    Subscription.extraction, Subscription.priority, Subscription.last_fetched_at
+                ).filter(Subscription.enabled == True)
+                if last is not None:
+                    last_priority, last_id = last
+                    query = query.filter(
+                        (Subscription.priority < last_priority)
+                        | ((Subscription.priority == last_priority) & (Subscription.id > last_id))
+                    )
+                rows = query.order_by(Subscription.priority.desc(), Subscription.id).limit(batch_size).all()
+
+            if not rows:
+                return
+            yield [dict(r._mapping) for r in rows]
+            last = (rows[-1].priority, rows[-1].id)
+
+    def mark_fetched(self, subscription_ids: list[int]):
+        if not subscription_ids:
+            return
+        db_writer.submit(self._set_last_fetched, subscription_ids, datetime.now())
+
+    def _set_last_fetched(self, db, subscription_ids: list[int], fetched_at: datetime):
+        db.query(Subscription).filter(Subscription.id.in_(subscription_ids)).update(
+            {Subscription.last_fetched_at: fetched_at}, synchronize_session=False
+        )
+
+subscription_service = SubscriptionService()
@@ -0,0 +1,271 @@
+import hashlib
+import hmac
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from src.constant.config import settings
+from src.util.database import SessionLocal, Subscription, WebSubSubscription
+from src.util.logger import logger
+
+SIGNATURE_METHODS = {"sha1": hashlib.sha1, "sha256": hashlib.sha256, "sha384": hashlib.sha384, "sha512": hashlib.sha512}
+
+class WebSubService:
+    """
+    WebSub (PubSubHubbub) subscriber.
+    - discover(): called for every polled feed; subscribes at the hub the
+      feed advertises (atom:link rel="hub" or an HTTP Link header).
+    - verify(): answers the hub's intent verification on the callback.
+    - receive(): accepts pushed content signed with our per-subscription
+      secret and feeds it into the same save/analyze path as polling.
+    - renew_leases(): renews expiring leases, expires unverified requests
+      and unsubscribes feeds that were removed or disabled.
+    Feeds with an active lease are skipped by the hourly poll (see
+    active_feed_urls); everything else keeps polling.
+    """
+    def __init__(self):
+        # Push processing runs off the request thread so the hub gets its 2xx at once
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="websub")
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.PUBLIC_BASE_URL)
+
+    def _callback_url(self, token: str) -> str:
+        return f"{settings.PUBLIC_BASE_URL.rstrip('/')}/websub/callback/{token}"
+
+    def _find_links(self, feed) -> tuple[str | None, str | None]:
+        """
+        (hub, self) links of a parsed feed, from the feed itself or its HTTP Link header.
+        """
+        hub = topic = None
+        for link in feed.feed.get("links", []):
+            if link.get("rel") == "hub" and not hub:
+                hub = link.get("href")
+            elif link.get("rel") == "self" and not topic:
+                topic = link.get("href")
+
+        header = (feed.get("headers") or {}).get("link")
+        if header and not (hub and topic):
+            from requests.utils import parse_header_links
+            for link in parse_header_links(header):
+                rels = (link.get("rel") or "").split()
+                if "hub" in rels and not hub:
+                    hub = link.get("url")
+                if "self" in rels and not topic:
+                    topic = link.get("url")
+        return hub, topic
+
+    def discover(self, feed_url: str, feed):
+        """
+        Subscribe to the feed's hub, unless already subscribed there or recently refused.
+        """
+        if not self.enabled:
+            return
+        hub, topic = self._find_links(feed)
+        if not hub:
+            return
+        topic = topic or feed_url
+        now = datetime.now()
+
+        with SessionLocal() as db:
+            sub = db.query(WebSubSubscription).filter(WebSubSubscription.feed_url == feed_url).first()
+            if sub and sub.hub == hub and sub.topic == topic:
+                if sub.state in ("pending", "subscribed", "unsubscribing"):
+                    return
+                if sub.requested_at and sub.requested_at > now - timedelta(seconds=settings.WEBSUB_RETRY_SECONDS):
+                    return
+            if not sub:
+                sub = WebSubSubscription(feed_url=feed_url)
+                db.add(sub)
+            sub.hub, sub.topic = hub, topic
+            # Fresh callback and secret for every new subscription
+            sub.token = secrets.token_urlsafe(24)
+            sub.secret = secrets.token_hex(32)
+            sub.state = "pending"
+            sub.expires_at = None
+            db.commit()
+            logger.info(f"WebSub hub found for {feed_url}: {hub}")
+            self._request(sub, "subscribe", db)
+
+    def _request(self, sub: WebSubSubscription, mode: str, db):
+        """
+        Send a subscribe/unsubscribe request. The hub verifies it asynchronously
+        through the callback, so the state is committed before the request goes out.
+        """
+        import requests
+
+        data = {
+            "hub.mode": mode,
+            "hub.topic": sub.topic,
+            "hub.callback": self._callback_url(sub.token),
+        }
+        if mode == "subscribe":
+            data["hub.lease_seconds"] = str(settings.WEBSUB_LEASE_SECONDS)
+            data["hub.secret"] = sub.secret
+        sub.requested_at = datetime.now()
+        db.commit()
+
+        try:
+            response = requests.post(sub.hub, data=data, timeout=settings.FEED_TIMEOUT_SECONDS)
+            if response.status_code not in (202, 204):
+                raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+            logger.info(f"WebSub {mode} requested for {sub.topic} at {sub.hub}")
+        except Exception as e:
+            logger.warning(f"WebSub {mode} request failed for {sub.topic}: {e}")
+            db.refresh(sub)
+            if mode == "subscribe" and sub.state != "subscribed":
+                sub.state = "failed"
+            sub.last_error = str(e)
+            db.commit()
+
+    def verify(self, token: str, mode: str, topic: str, challenge: str | None, lease_seconds: int | None, reason: str | None = None) -> str | None:
+        """
+        Intent verification. Returns the body to answer with, or None to
+        refuse (unknown callback, topic mismatch or a request we did not make).
+        """
+        with SessionLocal() as db:
+            sub = db.query(WebSubSubscription).filter(WebSubSubscription.token == token).first()
+            if not sub or sub.topic != topic:
+                return None
+
+            if mode == "denied":
+                sub.state = "denied"
+                sub.last_error = reason or "Denied by hub"
+                db.commit()
+                logger.warning(f"WebSub subscription denied for {topic}: {sub.last_error}")
+                return ""
+            if not challenge:
+                return None
+
+            if mode == "subscribe" and sub.state in ("pending", "subscribed"):
+                lease = lease_seconds or settings.WEBSUB_LEASE_SECONDS
+                sub.state = "subscribed"
+                sub.lease_seconds = lease
+                sub.expires_at = datetime.now() + timedelta(seconds=lease)
+                sub.verified_at = datetime.now()
+                sub.last_error = None
+                db.commit()
+                logger.info(f"WebSub subscription verified for {topic} ({lease}s lease)")
+                return challenge
+            if mode == "unsubscribe" and sub.state == "unsubscribing":
+                db.delete(sub)
+                db.commit()
+                logger.info(f"WebSub unsubscribed from {topic}")
+                return challenge
+            return None
+
+    def receive(self, token: str, body: bytes, headers) -> bool:
+        """
+        Accept a content distribution. Returns False if it was ignored
+        (unknown callback or bad signature); the hub gets a 2xx either way.
+        """
+        with SessionLocal() as db:
+            sub = db.query(WebSubSubscription).filter(WebSubSubscription.token == token).first()
+            if not sub or sub.state != "subscribed":
+                return False
+            # Checked first: hashing an oversized body is wasted work
+            if len(body) > settings.FEED_MAX_BYTES:
+                logger.warning(f"WebSub push for {sub.topic} ignored: {len(body)} bytes exceeds FEED_MAX_BYTES")
+                return False
+            if not self._signature_valid(sub.secret, body, headers.get("x-hub-signature")):
+                logger.warning(f"WebSub push for {sub.topic} ignored: bad or missing signature")
+                return False
+            sub.last_push_at = datetime.now()
+            db.commit()
+            feed_url = sub.feed_url
+            extraction = db.query(Subscription.extraction).filter(Subscription.url == feed_url).scalar()
+
+        response_headers = {k.lower(): v for k, v in headers.items()}
+        self._executor.submit(self._process_push, feed_url, body, response_headers, extraction)
+        return True
+
+    def _signature_valid(self, secret: str, body: bytes, header: str | None) -> bool:
+        if not header or "=" not in header:
+            return False
+        method, signature = header.split("=", 1)
+        digest = SIGNATURE_METHODS.get(method.strip().lower())
+        if not digest:
+            return False
+        expected = hmac.new(secret.encode("utf-8"), body, digest).hexdigest()
+        return hmac.compare_digest(expected, signature.strip().lower())
+
+    def _process_push(self, feed_url: str, body: bytes, headers: dict, extraction: str | None):
+        # Imported here: rss_service calls discover() on this service
+        import feedparser
+        from src.services.rss_service import rss_service
+
+        try:
+            feed = feedparser.parse(body, response_headers=headers)
+            logger.info(f"WebSub push for {feed_url}: {len(feed.entries)} entries")
+            # Pushes carry new or updated entries only, so process all of them
+            rss_service.process_feed(feed, feed_url, extraction, fetch_mode="full")
+        except Exception as e:
+            logger.error(f"Error processing WebSub push for {feed_url}: {e}")
+
+    def active_feed_urls(self, feed_urls: list[str]) -> set[str]:
+        """
+        Which of `feed_urls` currently receive pushes under a valid lease.
+        """
+        if not feed_urls:
+            return set()
+        with SessionLocal() as db:
+            rows = db.query(WebSubSubscription.feed_url).filter(
+                WebSubSubscription.feed_url.in_(feed_urls),
+                WebSubSubscription.state == "subscribed",
+                WebSubSubscription.expires_at > datetime.now()
+            )
+            return {row[0] for row in rows}
+
+    def renew_leases(self):
+        """
+        Renew leases close to expiry, give up on requests the hub never
+        verified, and unsubscribe feeds that are gone or disabled.
+        """
+        if not self.enabled:
+            return
+        now = datetime.now()
+        with SessionLocal() as db:
+            enabled_urls = {
+                row[0] for row in db.query(Subscription.url).filter(Subscription.enabled == True)
+            }
+            for sub in db.query(WebSubSubscription).all():
+                if sub.feed_url not in enabled_urls:
+                    if sub.state == "subscribed":
+                        sub.state = "unsubscribing"
+                        db.commit()
+                        self._request(sub, "unsubscribe", db)
+                    elif sub.state != "unsubscribing":
+                        db.delete(sub)
+                        db.commit()
+                elif sub.state == "subscribed" and sub.expires_at < now + timedelta(seconds=settings.WEBSUB_RENEW_BEFORE_SECONDS):
+                    logger.info(f"Renewing WebSub lease for {sub.topic}")
+                    self._request(sub, "subscribe", db)
+                elif sub.state in ("pending", "unsubscribing") and sub.requested_at \
+                        and sub.requested_at < now - timedelta(seconds=settings.WEBSUB_VERIFY_TIMEOUT_SECONDS):
+                    if sub.state == "unsubscribing":
+                        db.delete(sub)
+                    else:
+                        sub.state = "failed"
+                        sub.last_error = "Hub did not verify the subscription"
+                    db.commit()
+
+    def list_subscriptions(self) -> list[dict]:
+        with SessionLocal() as db:
+            return [
+                {
+                    "feed_url": sub.feed_url,
+                    "topic": sub.topic,
+                    "hub": sub.hub,
+                    "state": sub.state,
+                    "expires_at": sub.expires_at,
+                    "verified_at": sub.verified_at,
+                    "last_push_at": sub.last_push_at,
+                    "last_error": sub.last_error,
+                }
+                for sub in db.query(WebSubSubscription).order_by(WebSubSubscription.id)
+            ]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+websub_service = WebSubService()
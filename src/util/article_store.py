@@ -0,0 +1,115 @@
+from datetime import datetime
+from typing import Iterator
+from sqlalchemy import select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+from src.util.database import Article
+
+# Narrow column sets: hot paths never load full ORM rows or the identity map
+PENDING_COLUMNS = (Article.id, Article.title, Article.subscription_name, Article.publish_date)
+REPORT_COLUMNS = (Article.id, Article.title, Article.link, Article.score, Article.summary,
+                  Article.is_ad, Article.is_processed, Article.is_sent, Article.report_excluded)
+
+# Keeps `WHERE id IN (...)` well below SQLite's bound-parameter limit
+ID_CHUNK_SIZE = 500
+
+def iter_batches(db: Session, columns: tuple, *criteria, batch_size: int = 500, after_id: int = 0) -> Iterator[list[Row]]:
+    """
+    Yield rows of `columns` matching `criteria` in id order, `batch_size` at a
+    time, starting after `after_id`. Keyset pagination on Article.id: each
+    batch is one indexed query and only one batch of tuples is held in memory.
+    """
+    last_id = after_id
+    while True:
+        rows = db.execute(
+            select(*columns)
+            .where(Article.id > last_id, *criteria)
+            .order_by(Article.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+def iter_pending(db: Session, batch_size: int = 500) -> Iterator[list[Row]]:
+    return iter_batches(db, PENDING_COLUMNS, Article.is_processed == False, batch_size=batch_size)
+
+def iter_reportable(db: Session, min_score: int, batch_size: int = 500, columns: tuple = REPORT_COLUMNS) -> Iterator[list[Row]]:
+    return iter_batches(
+        db, columns,
+        Article.is_sent == False,
+        Article.report_excluded == False,
+        Article.score >= min_score,
+        Article.is_ad == False,
+        Article.is_processed == True,
+        batch_size=batch_size
+    )
+
+def get_report_row(db: Session, article_id: int) -> Row | None:
+    return db.execute(select(*REPORT_COLUMNS).where(Article.id == article_id)).first()
+
+def unprocessed_ids(db: Session, ids: list[int]) -> set[int]:
+    """
+    Which of `ids` still need analysis (another worker may have finished them).
+    """
+    return {
+        row[0]
+        for chunk in chunked(ids)
+        for row in db.execute(select(Article.id).where(Article.id.in_(chunk), Article.is_processed == False))
+    }
+
+def insert_article(db: Session, **fields):
+    """
+    Insert a newly discovered article. Caller commits; raises IntegrityError
+    on the flush or commit if another worker inserted the entry first.
+    """
+    db.add(Article(**fields))
+
+def save_analysis(db: Session, article_id: int, summary: str, score: int, is_ad: bool) -> bool:
+    """
+    Store an analysis result and mark the article processed. Returns False if
+    the article was already processed, so a result is never applied twice.
+    Caller commits (a db_writer write function).
+    """
+    result = db.execute(
+        update(Article)
+        .where(Article.id == article_id, Article.is_processed == False)
+        .values(summary=summary, score=score, is_ad=is_ad, is_processed=True, updated_at=datetime.now())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+def save_reanalysis(db: Session, article_id: int, summary: str, score: int, is_ad: bool, exclude_from_report: bool = False):
+    """
+    Overwrite the analysis of an already processed article (backfill).
+    exclude_from_report sets report_excluded, so an old article the new
+    result would qualify is not picked up by the next report; is_sent keeps
+    meaning "delivered". Caller commits.
+    """
+    values = dict(summary=summary, score=score, is_ad=is_ad, is_processed=True, updated_at=datetime.now())
+    if exclude_from_report:
+        values["report_excluded"] = True
+    db.execute(
+        update(Article)
+        .where(Article.id == article_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+def mark_sent(db: Session, ids: list[int]) -> int:
+    """
+    Set-based `UPDATE ... WHERE id IN (...)`, chunked. Caller commits.
+    """
+    count = 0
+    for chunk in chunked(ids):
+        count += db.execute(
+            update(Article).where(Article.id.in_(chunk))
+            .values(is_sent=True, updated_at=datetime.now())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    return count
+
+def chunked(ids: list[int]) -> Iterator[list[int]]:
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+        yield ids[start:start + ID_CHUNK_SIZE]
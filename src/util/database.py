@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Text
+from sqlalchemy import create_engine, event, inspect, update, Column, Integer, String, Boolean, DateTime, Text, Index
 from sqlalchemy.orm import sessionmaker, declarative_base
 from datetime import datetime
 from src.constant.config import settings
@@ -24,9 +24,24 @@ if db_dir and not os.path.exists(db_dir):
 
 DATABASE_URL = f"sqlite:///{db_path}"
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False, "timeout": settings.DB_BUSY_TIMEOUT_SECONDS})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Connection pool of the single writer thread (src/util/db_writer.py).
+# Its transactions start with BEGIN IMMEDIATE: the write lock is taken up
+# front, so a transaction never fails halfway when upgrading from a read.
+write_engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False, "timeout": settings.DB_BUSY_TIMEOUT_SECONDS})
+WriteSession = sessionmaker(autocommit=False, autoflush=False, bind=write_engine)
+
+@event.listens_for(write_engine, "connect")
+def _disable_driver_transactions(dbapi_connection, connection_record):
+    # Let SQLAlchemy emit BEGIN itself instead of pysqlite's implicit one
+    dbapi_connection.isolation_level = None
+
+@event.listens_for(write_engine, "begin")
+def _begin_immediate(conn):
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+
 Base = declarative_base()
 
 class Article(Base):
@@ -51,11 +66,242 @@ class Article(Base):
     # Status
     is_processed = Column(Boolean, default=False) # AI analysis done
     is_sent = Column(Boolean, default=False) # Sent in daily report
+    report_excluded = Column(Boolean, nullable=False, default=False) # Kept out of reports, e.g. old articles re-scored by a backfill
+
+    __table_args__ = (
+        # Keyset pagination for article listing (newest first)
+        Index("ix_articles_publish_date_id", "publish_date", "id"),
+        Index("ix_articles_subscription_publish_date", "subscription_name", "publish_date"),
+        # Incremental exports by updated_at watermark
+        Index("ix_articles_updated_at_id", "updated_at", "id"),
+    )
+
+class ArchivedArticle(Base):
+    __tablename__ = "articles_archive"
+
+    # Same columns as articles; rows keep their original id
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    entry_id = Column(String, nullable=True)
+    link = Column(String, nullable=False)
+    title = Column(String, nullable=False)
+    subscription_name = Column(String, index=True)
+    publish_date = Column(DateTime, nullable=True)
+    score = Column(Integer, default=0)
+    summary = Column(Text, nullable=True)
+    is_ad = Column(Boolean, default=False)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    is_processed = Column(Boolean, default=False)
+    is_sent = Column(Boolean, default=False)
+    archived_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        # Article listing reads the archive alongside the hot table
+        Index("ix_articles_archive_publish_date_id", "publish_date", "id"),
+        Index("ix_articles_archive_updated_at_id", "updated_at", "id"),
+    )
+
+class SeenEntry(Base):
+    __tablename__ = "seen_entries"
+
+    # 64-bit hash of an archived article's entry_id; the rowid itself, so one compact b-tree
+    key = Column(Integer, primary_key=True, autoincrement=False)
+
+class Subscription(Base):
+    __tablename__ = "subscriptions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    url = Column(String, unique=True, index=True, nullable=False)
+    title = Column(String, nullable=True)
+    enabled = Column(Boolean, nullable=False, default=True)
+
+    # Per-feed options
+    fetch_mode = Column(String, nullable=False, default="incremental") # incremental (stop at known entries) / full
+    extraction = Column(String, nullable=True) # main / full; None = settings.CONTENT_EXTRACTION
+    priority = Column(Integer, nullable=False, default=0) # Higher is fetched first
+
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    last_fetched_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Batch iteration of enabled feeds in priority order
+        Index("ix_subscriptions_enabled_priority_id", "enabled", "priority", "id"),
+    )
+
+class InsightCache(Base):
+    __tablename__ = "insight_cache"
+
+    # sha256 of model + system prompt + user prompt
+    cache_key = Column(String, primary_key=True)
+    stage = Column(String, nullable=False) # "map" or "reduce"
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.now, index=True)
+
+class ReportFragment(Base):
+    __tablename__ = "report_fragments"
+
+    # One rendered report entry per qualifying article, kept until sent
+    article_id = Column(Integer, primary_key=True)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+
+class ReportDraft(Base):
+    __tablename__ = "report_drafts"
+
+    id = Column(Integer, primary_key=True) # Single rolling draft (id=1)
+    fragments_key = Column(String, nullable=False) # Hash of the fragments the insight was built from
+    insight = Column(Text, nullable=False)
+    article_count = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class OutboxBatch(Base):
+    __tablename__ = "outbox_batches"
+
+    batch_id = Column(String, primary_key=True)
+    kind = Column(String, index=True, nullable=False) # e.g. "daily_report"
+    ref = Column(Text, nullable=True) # Caller data, e.g. JSON list of article ids
+    status = Column(String, index=True, default="pending") # pending / delivered / failed
+    retries = Column(Integer, nullable=False, default=0) # Rounds of re-sending the failed channels
+    acknowledged = Column(Boolean, default=False) # Caller has applied the delivery result
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class OutboxMessage(Base):
+    __tablename__ = "outbox_messages"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    batch_id = Column(String, index=True, nullable=False)
+    channel = Column(String, index=True, nullable=False)
+    seq = Column(Integer, nullable=False) # Chunk order within the batch and channel
+    title = Column(String, nullable=False)
+    content = Column(Text, nullable=False)
+
+    # Delivery state
+    status = Column(String, index=True, default="pending") # pending / sending / sent / failed
+    claimed_by = Column(String, nullable=True) # Worker sending it while status is "sending"
+    claim_expires_at = Column(DateTime, nullable=True) # After this another worker may take it over
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    sent_at = Column(DateTime, nullable=True)
+
+class SourceHealth(Base):
+    __tablename__ = "source_health"
+
+    key = Column(String, primary_key=True) # "feed:<url>" or "host:<hostname>"
+    kind = Column(String, index=True, nullable=False) # feed / host
+    state = Column(String, default="closed") # closed / open / half_open
+    consecutive_failures = Column(Integer, default=0)
+    total_requests = Column(Integer, default=0)
+    total_failures = Column(Integer, default=0)
+    cooldown_seconds = Column(Integer, default=0)
+    opened_at = Column(DateTime, nullable=True)
+    last_success_at = Column(DateTime, nullable=True)
+    last_failure_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+class WebSubSubscription(Base):
+    __tablename__ = "websub_subscriptions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    feed_url = Column(String, unique=True, index=True, nullable=False) # Subscription url we poll
+    topic = Column(String, nullable=False) # rel="self" of the feed, as registered with the hub
+    hub = Column(String, nullable=False)
+    token = Column(String, unique=True, index=True, nullable=False) # Callback path segment
+    secret = Column(String, nullable=False) # HMAC key for X-Hub-Signature
+
+    state = Column(String, index=True, default="pending") # pending / subscribed / unsubscribing / denied / failed
+    lease_seconds = Column(Integer, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+    requested_at = Column(DateTime, nullable=True)
+    verified_at = Column(DateTime, nullable=True)
+    last_push_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+
+class ExportWatermark(Base):
+    __tablename__ = "export_watermarks"
+
+    name = Column(String, primary_key=True) # Export target, e.g. "articles:parquet:/data/exports"
+    updated_at = Column(DateTime, nullable=False) # Last exported (updated_at, id) position
+    last_id = Column(Integer, nullable=False)
+    exported_at = Column(DateTime, default=datetime.now)
+    rows = Column(Integer, default=0) # Rows written by the last export
+
+class BackfillJob(Base):
+    __tablename__ = "backfill_jobs"
+
+    id = Column(String, primary_key=True)
+    status = Column(String, index=True, default="running") # running / stopped / completed / failed
+    filters = Column(Text, nullable=False) # JSON: date_from, date_to, subscription, min_score, max_score
+    max_id = Column(Integer, nullable=False) # Articles added after the job was created are left out
+    report = Column(Boolean, nullable=False, default=False) # Let articles newly passing MIN_SCORE into the next report
+
+    # Progress checkpoint: every article with id <= last_id is done
+    last_id = Column(Integer, default=0)
+    total = Column(Integer, default=0)
+    done = Column(Integer, default=0) # Re-analyzed
+    skipped = Column(Integer, default=0) # Markdown no longer stored
+    failed = Column(Integer, default=0) # Analysis failed; previous result kept
+    last_error = Column(Text, nullable=True)
+
+    # Throughput of the current run, for rate and ETA
+    run_started_at = Column(DateTime, nullable=True)
+    run_start_count = Column(Integer, default=0)
+
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    finished_at = Column(DateTime, nullable=True)
+
+class JobLock(Base):
+    __tablename__ = "job_locks"
+
+    name = Column(String, primary_key=True) # e.g. "leader", "article:42"
+    owner = Column(String, nullable=False) # Worker id holding the lock
+    acquired_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, index=True, nullable=False) # Lease end; renewed by the owner
 
 def init_db():
     logger.info(f"Initializing database...")
     logger.info(f"Database URL: {engine.url}")
+    if settings.DB_JOURNAL_MODE:
+        # Persistent per database file; switching needs a moment without other writers
+        try:
+            with engine.connect() as conn:
+                conn.exec_driver_sql(f"PRAGMA journal_mode={settings.DB_JOURNAL_MODE}")
+        except Exception as e:
+            logger.warning(f"Could not set journal mode {settings.DB_JOURNAL_MODE}: {e}")
     Base.metadata.create_all(bind=engine)
+    # create_all skips indexes of tables that already exist
+    for table in (Article.__table__, ArchivedArticle.__table__):
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    # create_all does not add columns to tables that already exist
+    _add_missing_columns("outbox_batches", {"retries": "INTEGER NOT NULL DEFAULT 0"})
+    _add_missing_columns("outbox_messages", {"claimed_by": "VARCHAR", "claim_expires_at": "DATETIME"})
+    _add_missing_columns("articles", {"report_excluded": "BOOLEAN NOT NULL DEFAULT 0"})
+    _add_missing_columns("backfill_jobs", {"report": "BOOLEAN NOT NULL DEFAULT 0"})
+    # Tables created before the NOT NULL constraints may hold NULLs, which drop
+    # feeds out of the priority-ordered fetch; give them the column defaults
+    with engine.begin() as conn:
+        conn.execute(
+            update(Subscription).where(Subscription.priority.is_(None)).values(priority=0)
+        )
+        conn.execute(
+            update(Subscription).where(Subscription.enabled.is_(None)).values(enabled=True)
+        )
+        conn.execute(
+            update(Subscription).where(Subscription.fetch_mode.is_(None)).values(fetch_mode="incremental")
+        )
+
+def _add_missing_columns(table: str, columns: dict[str, str]):
+    existing = {column["name"] for column in inspect(engine).get_columns(table)}
+    with engine.begin() as conn:
+        for name, ddl in columns.items():
+            if name not in existing:
+                logger.info(f"Adding column {table}.{name}")
+                conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
 
 def get_db():
     db = SessionLocal()
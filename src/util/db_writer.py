@@ -0,0 +1,174 @@
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from src.constant.config import settings
+from src.util.database import WriteSession
+from src.util.logger import logger
+
+class _Write:
+    __slots__ = ("fn", "args", "kwargs", "future")
+
+    def __init__(self, fn, args, kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+
+    @property
+    def name(self) -> str:
+        return getattr(self.fn, "__qualname__", repr(self.fn))
+
+_STOP = object()
+
+class DbWriter:
+    """
+    Single writer thread for the process. SQLite allows one writer at a
+    time; instead of every thread opening its own transaction and waiting on
+    the lock, producers queue small write functions and this thread applies
+    them in grouped transactions:
+    - A write function takes a session as first argument, must not commit,
+      and may return a value (e.g. a rowcount).
+    - Whatever is queued while a transaction runs joins the next one, up to
+      DB_WRITE_BATCH_SIZE, so a write waits at most for the transaction in
+      progress (plus DB_WRITE_MAX_DELAY_MS, if set, for others to join).
+    - If a grouped transaction fails, its writes are replayed one per
+      transaction, so one bad write only fails itself.
+    - shutdown() (also run at exit) applies everything queued before returning.
+    Bulk maintenance (archiving, exports, report sends) keeps its own
+    transactions, and so do job lease writes, which must not queue behind
+    a backlog of other writes.
+    """
+    def __init__(self, batch_size: int, max_delay_ms: int, queue_size: int):
+        self.batch_size = max(batch_size, 1)
+        self.max_delay = max_delay_ms / 1000
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """
+        Queue fn(session, *args, **kwargs) without waiting. Failures are logged.
+        """
+        item = _Write(fn, args, kwargs)
+        future = self._enqueue(item)
+        future.add_done_callback(lambda f: self._log_failure(item.name, f))
+        return future
+
+    def write(self, fn, *args, timeout: float | None = None, **kwargs):
+        """
+        Queue fn(session, *args, **kwargs), wait until it is committed and
+        return its result. Raises whatever the write raised.
+        """
+        return self._enqueue(_Write(fn, args, kwargs)).result(timeout)
+
+    def flush(self, timeout: float | None = None):
+        """
+        Wait until every write queued before this call is committed.
+        """
+        self.write(lambda session: None, timeout=timeout)
+
+    def shutdown(self, timeout: float = 30):
+        """
+        Apply what is queued and stop the thread. Later writes run in the caller.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread:
+            self._queue.put(_STOP)
+            thread.join(timeout=timeout)
+            if thread.is_alive():
+                logger.warning(f"Database writer did not finish within {timeout}s, {self._queue.qsize()} writes pending")
+                return
+        # Writes that raced with the stop marker
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                self._apply([item])
+
+    def _enqueue(self, item: _Write) -> Future:
+        with self._lock:
+            inline = self._closed or threading.current_thread() is self._thread
+            if not inline and not self._thread:
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+        if inline:
+            # After shutdown, or a write issued from inside a write: apply it here
+            self._apply([item])
+        else:
+            # Blocks when the queue is full, slowing producers down to the writer's pace
+            self._queue.put(item)
+        return item.future
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._apply(batch)
+
+    def _apply(self, batch: list[_Write]):
+        batch = [item for item in batch if item.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        if len(batch) == 1:
+            self._apply_one(batch[0])
+            return
+        try:
+            with WriteSession() as session:
+                results = []
+                for item in batch:
+                    results.append(item.fn(session, *item.args, **item.kwargs))
+                    # Later writes in the group see this one
+                    session.flush()
+                session.commit()
+        except Exception as e:
+            logger.debug("Grouped write of %s items failed (%s), replaying one by one", len(batch), e)
+            for item in batch:
+                self._apply_one(item)
+            return
+        for item, result in zip(batch, results):
+            item.future.set_result(result)
+
+    def _apply_one(self, item: _Write):
+        try:
+            with WriteSession() as session:
+                result = item.fn(session, *item.args, **item.kwargs)
+                session.commit()
+        except Exception as e:
+            item.future.set_exception(e)
+        else:
+            item.future.set_result(result)
+
+    def _log_failure(self, name: str, future: Future):
+        if not future.cancelled() and future.exception():
+            logger.error(f"Database write {name} failed: {future.exception()}")
+
+db_writer = DbWriter(settings.DB_WRITE_BATCH_SIZE, settings.DB_WRITE_MAX_DELAY_MS, settings.DB_WRITE_QUEUE_SIZE)
+atexit.register(db_writer.shutdown)
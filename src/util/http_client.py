@@ -0,0 +1,142 @@
+import codecs
+import re
+import time
+from src.util.logger import logger
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
+
+CHUNK_SIZE = 64 * 1024
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+_HEADER_CHARSET_RE = re.compile(r"charset=[\"']?([\w.:-]+)", re.I)
+_META_CHARSET_RE = re.compile(rb"<meta[^>]+charset=[\"']?([\w.:-]+)", re.I)
+# Browsers only look for <meta charset> in the first 1024 bytes; allow some slack
+META_SNIFF_BYTES = 4096
+
+class FetchError(Exception):
+    """
+    Raised when a download fails, times out or exceeds its byte cap.
+    `reason` is one of: network, timeout, http, rejected, too_large.
+    """
+    def __init__(self, message: str, status_code: int | None = None, reason: str = "network"):
+        super().__init__(message)
+        self.status_code = status_code
+        self.reason = reason
+
+    @property
+    def is_host_failure(self) -> bool:
+        """
+        True if the failure says the host is unhealthy, not just this URL.
+        """
+        if self.reason in ("network", "timeout"):
+            return True
+        if self.reason == "http":
+            return self.status_code is not None and (self.status_code >= 500 or self.status_code == 429)
+        return False
+
+class FetchResult:
+    def __init__(self, url: str, status_code: int, headers, content: bytes):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+def fetch_bytes(
+    url: str,
+    max_bytes: int,
+    timeout: float,
+    headers: dict | None = None,
+    accept=None
+) -> FetchResult:
+    """
+    Stream a URL into memory with a byte cap and a total time budget.
+    `timeout` bounds connect, each read and the whole download.
+    `accept` is an optional callable receiving the response headers; return
+    False to abort before the body is read (e.g. unwanted content types).
+    """
+    import requests
+    deadline = time.monotonic() + timeout
+    request_headers = dict(DEFAULT_HEADERS)
+    if headers:
+        request_headers.update(headers)
+
+    try:
+        with requests.get(url, headers=request_headers, timeout=(timeout, timeout), stream=True) as resp:
+            if resp.status_code != 200:
+                raise FetchError(f"HTTP {resp.status_code} for {url}", status_code=resp.status_code, reason="http")
+
+            if accept is not None and not accept(resp.headers):
+                raise FetchError(f"Rejected {url} (Content-Type: {resp.headers.get('Content-Type')})", status_code=resp.status_code, reason="rejected")
+
+            declared = resp.headers.get("Content-Length")
+            if declared and declared.isdigit() and int(declared) > max_bytes:
+                raise FetchError(f"Body of {url} is {declared} bytes, over the {max_bytes} byte cap", status_code=resp.status_code, reason="too_large")
+
+            # Collect chunks and join once at the end: a single copy of the body
+            chunks = []
+            size = 0
+            for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > max_bytes:
+                    raise FetchError(f"Body of {url} exceeds the {max_bytes} byte cap", status_code=resp.status_code, reason="too_large")
+                if time.monotonic() > deadline:
+                    raise FetchError(f"Download of {url} exceeded {timeout}s", status_code=resp.status_code, reason="timeout")
+
+            logger.debug("Fetched %s bytes from %s", size, url)
+            return FetchResult(resp.url, resp.status_code, resp.headers, b"".join(chunks))
+    except requests.Timeout as e:
+        raise FetchError(f"Request to {url} timed out: {e}", reason="timeout")
+    except requests.RequestException as e:
+        raise FetchError(f"Request to {url} failed: {e}", reason="network")
+
+
+def is_html_response(headers) -> bool:
+    """
+    Accept HTML content types; a missing Content-Type is given the benefit of the doubt.
+    """
+    content_type = headers.get("Content-Type", "")
+    if not content_type:
+        return True
+    return content_type.split(";")[0].strip().lower() in HTML_CONTENT_TYPES
+
+def detect_html_encoding(content: bytes, content_type: str | None = None) -> str:
+    """
+    Pick the encoding of an HTML document the way browsers do:
+    BOM, then the HTTP Content-Type charset, then <meta charset>, then UTF-8.
+    """
+    for bom, encoding in _BOMS:
+        if content.startswith(bom):
+            return encoding
+
+    candidates = []
+    if content_type:
+        match = _HEADER_CHARSET_RE.search(content_type)
+        if match:
+            candidates.append(match.group(1))
+    match = _META_CHARSET_RE.search(content, 0, META_SNIFF_BYTES)
+    if match:
+        candidates.append(match.group(1).decode("ascii", "ignore"))
+
+    for name in candidates:
+        try:
+            return codecs.lookup(name).name
+        except LookupError:
+            logger.debug("Unknown charset %s, ignoring", name)
+    return "utf-8"
+
+def fetch_html(url: str, max_bytes: int, timeout: float) -> tuple[bytes, str]:
+    """
+    Download an HTML page with a byte cap, rejecting non-HTML content types
+    before the body is read. Returns the raw bytes and their detected encoding.
+    """
+    result = fetch_bytes(url, max_bytes=max_bytes, timeout=timeout, accept=is_html_response)
+    return result.content, detect_html_encoding(result.content, result.headers.get("Content-Type"))
@@ -0,0 +1,162 @@
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from src.constant.config import settings
+from src.util.database import project_root, WriteSession
+from src.util.logger import logger
+
+# Unique per process: uvicorn workers share a hostname and may reuse pids across restarts
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def try_lock(name: str, ttl_seconds: int, owner: str = WORKER_ID) -> bool:
+    """
+    Take or renew the lease `name` in the job_locks table.
+    Succeeds if the lock is free, expired or already held by `owner`.
+    """
+    return _in_own_transaction(_take_lease, name, ttl_seconds, owner)
+
+def _in_own_transaction(fn, *args):
+    """
+    Apply a lease write in a short transaction of its own instead of the
+    db_writer queue: a lease renewal (e.g. the leader heartbeat) must not
+    wait behind thousands of queued writes, only for the transaction that
+    currently holds the write lock.
+    """
+    with WriteSession() as session:
+        result = fn(session, *args)
+        session.commit()
+        return result
+
+def _take_lease(db, name: str, ttl_seconds: int, owner: str) -> bool:
+    now = datetime.now()
+    result = db.execute(text(
+        "INSERT INTO job_locks (name, owner, acquired_at, expires_at) "
+        "VALUES (:name, :owner, :now, :expires_at) "
+        "ON CONFLICT(name) DO UPDATE SET "
+        "acquired_at = CASE WHEN job_locks.owner = excluded.owner THEN job_locks.acquired_at ELSE excluded.acquired_at END, "
+        "owner = excluded.owner, expires_at = excluded.expires_at "
+        "WHERE job_locks.owner = excluded.owner OR job_locks.expires_at < excluded.acquired_at"
+    ), {"name": name, "owner": owner, "now": now, "expires_at": now + timedelta(seconds=ttl_seconds)})
+    return result.rowcount == 1
+
+def unlock(name: str, owner: str = WORKER_ID):
+    _in_own_transaction(_release_lease, name, owner)
+
+def _release_lease(db, name: str, owner: str):
+    db.execute(text("DELETE FROM job_locks WHERE name = :name AND owner = :owner"), {"name": name, "owner": owner})
+
+class LeaseRenewer:
+    """
+    Keeps a lease taken with try_lock() alive while a long task runs, renewing
+    it every third of its TTL. A worker that dies stops renewing, so the lease
+    frees up within one TTL instead of blocking the task until a long timeout.
+
+        with LeaseRenewer(name, ttl):
+            ...
+    """
+    def __init__(self, name: str, ttl_seconds: int, owner: str = WORKER_ID):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.owner = owner
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name=f"lease-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        interval = max(1, self.ttl_seconds // 3)
+        while not self._stop.wait(interval):
+            try:
+                if not try_lock(self.name, self.ttl_seconds, self.owner):
+                    logger.warning(f"Lease {self.name} was taken over by another worker")
+                    return
+            except Exception as e:
+                logger.error(f"Renewing lease {self.name} failed: {e}")
+
+class LeaderElector:
+    """
+    Elects one worker per cluster to run scheduled jobs.
+    - sqlite: a lease row in job_locks, renewed by a heartbeat thread; works
+      for every process sharing the database. If the leader dies, another
+      worker takes over once the lease expires.
+    - file: an exclusive flock held for the life of the process; only
+      coordinates workers on the same host (e.g. uvicorn --workers N).
+    """
+    LOCK_NAME = "leader"
+
+    def __init__(self):
+        self._is_leader = False
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock_file = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._is_leader
+
+    def start(self):
+        self._stop.clear()
+        self._heartbeat()
+        self._thread = threading.Thread(target=self._run, name="leader-elector", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self._is_leader and settings.JOB_LOCK_BACKEND == "sqlite":
+            unlock(self.LOCK_NAME)
+        if self._lock_file:
+            self._lock_file.close()
+            self._lock_file = None
+        self._is_leader = False
+
+    def _run(self):
+        interval = max(1, settings.LEADER_LEASE_SECONDS // 3)
+        while not self._stop.wait(interval):
+            self._heartbeat()
+
+    def _heartbeat(self):
+        try:
+            if settings.JOB_LOCK_BACKEND == "file":
+                leader = self._try_file_lock()
+            else:
+                leader = try_lock(self.LOCK_NAME, settings.LEADER_LEASE_SECONDS)
+        except Exception as e:
+            logger.error(f"Leader election failed: {e}")
+            leader = False
+
+        if leader != self._is_leader:
+            logger.info(f"Worker {WORKER_ID} {'is now' if leader else 'is no longer'} the scheduler leader")
+        self._is_leader = leader
+
+    def _try_file_lock(self) -> bool:
+        if self._lock_file:
+            return True
+        import fcntl
+
+        lock_dir = settings.LOCK_DIR
+        if not os.path.isabs(lock_dir):
+            lock_dir = os.path.join(project_root, lock_dir)
+        os.makedirs(lock_dir, exist_ok=True)
+
+        f = open(os.path.join(lock_dir, f"{self.LOCK_NAME}.lock"), "a+")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._lock_file = f
+        return True
+
+leader_elector = LeaderElector()
@@ -0,0 +1,34 @@
+import threading
+
+class LazyService:
+    """
+    Module-level singleton that is only constructed on first use.
+    Attribute access is forwarded to the instance, so call sites keep using
+    `from src.services.x import x_service` unchanged while the service
+    (and the clients, directories and heavy imports it sets up) stays
+    unbuilt until something actually needs it.
+    """
+    def __init__(self, factory):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _get(self):
+        instance = object.__getattribute__(self, "_instance")
+        if instance is None:
+            with object.__getattribute__(self, "_lock"):
+                instance = object.__getattribute__(self, "_instance")
+                if instance is None:
+                    instance = object.__getattribute__(self, "_factory")()
+                    object.__setattr__(self, "_instance", instance)
+        return instance
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._get(), name, value)
+
+    def __repr__(self):
+        factory = object.__getattribute__(self, "_factory")
+        return f"<LazyService {getattr(factory, '__name__', factory)}>"
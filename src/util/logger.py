@@ -1,33 +1,170 @@
 import os
+import atexit
+import copy
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from src.constant.config import settings
 
 # Ensure logs directory exists
 LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
 os.makedirs(LOG_DIR, exist_ok=True)
 
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line. Fields passed with `extra=` are included as-is.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _AsyncQueueHandler(QueueHandler):
+    """
+    Hands records to the background writer. Only the message itself is
+    resolved on the calling thread (its args may change later); timestamps,
+    formatting and file I/O happen on the writer thread. When the queue is
+    full, records are dropped and counted instead of blocking the caller.
+    """
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            if self.dropped:
+                notice = logging.LogRecord(record.name, logging.WARNING, __file__, 0,
+                                           f"Log queue full, dropped {self.dropped} messages", None, None)
+                self.queue.put_nowait(notice)
+                self.dropped = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_listener: QueueListener | None = None
+
+def _build_formatter() -> logging.Formatter:
+    if settings.LOG_FORMAT == "json":
+        return JsonFormatter()
+    return logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
 def setup_logger(name: str = "app"):
+    global _listener
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
+    logger.setLevel(settings.LOG_LEVEL.upper())
 
     if not logger.handlers:
+        formatter = _build_formatter()
+
         # Console Handler
         console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
         console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
 
         # File Handler
         file_handler = RotatingFileHandler(
-            os.path.join(LOG_DIR, "app.log"), 
-            maxBytes=10*1024*1024, 
+            os.path.join(LOG_DIR, "app.log"),
+            maxBytes=10*1024*1024,
             backupCount=5
         )
-        file_handler.setLevel(logging.INFO)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+
+        # Callers only enqueue; one background thread writes to both handlers
+        log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        logger.addHandler(_AsyncQueueHandler(log_queue))
+        _listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
 
     return logger
 
+def shutdown_logging():
+    """
+    Stop the background writer after it has flushed everything queued so far.
+    """
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+class SampledLogger:
+    """
+    Rate-limited logging for per-item messages on hot paths.
+    Per key, the first `burst` messages in each `interval` seconds are logged;
+    the rest are only counted, and the count is reported with the next message
+    that gets through. Use %-style args: skipped messages are never formatted.
+    """
+    def __init__(self, logger: logging.Logger, key: str, burst: int | None = None, interval: float | None = None):
+        self.logger = logger
+        self.key = key
+        self.burst = settings.LOG_SAMPLE_BURST if burst is None else burst
+        self.interval = settings.LOG_SAMPLE_INTERVAL_SECONDS if interval is None else interval
+        self._lock = threading.Lock()
+        self._window_start = 0.0
+        self._count = 0
+        self._suppressed = 0
+
+    def _admit(self) -> int | None:
+        """
+        Returns the number of messages suppressed since the last one logged,
+        or None if this message should be skipped.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= self.interval:
+                self._window_start, self._count = now, 0
+            self._count += 1
+            if self.burst > 0 and self._count > self.burst:
+                self._suppressed += 1
+                return None
+            suppressed, self._suppressed = self._suppressed, 0
+            return suppressed
+
+    def log(self, level: int, msg: str, *args):
+        if not self.logger.isEnabledFor(level):
+            return
+        suppressed = self._admit()
+        if suppressed is None:
+            return
+        if suppressed:
+            msg = f"{msg} (+%d similar [{self.key}] suppressed)"
+            args = (*args, suppressed)
+        self.logger.log(level, msg, *args)
+
+    def debug(self, msg: str, *args):
+        self.log(logging.DEBUG, msg, *args)
+
+    def info(self, msg: str, *args):
+        self.log(logging.INFO, msg, *args)
+
 logger = setup_logger()
+
+def sampled_logger(key: str, burst: int | None = None, interval: float | None = None) -> SampledLogger:
+    return SampledLogger(logger, key, burst, interval)
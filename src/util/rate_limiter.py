@@ -0,0 +1,20 @@
+import threading
+import time
+
+class RateLimiter:
+    """
+    Minimum spacing between calls so a caller stays under its per-minute cap.
+    Thread-safe; each wait() reserves the next slot.
+    """
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,67 @@
+"""
+Shared fixtures. Settings are read at import time, so the environment is
+pointed at a temporary database before anything from src is imported.
+"""
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="crawlwess-tests-")
+os.environ.update({
+    "RSS_URLS": "",
+    "OPENAI_API_KEY": "test",
+    "OPENAI_BASE_URL": "http://127.0.0.1:9",
+    "OPENAI_MODEL": "test",
+    "ADMIN_PASSWORD": "test",
+    "DB_PATH": os.path.join(_tmp, "news.db"),
+    "STORAGE_DIR": os.path.join(_tmp, "articles"),
+    "EXPORT_DIR": os.path.join(_tmp, "exports"),
+    "LOG_LEVEL": "WARNING",
+})
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from src.util.database import Base, SessionLocal, engine, init_db
+from src.util.db_writer import db_writer
+from src.services.search_service import search_service
+
+init_db()
+search_service.init_index()
+
+@pytest.fixture(autouse=True)
+def clean_db():
+    """
+    Every test starts from empty tables.
+    """
+    db_writer.flush()
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+        conn.execute(text("DELETE FROM articles_fts"))
+        conn.execute(text("DELETE FROM articles_fts_short"))
+    yield
+    db_writer.flush()
+
+@pytest.fixture
+def article_factory():
+    """
+    Insert an analyzed article and return its id; fields override the defaults.
+    """
+    from src.util import article_store
+    from src.util.database import Article
+
+    def factory(entry_id: str, **fields) -> int:
+        now = datetime.now()
+        values = dict(
+            entry_id=entry_id, title=f"Title {entry_id}", link=f"http://example.com/{entry_id}",
+            subscription_name="feed", publish_date=now, summary="summary", score=8, is_ad=False,
+            is_processed=True, is_sent=False, created_at=now, updated_at=now,
+        )
+        values.update(fields)
+        with SessionLocal() as db:
+            article_store.insert_article(db, **values)
+            db.commit()
+            return db.query(Article.id).filter(Article.entry_id == entry_id).scalar()
+    return factory
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+from src.services.archive_service import archive_service
+from src.services.search_service import search_service
+from src.util.database import SessionLocal, Article, ArchivedArticle
+from src.util.db_writer import db_writer
+
+OLD = datetime.now() - timedelta(days=90)
+
+def _ids(model) -> set[int]:
+    with SessionLocal() as db:
+        return {row[0] for row in db.query(model.id)}
+
+def test_moves_only_settled_old_articles(article_factory):
+    sent = article_factory("sent", is_sent=True, created_at=OLD)
+    low = article_factory("low", score=1, created_at=OLD)
+    due = article_factory("due", created_at=OLD) # Still goes out with the next report
+    recent = article_factory("recent", is_sent=True)
+    newest = article_factory("newest", is_sent=True, created_at=OLD) # Highest id is never archived
+
+    assert archive_service.archive_old_articles(days=30, batch_size=1) == 2
+
+    assert _ids(ArchivedArticle) == {sent, low}
+    assert _ids(Article) == {due, recent, newest}
+
+def test_archived_entries_stay_known(article_factory):
+    article_factory("old", is_sent=True, created_at=OLD)
+    article_factory("newest")
+    archive_service.archive_old_articles(days=30)
+
+    with SessionLocal() as db:
+        assert archive_service.seen_entry_ids(["old", "newest", "unknown"], db) == {"old"}
+        assert archive_service.is_archived("old", db)
+        assert not archive_service.is_archived("newest", db)
+
+def test_archived_articles_stay_searchable_and_listable(article_factory):
+    old = article_factory("old", title="Archived trigram article", is_sent=True, created_at=OLD)
+    hot = article_factory("hot", title="Hot trigram article")
+    for article_id, title in ((old, "Archived trigram article"), (hot, "Hot trigram article")):
+        db_writer.write(search_service._write_index, article_id, title, "", "")
+    archive_service.archive_old_articles(days=30)
+
+    results = {r["id"]: r["archived"] for r in search_service.search("trigram")}
+    assert results == {old: True, hot: False}
+
+    listed = {item["id"]: item["archived"] for item in search_service.list_articles()["items"]}
+    assert listed == {old: True, hot: False}
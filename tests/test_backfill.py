@@ -0,0 +1,100 @@
+from collections import Counter
+
+import pytest
+
+from src.constant.config import settings
+from src.services.ai_service import ai_service
+from src.services.backfill_service import backfill_service
+from src.services.report_service import report_service
+from src.services.storage_service import storage_service
+from src.util.database import SessionLocal, Article, ReportFragment
+
+@pytest.fixture
+def analyzed(monkeypatch):
+    """
+    Stub the LLM: every article gets score 9. Returns the per-title call count.
+    """
+    calls = Counter()
+
+    def analyze_article(title, content):
+        calls[title] += 1
+        return {"summary": "re-analyzed", "score": 9, "is_ad": False}
+
+    monkeypatch.setattr(ai_service, "analyze_article", analyze_article)
+    monkeypatch.setattr(report_service, "refresh_draft", lambda: None)
+    monkeypatch.setattr(settings, "BACKFILL_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "BACKFILL_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "BACKFILL_RATE_PER_MINUTE", 0)
+    return calls
+
+@pytest.fixture
+def stored_article(article_factory):
+    """
+    An analyzed article whose cleaned markdown is still on disk.
+    """
+    def factory(entry_id: str, **fields) -> int:
+        article_id = article_factory(entry_id, **fields)
+        with SessionLocal() as db:
+            article = db.get(Article, article_id)
+            storage_service.save_markdown(article.subscription_name, article.publish_date.strftime("%Y-%m-%d"), article.title, "content")
+        return article_id
+    return factory
+
+def test_stopped_backfill_resumes_from_checkpoint(analyzed, stored_article, monkeypatch):
+    ids = [stored_article(f"e{i}", score=2, is_sent=True) for i in range(5)]
+    job = backfill_service.create()
+    assert job["total"] == 5
+
+    # Stop once the first batch is analyzed
+    analyze = ai_service.analyze_article
+    def stop_after_first_batch(title, content):
+        result = analyze(title, content)
+        if sum(analyzed.values()) == settings.BACKFILL_BATCH_SIZE:
+            backfill_service.stop(job["id"])
+        return result
+    monkeypatch.setattr(ai_service, "analyze_article", stop_after_first_batch)
+
+    backfill_service.run(job["id"])
+    stopped = backfill_service.get(job["id"])
+    assert stopped["status"] == "stopped"
+    assert stopped["last_id"] == ids[1]
+
+    resumed = backfill_service.resume(job["id"], background=False)
+    assert resumed["status"] == "completed"
+    assert resumed["done"] == 5
+    # Every article analyzed exactly once across both runs
+    assert set(analyzed.values()) == {1} and len(analyzed) == 5
+
+def test_missing_markdown_is_skipped(analyzed, article_factory):
+    article_factory("gone")
+    job = backfill_service.create()
+    backfill_service.run(job["id"])
+
+    assert backfill_service.get(job["id"])["skipped"] == 1
+    assert not analyzed
+
+def test_old_articles_stay_out_of_the_report(analyzed, stored_article):
+    due = stored_article("due", score=8)
+    old = stored_article("old", score=2)
+
+    backfill_service.run(backfill_service.create()["id"])
+
+    with SessionLocal() as db:
+        assert not db.get(Article, due).report_excluded
+        assert db.get(Article, old).report_excluded
+        # Never delivered, so not marked sent
+        assert not db.get(Article, old).is_sent
+        assert {row[0] for row in db.query(ReportFragment.article_id)} == {due}
+
+def test_report_option_drafts_newly_qualifying_articles(analyzed, stored_article):
+    old = stored_article("old", score=2)
+
+    backfill_service.run(backfill_service.create(report=True)["id"])
+
+    with SessionLocal() as db:
+        assert not db.get(Article, old).report_excluded
+        assert {row[0] for row in db.query(ReportFragment.article_id)} == {old}
+
+def test_rejects_inverted_score_range():
+    with pytest.raises(ValueError):
+        backfill_service.create(min_score=8, max_score=2)
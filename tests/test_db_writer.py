@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+from sqlalchemy import text
+
+from src.util.db_writer import DbWriter
+from src.util.database import SessionLocal, JobLock
+
+def _insert(db, name: str):
+    db.execute(text(
+        "INSERT INTO job_locks (name, owner, acquired_at, expires_at) "
+        "VALUES (:name, 'test', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+    ), {"name": name})
+    return name
+
+def _names() -> set[str]:
+    with SessionLocal() as db:
+        return {row[0] for row in db.query(JobLock.name)}
+
+@pytest.fixture
+def writer():
+    # Long delay so the writes below are grouped into one transaction
+    writer = DbWriter(batch_size=50, max_delay_ms=200, queue_size=100)
+    yield writer
+    writer.shutdown()
+
+def test_failed_write_in_group_is_replayed_alone(writer):
+    futures = [writer.submit(_insert, name) for name in ("a", "b", "a", "c")]
+
+    assert [f.exception() is None for f in futures] == [True, True, False, True]
+    assert [f.result() for i, f in enumerate(futures) if i != 2] == ["a", "b", "c"]
+    assert _names() == {"a", "b", "c"}
+
+def test_write_returns_result_and_raises(writer):
+    assert writer.write(_insert, "a") == "a"
+    with pytest.raises(Exception):
+        writer.write(_insert, "a")
+    assert _names() == {"a"}
+
+def test_later_writes_in_a_group_see_earlier_ones(writer):
+    def count(db):
+        return db.execute(text("SELECT COUNT(*) FROM job_locks")).scalar()
+
+    futures = [writer.submit(_insert, "a"), writer.submit(count)]
+    assert futures[1].result() == 1
+
+def test_shutdown_applies_queued_writes(writer):
+    threads = [threading.Thread(target=writer.submit, args=(_insert, f"n{i}")) for i in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    writer.shutdown()
+
+    assert _names() == {f"n{i}" for i in range(20)}
+    # Writes after shutdown run in the caller
+    assert writer.write(_insert, "late") == "late"
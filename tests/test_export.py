@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet as pq
+
+from src.services.export_service import export_service
+from src.util.database import SessionLocal, Article
+
+EARLIER = datetime.now() - timedelta(hours=1)
+
+def _rows(files: list[str]) -> list[dict]:
+    return [row for path in files for row in pq.read_table(path).to_pylist()]
+
+def test_incremental_export_advances_watermark(article_factory, tmp_path):
+    first = article_factory("a", updated_at=EARLIER)
+    result = export_service.export_articles(output_dir=str(tmp_path))
+    assert result["rows"] == 1
+    assert [row["id"] for row in _rows(result["files"])] == [first]
+
+    # Nothing new: the watermark skips what was exported
+    assert export_service.export_articles(output_dir=str(tmp_path))["rows"] == 0
+
+    second = article_factory("b", updated_at=EARLIER + timedelta(minutes=1))
+    result = export_service.export_articles(output_dir=str(tmp_path))
+    assert [row["id"] for row in _rows(result["files"])] == [second]
+
+def test_rows_updated_in_the_last_moments_wait_for_the_next_export(article_factory, tmp_path):
+    article_factory("fresh")
+    assert export_service.export_articles(output_dir=str(tmp_path))["rows"] == 0
+
+    with SessionLocal() as db:
+        db.query(Article).update({"updated_at": EARLIER})
+        db.commit()
+    assert export_service.export_articles(output_dir=str(tmp_path))["rows"] == 1
+
+def test_since_does_not_move_the_watermark(article_factory, tmp_path):
+    article_factory("a", updated_at=EARLIER)
+    since = datetime.now(timezone.utc) - timedelta(days=1) # Timezone-aware input is accepted
+
+    assert export_service.export_articles(output_dir=str(tmp_path), since=since)["rows"] == 1
+    # The incremental export still starts from the beginning
+    assert export_service.export_articles(output_dir=str(tmp_path))["rows"] == 1
+
+def test_rejects_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        export_service.export_articles(output_dir=str(tmp_path), fmt="csv")
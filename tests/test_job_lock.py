@@ -0,0 +1,45 @@
+import time
+from datetime import datetime, timedelta
+
+from src.util.database import SessionLocal, JobLock
+from src.util.job_lock import LeaseRenewer, try_lock, unlock
+
+def _lease(name: str) -> JobLock | None:
+    with SessionLocal() as db:
+        return db.get(JobLock, name)
+
+def test_lease_is_exclusive_until_released():
+    assert try_lock("job", 60, owner="a")
+    assert not try_lock("job", 60, owner="b")
+
+    unlock("job", owner="a")
+    assert _lease("job") is None
+    assert try_lock("job", 60, owner="b")
+
+def test_owner_renews_without_resetting_acquired_at():
+    assert try_lock("job", 60, owner="a")
+    first = _lease("job")
+
+    assert try_lock("job", 120, owner="a")
+    renewed = _lease("job")
+    assert renewed.acquired_at == first.acquired_at
+    assert renewed.expires_at > first.expires_at
+
+def test_expired_lease_is_taken_over():
+    assert try_lock("job", 60, owner="a")
+    with SessionLocal() as db:
+        db.get(JobLock, "job").expires_at = datetime.now() - timedelta(seconds=1)
+        db.commit()
+
+    assert try_lock("job", 60, owner="b")
+    assert _lease("job").owner == "b"
+    # The old owner cannot release the new owner's lease
+    unlock("job", owner="a")
+    assert _lease("job").owner == "b"
+
+def test_renewer_keeps_short_lease_alive():
+    assert try_lock("job", 3, owner="a")
+    with LeaseRenewer("job", 3, owner="a"):
+        time.sleep(4)
+        assert not try_lock("job", 3, owner="b")
+    assert _lease("job").expires_at > datetime.now()
@@ -0,0 +1,135 @@
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.constant.config import settings
+from src.services.notifier import BaseNotifier, NotifierManager
+from src.util.database import SessionLocal, OutboxMessage
+
+class FakeNotifier(BaseNotifier):
+    """
+    Records deliveries; chunks listed in `failing` raise.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        super().__init__()
+        self.delivered = Counter()
+        self.failing: set[str] = set()
+        self.lock = threading.Lock()
+
+    def is_configured(self) -> bool:
+        return True
+
+    def build_chunks(self, title: str, content: str) -> list[tuple[str, str]]:
+        return [(title, chunk) for chunk in content.split("|")]
+
+    def deliver_chunk(self, title: str, text: str):
+        if text in self.failing:
+            raise RuntimeError("channel down")
+        with self.lock:
+            self.delivered[text] += 1
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_BACKOFF_SECONDS", 0)
+    monkeypatch.setattr(settings, "OUTBOX_MAX_ATTEMPTS", 2)
+
+@pytest.fixture
+def manager():
+    manager = NotifierManager()
+    manager.notifiers = [FakeNotifier("a"), FakeNotifier("b")]
+    return manager
+
+def test_delivers_every_chunk_once(manager):
+    batch_id = manager.send_markdown("Title", "1|2|3")
+
+    assert manager.batch_status(batch_id) == "delivered"
+    for n in manager.notifiers:
+        assert n.delivered == Counter({"1": 1, "2": 1, "3": 1})
+
+    # Flushing again does not resend anything
+    manager.flush_outbox()
+    for n in manager.notifiers:
+        assert sum(n.delivered.values()) == 3
+
+def test_retry_resends_only_failed_channel(manager):
+    a, b = manager.notifiers
+    b.failing = {"2"}
+    batch_id = manager.send_markdown("Title", "1|2|3", kind="daily_report")
+
+    assert manager.batch_status(batch_id) == "failed"
+    assert manager.delivered_channels(batch_id) == ["a"]
+    assert b.delivered == Counter({"1": 1})
+
+    b.failing = set()
+    assert manager.retry_failed("daily_report") == 1
+    manager.flush_outbox()
+
+    assert manager.batch_status(batch_id) == "delivered"
+    assert a.delivered == Counter({"1": 1, "2": 1, "3": 1})
+    # b resumes at the chunk that failed
+    assert b.delivered == Counter({"1": 1, "2": 1, "3": 1})
+
+def test_retries_are_bounded(manager, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_BATCH_RETRIES", 1)
+    manager.notifiers[1].failing = {"1"}
+    manager.send_markdown("Title", "1", kind="daily_report")
+
+    assert manager.retry_failed("daily_report") == 1
+    manager.flush_outbox()
+    assert manager.retry_failed("daily_report") == 0
+
+def test_concurrent_flushes_deliver_once(manager, monkeypatch):
+    # Queue without delivering, then race several flushes
+    monkeypatch.setattr(manager, "flush_outbox", lambda: None)
+    batch_id = manager.send_markdown("Title", "|".join(str(i) for i in range(30)))
+    monkeypatch.undo()
+
+    threads = [threading.Thread(target=manager.flush_outbox) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert manager.batch_status(batch_id) == "delivered"
+    for n in manager.notifiers:
+        assert len(n.delivered) == 30
+        assert set(n.delivered.values()) == {1}
+
+def test_expired_claim_is_taken_over(manager, monkeypatch):
+    monkeypatch.setattr(manager, "flush_outbox", lambda: None)
+    batch_id = manager.send_markdown("Title", "1|2")
+    monkeypatch.undo()
+
+    # A worker that died mid-send, and one whose claim is still live
+    with SessionLocal() as db:
+        for msg in db.query(OutboxMessage).filter(OutboxMessage.batch_id == batch_id):
+            msg.status = "sending"
+            msg.claimed_by = "dead-worker"
+            expired = msg.channel == "a"
+            msg.claim_expires_at = datetime.now() + timedelta(seconds=-1 if expired else 300)
+        db.commit()
+
+    manager.flush_outbox()
+
+    a, b = manager.notifiers
+    assert a.delivered == Counter({"1": 1, "2": 1})
+    assert not b.delivered
+    assert manager.batch_status(batch_id) == "pending"
+
+def test_removed_channel_does_not_block_batch(manager, monkeypatch):
+    monkeypatch.setattr(manager, "flush_outbox", lambda: None)
+    batch_id = manager.send_markdown("Title", "1|2")
+    monkeypatch.undo()
+
+    # Channel b dropped from NOTIFICATION_CHANNELS before delivery
+    manager.notifiers = manager.notifiers[:1]
+    manager.flush_outbox()
+
+    assert manager.batch_status(batch_id) == "failed"
+    assert manager.delivered_channels(batch_id) == ["a"]
+    with SessionLocal() as db:
+        errors = {m.last_error for m in db.query(OutboxMessage).filter(OutboxMessage.channel == "b")}
+    assert errors == {"Channel no longer configured"}
@@ -0,0 +1,33 @@
+import time
+
+import pytest
+
+from src.constant.config import settings
+from src.services.rss_service import rss_service
+from src.util.database import SessionLocal
+
+def _entries(count: int) -> list[dict]:
+    # Newest first, one hour apart
+    now = time.time()
+    return [{"id": f"e{i}", "published_parsed": time.gmtime(now - i * 3600)} for i in range(count)]
+
+@pytest.fixture(autouse=True)
+def streak(monkeypatch):
+    monkeypatch.setattr(settings, "FEED_KNOWN_STREAK", 3)
+
+def test_cuts_after_known_streak(article_factory):
+    entries = _entries(8)
+    for entry in entries[2:]:
+        article_factory(entry["id"])
+
+    with SessionLocal() as db:
+        assert rss_service._entries_to_process(entries, db) == entries[:2]
+
+def test_pending_rows_are_not_known(article_factory):
+    entries = _entries(8)
+    # Rows inserted before a page fetch that failed
+    for entry in entries:
+        article_factory(entry["id"], is_processed=False)
+
+    with SessionLocal() as db:
+        assert rss_service._entries_to_process(entries, db) == entries
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.services.search_service import search_service
+from src.util.db_writer import db_writer
+
+def _index(article_id: int, title: str, summary: str = "", content: str = ""):
+    db_writer.write(search_service._write_index, article_id, title, summary, content)
+
+def test_search_long_and_short_terms(article_factory):
+    ml = article_factory("ml", title="机器学习入门")
+    db = article_factory("db", title="SQLite full-text search")
+    _index(ml, "机器学习入门", "介绍监督学习")
+    _index(db, "SQLite full-text search", "FTS5 trigram tokenizer")
+
+    assert [r["id"] for r in search_service.search("trigram")] == [db]
+    # Two-character CJK term: below the trigram minimum
+    assert [r["id"] for r in search_service.search("学习")] == [ml]
+    # One-character term matches as a prefix
+    assert [r["id"] for r in search_service.search("机")] == [ml]
+    # Mixed: both indexes must match
+    assert [r["id"] for r in search_service.search("SQLite 学习")] == []
+
+def test_search_treats_input_as_text(article_factory):
+    article_id = article_factory("q", title='quote " and * star')
+    _index(article_id, 'quote " and * star')
+
+    assert search_service.search('" OR *') == []
+    assert [r["id"] for r in search_service.search("quote")] == [article_id]
+
+def test_list_articles_keyset_pagination(article_factory):
+    base = datetime(2024, 1, 1, 12, 0)
+    # Pairs share a publish date, so the id breaks the tie
+    dates = {}
+    for i in range(11):
+        published = base + timedelta(hours=i // 2)
+        dates[article_factory(f"e{i}", publish_date=published)] = published
+
+    seen = []
+    cursor = None
+    while True:
+        page = search_service.list_articles(cursor=cursor, limit=3)
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert seen == sorted(dates, key=lambda i: (dates[i], i), reverse=True)
+
+def test_list_articles_rejects_bad_cursor():
+    with pytest.raises(ValueError):
+        search_service.list_articles(cursor="not-a-cursor")
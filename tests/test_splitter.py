@@ -0,0 +1,45 @@
+from src.services.notifier import DingTalkNotifier, TelegramNotifier
+
+def _report(sections: int) -> str:
+    parts = []
+    for i in range(sections):
+        parts.append(f"### [标题 {i} 🚀](http://example.com/{i})  (评分: 8)")
+        parts.append("中文摘要，包含表情 😀 和 English words. " * 8)
+        parts.append("")
+    return "\n".join(parts)
+
+def test_dingtalk_chunks_fit_utf8_limit():
+    notifier = DingTalkNotifier()
+    chunks = notifier.build_chunks("今日精选日报", _report(300))
+
+    assert len(chunks) > 1
+    for title, text in chunks:
+        payload = f"## {title}\n\n{text}"
+        assert len(payload.encode("utf-8")) <= 20000
+
+def test_telegram_chunks_fit_utf16_limit():
+    notifier = TelegramNotifier()
+    chunks = notifier.build_chunks("日报", _report(100))
+
+    assert len(chunks) > 1
+    for _, text in chunks:
+        # Emoji outside the BMP count as two UTF-16 code units
+        assert len(text.encode("utf-16-le")) // 2 <= 4096
+
+def test_split_keeps_all_text_and_sections():
+    notifier = DingTalkNotifier()
+    content = _report(300)
+    chunks = notifier._split_smartly(content, 5000)
+
+    assert "\n".join(chunks) == content
+    # Sections that fit are never cut in two
+    for chunk in chunks[1:]:
+        assert chunk.startswith("###")
+
+def test_oversized_line_is_split_by_character():
+    notifier = TelegramNotifier()
+    line = "😀" * 5000
+    chunks = notifier._split_smartly(line, 4000)
+
+    assert "".join(chunks) == line
+    assert all(notifier._measure(chunk) <= 4000 for chunk in chunks)
@@ -0,0 +1,48 @@
+import threading
+import time
+
+from src.constant.config import settings
+from src.services.subscription_service import subscription_service
+
+def test_seed_only_into_empty_table():
+    assert subscription_service.seed_from_env("http://a/feed, http://b/feed") == 2
+    sub = subscription_service.list_subscriptions()["items"][0]
+    subscription_service.delete(sub["id"])
+
+    # A restart does not bring the deleted feed back
+    assert subscription_service.seed_from_env("http://a/feed, http://b/feed") == 0
+    assert [s["url"] for s in subscription_service.list_subscriptions()["items"]] == ["http://b/feed"]
+
+def test_enabled_batches_in_priority_order():
+    for i in range(5):
+        subscription_service.create(f"http://example.com/{i}", priority=i % 2)
+    subscription_service.create("http://example.com/off", enabled=False)
+
+    batches = list(subscription_service.iter_enabled_batches(2))
+    urls = [sub["url"] for batch in batches for sub in batch]
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert urls == [f"http://example.com/{i}" for i in (1, 3, 0, 2, 4)]
+
+def test_fetch_job_fetches_feeds_in_parallel(monkeypatch):
+    from src import main
+
+    for i in range(6):
+        subscription_service.create(f"http://host{i}.example.com/feed")
+    monkeypatch.setattr(settings, "FEED_FETCH_CONCURRENCY", 3)
+    monkeypatch.setattr(main.report_service, "retry_pending_deliveries", lambda: None)
+
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+    def fetch(url, extraction, fetch_mode):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+    monkeypatch.setattr(main.rss_service, "fetch_and_process_feed", fetch)
+
+    main.job_fetch_rss()
+    assert peak == 3
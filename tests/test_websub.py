@@ -0,0 +1,99 @@
+import asyncio
+import hashlib
+import hmac
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from src.constant.config import settings
+from src.services.websub_service import websub_service
+from src.util.database import SessionLocal, WebSubSubscription
+
+SECRET = "s3cret"
+BODY = b"<feed><entry><id>1</id></entry></feed>"
+
+def _sign(body: bytes, method: str = "sha256", secret: str = SECRET) -> str:
+    return f"{method}=" + hmac.new(secret.encode("utf-8"), body, getattr(hashlib, method)).hexdigest()
+
+@pytest.fixture
+def pushed(monkeypatch):
+    """
+    A verified subscription; returns the pushes handed to processing.
+    """
+    with SessionLocal() as db:
+        db.add(WebSubSubscription(feed_url="http://example.com/feed", hub="http://hub", topic="http://example.com/feed",
+                                  token="tok", secret=SECRET, state="subscribed"))
+        db.commit()
+    pushes = []
+    monkeypatch.setattr(websub_service._executor, "submit", lambda fn, *args: pushes.append(args))
+    return pushes
+
+@pytest.mark.parametrize("method", ["sha1", "sha256", "sha512"])
+def test_valid_signature(method):
+    assert websub_service._signature_valid(SECRET, BODY, _sign(BODY, method))
+
+@pytest.mark.parametrize("header", [
+    None,
+    "",
+    "sha256",
+    "md5=" + hashlib.md5(BODY).hexdigest(),
+    _sign(BODY, secret="other"),
+    _sign(BODY + b" "),
+])
+def test_invalid_signature(header):
+    assert not websub_service._signature_valid(SECRET, BODY, header)
+
+def test_receive_accepts_signed_push(pushed):
+    assert websub_service.receive("tok", BODY, {"x-hub-signature": _sign(BODY)})
+    assert len(pushed) == 1 and pushed[0][1] == BODY
+
+def test_receive_ignores_bad_signature_and_unknown_token(pushed):
+    assert not websub_service.receive("tok", BODY, {"x-hub-signature": _sign(BODY, secret="other")})
+    assert not websub_service.receive("nope", BODY, {"x-hub-signature": _sign(BODY)})
+    assert not pushed
+
+def test_receive_ignores_oversized_body(pushed, monkeypatch):
+    monkeypatch.setattr(settings, "FEED_MAX_BYTES", 10)
+    assert not websub_service.receive("tok", BODY, {"x-hub-signature": _sign(BODY)})
+    assert not pushed
+
+def _request(chunks: list[bytes], headers: dict[str, str]) -> Request:
+    messages = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1} for i, chunk in enumerate(chunks)]
+
+    async def receive():
+        return messages.pop(0)
+
+    scope = {
+        "type": "http", "method": "POST", "path": "/websub/callback/tok",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+    }
+    return Request(scope, receive)
+
+def test_body_limit_checks_content_length_and_stream():
+    from src.main import _read_body_limited
+
+    assert asyncio.run(_read_body_limited(_request([b"abc", b"def"], {}), 10)) == b"abcdef"
+    for request in (
+        _request([b"x"], {"content-length": "11"}), # Declared too large: rejected before reading
+        _request([b"x" * 6, b"x" * 6], {}), # Streamed past the limit
+    ):
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(_read_body_limited(request, 10))
+        assert error.value.status_code == 413
+
+def test_push_endpoint_runs_receive_off_the_event_loop(monkeypatch):
+    import threading
+    from src import main
+
+    threads = []
+    monkeypatch.setattr(websub_service, "receive", lambda *args: threads.append(threading.current_thread()))
+
+    async def push():
+        loop_thread = threading.current_thread()
+        response = await main.websub_push("tok", _request([BODY], {}))
+        return loop_thread, response
+
+    loop_thread, response = asyncio.run(push())
+    assert response.status_code == 202
+    assert threads and threads[0] is not loop_thread